@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -53,6 +54,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'website.routers.ReplicaStickinessMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -81,13 +83,74 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# SQLite tuning for concurrent CSC traffic: WAL lets readers run alongside the
+# single writer, synchronous=NORMAL is durable under WAL except on power loss,
+# and busy_timeout makes writers queue for the lock instead of failing with
+# "database is locked". Applied on every new connection via init_command.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,            # milliseconds
+    'mmap_size': 128 * 1024 * 1024,   # bytes of the file mapped into memory
+    'cache_size': -20000,             # negative means KiB, so ~20 MB per connection
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Reuse connections across requests instead of reopening per request
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Writers take the write lock at BEGIN, so they wait on busy_timeout
+            # instead of failing when upgrading a read transaction mid-way
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+        },
     }
 }
 
+# Optional read replica: a second SQLite file refreshed by `manage.py sync_replica`.
+# Dashboard, form view and export reads go to it (see website/routers.py); a
+# session that wrote anything reads from the primary for REPLICA_STICKY_SECONDS.
+REPLICA_DATABASE_PATH = os.environ.get('REPLICA_DATABASE_PATH')
+if REPLICA_DATABASE_PATH:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': REPLICA_DATABASE_PATH,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['website.routers.ReplicaRouter']
+REPLICA_STICKY_SECONDS = 5
+
+# Caches
+# Dashboard fragments live in their own cache so it can be cleared without
+# touching anything else. LocMem is per process; set FRAGMENT_CACHE_DIR to
+# share rendered fragments between workers.
+FRAGMENT_CACHE_DIR = os.environ.get('FRAGMENT_CACHE_DIR')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'fragments',
+    },
+}
+if FRAGMENT_CACHE_DIR:
+    CACHES['fragments'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': FRAGMENT_CACHE_DIR,
+    }
+FRAGMENT_CACHE_ALIAS = 'fragments'
+# Seconds a rendered fragment is kept; keys include the forms' database
+# version, see conditional.forms_version(), so writes invalidate it sooner
+FRAGMENT_CACHE_TIMEOUT = 300
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -132,6 +195,15 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Protected media (see website/media.py)
+# Documents are served by permission-checked views. Set PROTECTED_MEDIA_BACKEND
+# to 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache mod_xsendfile) to hand
+# the transfer to the front proxy; left empty, Django streams the file itself
+# and answers Range requests.
+PROTECTED_MEDIA_BACKEND = os.environ.get('PROTECTED_MEDIA_BACKEND', '')
+# nginx `internal` location aliased to MEDIA_ROOT, used with x-accel-redirect
+PROTECTED_MEDIA_INTERNAL_URL = '/protected-media/'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -141,3 +213,75 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
+
+# PDF render cache
+PDF_CACHE_DIR = MEDIA_ROOT / 'pdf_cache'
+PDF_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Background PDF rendering (see `manage.py run_pdf_workers`)
+# When disabled, download_form_pdf renders cache misses on the request thread
+PDF_RENDER_ASYNC = True
+PDF_RENDER_RETRY_AFTER = 5
+PDF_RENDER_MAX_ATTEMPTS = 3
+PDF_RENDER_STALE_AFTER = 300
+
+# Bulk exports
+# Render processes used for ZIP exports, None means one per CPU
+BULK_EXPORT_PROCESSES = None
+# Rows fetched per database round trip by CSV/NDJSON exports
+EXPORT_CHUNK_SIZE = 2000
+
+# CSC audit log
+# Buffered actions are written in batches of AUDIT_LOG_BATCH_SIZE, or once the
+# oldest one has waited AUDIT_LOG_FLUSH_INTERVAL seconds. Action types listed in
+# AUDIT_LOG_SYNC_ACTIONS are always written immediately.
+AUDIT_LOG_BUFFERED = True
+AUDIT_LOG_BATCH_SIZE = 100
+AUDIT_LOG_FLUSH_INTERVAL = 5
+AUDIT_LOG_SYNC_ACTIONS = ['edited', 'submitted']
+
+# CSC action retention (see `manage.py compact_csc_actions`)
+# 'viewed' actions older than the rollup age are folded into daily counts, and
+# raw actions of any type older than the archive age are written to gzipped
+# NDJSON files in CSC_ACTION_ARCHIVE_DIR before being deleted.
+CSC_ACTION_ROLLUP_AFTER_DAYS = 30
+CSC_ACTION_ARCHIVE_AFTER_DAYS = 180
+CSC_ACTION_ARCHIVE_DIR = BASE_DIR / 'archive' / 'csc_actions'
+
+# CSC work queue (see website/workqueue.py)
+# Agents lease pending forms for CSC_CLAIM_LEASE_SECONDS; editing a claimed
+# form renews its lease and expired leases return to the queue by themselves.
+CSC_CLAIM_LEASE_SECONDS = 15 * 60
+# Forms taken by one "Claim next" request, and the most one agent may hold
+CSC_CLAIM_BATCH_SIZE = 5
+CSC_CLAIM_MAX_ACTIVE = 20
+
+# Chunked document uploads (see website/uploads.py)
+UPLOAD_TEMP_DIR = MEDIA_ROOT / 'uploads_tmp'
+UPLOAD_MAX_BYTES = 100 * 1024 * 1024
+UPLOAD_CHUNK_MAX_BYTES = 8 * 1024 * 1024
+# Seconds after which a chunk write still holding its lock is presumed dead
+UPLOAD_LOCK_STALE_AFTER = 300
+# Unfinished uploads idle for this many hours are removed by `manage.py cleanup_uploads`
+UPLOAD_EXPIRE_AFTER_HOURS = 24
+
+# Document post-processing (see `manage.py process_documents`)
+# Previews are JPEGs fitted into DOCUMENT_PREVIEW_SIZE. Single-page images
+# over DOCUMENT_RECOMPRESS_OVER_BYTES or larger than DOCUMENT_MAX_IMAGE_DIMENSION
+# on either side are downscaled and re-encoded when that makes them smaller.
+# PDF previews need the optional pypdfium2 package; without it only the page
+# count is recorded.
+DOCUMENT_PREVIEW_SIZE = (320, 320)
+DOCUMENT_RECOMPRESS_OVER_BYTES = 2 * 1024 * 1024
+DOCUMENT_MAX_IMAGE_DIMENSION = 2480
+DOCUMENT_JPEG_QUALITY = 85
+DOCUMENT_JOB_MAX_ATTEMPTS = 3
+DOCUMENT_JOB_STALE_AFTER = 300
+
+# Unreferenced document blobs are kept this many hours before
+# `manage.py gc_documents` deletes them
+DOCUMENT_GC_GRACE_HOURS = 24
+
+# Completed forms not updated for this many days are moved to the archive
+# tables by `manage.py archive_forms`
+FORM_ARCHIVE_AFTER_DAYS = 365
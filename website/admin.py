@@ -1,6 +1,11 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser, FormSubmission, CSCAction
+from django.db.models import Q
+from .models import (
+    CustomUser, FormSubmission, CSCAction, CSCActionDailyRollup, FormStatusCounter, PdfRenderJob,
+    DocumentJob, FormClaim, DocumentUpload, DocumentBlob, ArchivedFormSubmission, ArchivedCSCAction,
+)
+from . import search
 
 @admin.register(CustomUser)
 class CustomUserAdmin(UserAdmin):
@@ -41,6 +46,15 @@ class FormSubmissionAdmin(admin.ModelAdmin):
             'fields': ('comments', 'document_file')
         }),
     )
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Text fields go through the FTS5 index instead of LIKE '%term%' scans
+        if not search.build_match_query(search_term):
+            return super().get_search_results(request, queryset, search_term)
+        queryset = queryset.filter(
+            Q(form_id__in=search.matching_form_ids(search_term)) | Q(user__username=search_term.strip())
+        )
+        return queryset, False
 
 @admin.register(CSCAction)
 class CSCActionAdmin(admin.ModelAdmin):
@@ -51,3 +65,66 @@ class CSCActionAdmin(admin.ModelAdmin):
     
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('form_submission', 'csc_user')
+
+@admin.register(CSCActionDailyRollup)
+class CSCActionDailyRollupAdmin(admin.ModelAdmin):
+    # By id and without a join: the form may have moved to the archive tier
+    list_display = ('form_submission_id', 'csc_user', 'action_type', 'day', 'count')
+    list_filter = ('action_type', 'day')
+    search_fields = ('csc_user__username',)
+    list_select_related = ('csc_user',)
+    
+    def get_search_results(self, request, queryset, search_term):
+        # A form id matches the column directly, joining would drop archived forms
+        if search_term.strip().isdigit():
+            return queryset.filter(form_submission_id=int(search_term)), False
+        return super().get_search_results(request, queryset, search_term)
+
+@admin.register(FormStatusCounter)
+class FormStatusCounterAdmin(admin.ModelAdmin):
+    list_display = ('user', 'total', 'completed')
+    readonly_fields = ('user', 'total', 'completed')
+    list_select_related = ('user',)
+
+@admin.register(PdfRenderJob)
+class PdfRenderJobAdmin(admin.ModelAdmin):
+    list_display = ('form_submission', 'status', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    readonly_fields = ('claim_token', 'started_at', 'finished_at', 'error')
+
+@admin.register(DocumentJob)
+class DocumentJobAdmin(admin.ModelAdmin):
+    list_display = ('form_submission', 'status', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    readonly_fields = ('claim_token', 'started_at', 'finished_at', 'error')
+
+@admin.register(FormClaim)
+class FormClaimAdmin(admin.ModelAdmin):
+    list_display = ('form_submission', 'csc_user', 'claimed_at', 'expires_at')
+    list_select_related = ('csc_user',)
+    readonly_fields = ('claim_token',)
+
+@admin.register(DocumentUpload)
+class DocumentUploadAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'filename', 'size', 'received', 'status', 'updated_at')
+    list_filter = ('status',)
+    readonly_fields = ('lock_token', 'locked_at', 'sha256')
+
+@admin.register(DocumentBlob)
+class DocumentBlobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'refcount', 'updated_at')
+    search_fields = ('name', 'sha256')
+    readonly_fields = ('name', 'sha256', 'size', 'refcount', 'created_at', 'updated_at')
+
+@admin.register(ArchivedFormSubmission)
+class ArchivedFormSubmissionAdmin(admin.ModelAdmin):
+    list_display = ('form_id', 'full_name', 'user', 'status', 'submission_date', 'archived_at')
+    list_filter = ('archived_at',)
+    search_fields = ('form_id', 'user__username')
+    list_select_related = ('user',)
+
+@admin.register(ArchivedCSCAction)
+class ArchivedCSCActionAdmin(admin.ModelAdmin):
+    list_display = ('form_submission', 'csc_user', 'action_type', 'action_date')
+    list_filter = ('action_type',)
+    list_select_related = ('form_submission', 'csc_user')
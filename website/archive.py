@@ -0,0 +1,52 @@
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.http import Http404
+
+from .models import FormSubmission, CSCAction, ArchivedFormSubmission, ArchivedCSCAction
+
+# Fields copied verbatim between the live and archive tables
+FORM_FIELDS = [
+    field.attname for field in ArchivedFormSubmission._meta.concrete_fields if field.name != 'archived_at'
+]
+ACTION_FIELDS = [field.attname for field in ArchivedCSCAction._meta.concrete_fields]
+
+# Set while archive_batch() deletes the forms it has just copied: they move to
+# the archive rather than go away, so signals.py leaves the status counters
+# and document references alone
+archiving = ContextVar('archiving', default=False)
+
+
+def get_form_submission(form_id):
+    """Return the live FormSubmission or, failing that, its archived copy"""
+    form_submission = FormSubmission.objects.filter(form_id=form_id).first()
+    if form_submission is None:
+        form_submission = ArchivedFormSubmission.objects.filter(form_id=form_id).first()
+    if form_submission is None:
+        raise Http404('No form submission matches the given query.')
+    return form_submission
+
+
+def archive_batch(queryset, batch_size):
+    """
+    Move up to batch_size forms from queryset, together with their CSC actions,
+    into the archive tables in a single transaction. Returns the number of forms
+    moved, so callers can loop until it returns 0 and resume after a crash.
+    """
+    with transaction.atomic():
+        forms = list(queryset.order_by('form_id').values(*FORM_FIELDS)[:batch_size])
+        if not forms:
+            return 0
+        form_ids = [form['form_id'] for form in forms]
+        actions = list(CSCAction.objects.filter(form_submission_id__in=form_ids).values(*ACTION_FIELDS))
+        
+        ArchivedFormSubmission.objects.bulk_create(ArchivedFormSubmission(**form) for form in forms)
+        ArchivedCSCAction.objects.bulk_create(ArchivedCSCAction(**action) for action in actions)
+        
+        CSCAction.objects.filter(form_submission_id__in=form_ids).delete()
+        token = archiving.set(True)
+        try:
+            FormSubmission.objects.filter(form_id__in=form_ids).delete()
+        finally:
+            archiving.reset(token)
+    return len(forms)
@@ -0,0 +1,120 @@
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+
+from .models import CSCAction, FormSubmission
+from .routers import replica_reads
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLogWriter:
+    """
+    Buffers CSCAction rows in-process and writes them with bulk_create once
+    `batch_size` rows are waiting or the oldest row is `flush_interval`
+    seconds old. Buffered rows are lost only if the process is killed hard,
+    which is why the settings keep low-volume actions synchronous.
+    """
+
+    def __init__(self, batch_size, flush_interval):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def add(self, action):
+        with self._lock:
+            self._buffer.append(action)
+            full = len(self._buffer) >= self.batch_size
+            if not full and self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self._flush_from_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            # Runs inside the CSC's request; a logging failure must not fail it
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Failed to flush buffered CSC actions')
+
+    def flush(self):
+        """Write the buffered actions; returns how many were written"""
+        with self._lock:
+            actions, self._buffer = self._buffer, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not actions:
+            return 0
+        # Forms archived or deleted since their action was buffered would fail
+        # the whole batch on the foreign key. Checked on the primary: flushes
+        # run inside replica-routed views, and a lagging replica would have
+        # us drop the actions of forms created moments ago.
+        with replica_reads(use_replica=False):
+            live = set(FormSubmission.objects.filter(
+                pk__in={action.form_submission_id for action in actions},
+            ).values_list('pk', flat=True))
+        dropped = len(actions)
+        actions = [action for action in actions if action.form_submission_id in live]
+        dropped -= len(actions)
+        if dropped:
+            logger.warning('Dropped %d buffered CSC actions of forms no longer live', dropped)
+        try:
+            with transaction.atomic():
+                CSCAction.objects.bulk_create(actions, batch_size=self.batch_size)
+            return len(actions)
+        except DatabaseError:
+            logger.warning('Batch insert of %d CSC actions failed, retrying row by row', len(actions), exc_info=True)
+        # Keep every row that can still be written
+        written = 0
+        for action in actions:
+            try:
+                with transaction.atomic():
+                    action.save()
+                written += 1
+            except DatabaseError:
+                logger.exception('Failed to write %s action on form %s', action.action_type, action.form_submission_id)
+        return written
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Failed to flush buffered CSC actions')
+        finally:
+            # Timer threads get their own connection, don't leak it
+            connection.close()
+
+    def pending(self):
+        with self._lock:
+            return len(self._buffer)
+
+
+writer = AuditLogWriter(
+    batch_size=settings.AUDIT_LOG_BATCH_SIZE,
+    flush_interval=settings.AUDIT_LOG_FLUSH_INTERVAL,
+)
+# Worker shutdown (e.g. gunicorn's graceful SIGTERM) runs atexit handlers
+atexit.register(writer.flush)
+
+
+def log_action(form_submission, csc_user, action_type, notes=None):
+    """
+    Record a CSCAction, buffering it unless its type is in AUDIT_LOG_SYNC_ACTIONS.
+    form_submission may be a FormSubmission or just its form_id.
+    """
+    action = CSCAction(
+        form_submission_id=getattr(form_submission, 'pk', form_submission),
+        csc_user=csc_user,
+        action_type=action_type,
+        notes=notes,
+    )
+    if not settings.AUDIT_LOG_BUFFERED or action_type in settings.AUDIT_LOG_SYNC_ACTIONS:
+        action.save()
+    else:
+        writer.add(action)
+    return action
@@ -0,0 +1,94 @@
+from collections import Counter, namedtuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, F, Q, TextField, Value, When
+from django.db.models.functions import Concat
+from django.utils import timezone
+
+from .models import CSCAction, FormClaim, FormStatusCounter, FormSubmission, PdfRenderJob
+
+# Bulk status transitions and comments for CSC agents. However many forms are
+# selected, the work is a fixed handful of set-based statements in one
+# transaction: read the affected rows, one UPDATE, the counter deltas, and
+# batched inserts of the CSCAction rows.
+
+BulkResult = namedtuple('BulkResult', ['matched', 'updated', 'skipped'])
+
+STATUS_LABELS = dict(FormSubmission.STATUS_CHOICES)
+
+
+class BulkError(Exception):
+    """A bulk request that can't be applied as given"""
+
+
+def sources_for(status):
+    """Statuses from which forms may be moved to status"""
+    return [source for source, targets in FormSubmission.STATUS_TRANSITIONS.items() if status in targets]
+
+
+def apply(queryset, csc_user, status=None, comment=None):
+    """
+    Move the forms in queryset to status and/or add a CSC comment to them.
+    Forms whose current status can't move to status are skipped, and with a
+    status the comment is only written to the forms that move.
+    """
+    if status is None and comment is None:
+        raise BulkError('Nothing to change: give a status, a comment or both.')
+    changes = {'version': F('version') + 1, 'last_updated': timezone.now()}
+    targets = FormSubmission.objects.filter(pk__in=queryset.values('pk'))
+    if status is not None:
+        if status not in STATUS_LABELS:
+            raise BulkError(f'Unknown status {status!r}.')
+        sources = sources_for(status)
+        if not sources:
+            raise BulkError(f'No form can be moved to {STATUS_LABELS[status]}.')
+        changes['status'] = status
+    if comment is not None:
+        # Added below any comment already on the form, never replacing it
+        changes['comments'] = Case(
+            When(Q(comments__isnull=True) | Q(comments=''), then=Value(comment)),
+            default=Concat('comments', Value('\n'), Value(comment)),
+            output_field=TextField(),
+        )
+
+    with transaction.atomic():
+        matched = targets.count()
+        eligible = targets if status is None else targets.filter(status__in=sources)
+        locked = eligible
+        if connection.features.has_select_for_update:
+            # SQLite's IMMEDIATE transaction already holds the write lock
+            locked = eligible.select_for_update()
+        rows = list(locked.values_list('form_id', 'user_id', 'status'))
+        form_ids = [form_id for form_id, _, _ in rows]
+        if not rows:
+            return BulkResult(matched, 0, matched)
+        # Same WHERE as the read above, so exactly those rows change
+        eligible.update(**changes)
+
+        if status is not None:
+            completed = Counter()
+            for _, user_id, old_status in rows:
+                completed[user_id] += (status == 'completed') - (old_status == 'completed')
+            FormStatusCounter.record_completed_changes(completed)
+
+        actions = []
+        for form_id in form_ids:
+            if status is not None:
+                actions.append(CSCAction(
+                    form_submission_id=form_id, csc_user=csc_user,
+                    action_type='submitted' if status == 'completed' else 'edited',
+                    notes=f"Bulk status change to {STATUS_LABELS[status]} by {csc_user.username}",
+                ))
+            if comment is not None:
+                actions.append(CSCAction(
+                    form_submission_id=form_id, csc_user=csc_user, action_type='commented', notes=comment,
+                ))
+        CSCAction.objects.bulk_create(actions, batch_size=500)
+
+        if status == 'completed':
+            FormClaim.objects.filter(pk__in=form_ids).delete()
+            if settings.PDF_RENDER_ASYNC:
+                PdfRenderJob.enqueue_many(form_ids)
+
+    return BulkResult(matched, len(rows), matched - len(rows))
@@ -0,0 +1,117 @@
+import hashlib
+from collections import namedtuple
+
+from django.contrib import messages
+from django.db.models import Subquery
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .models import ArchivedFormSubmission, FormStatusCounter, FormSubmission
+
+# Conditional GET helpers. Views look up a form's version with one primary-key
+# query and answer 304 before loading the row, rendering templates or building
+# a PDF.
+
+FormVersion = namedtuple('FormVersion', ['form_id', 'user_id', 'status', 'last_updated', 'is_archived'])
+
+VERSION_FIELDS = ('form_id', 'user_id', 'status', 'last_updated')
+
+
+def form_version(form_id):
+    """Return the FormVersion of a live or archived form, or None"""
+    row = FormSubmission.objects.filter(form_id=form_id).values_list(*VERSION_FIELDS).first()
+    if row is not None:
+        return FormVersion(*row, is_archived=False)
+    row = ArchivedFormSubmission.objects.filter(form_id=form_id).values_list(*VERSION_FIELDS).first()
+    if row is not None:
+        return FormVersion(*row, is_archived=True)
+    return None
+
+
+def can_access(user, version):
+    """Mirror of the permission checks in view_form/download_form_pdf"""
+    if user.user_type == 'csc':
+        return True
+    return user.user_type == 'user' and version.user_id == user.pk
+
+
+def _timestamp(value):
+    return int(value.timestamp() * 1000000) if value else 0
+
+
+def forms_version_query(user=None):
+    """The single query behind forms_version()"""
+    forms = FormSubmission.objects.order_by('-last_updated')
+    archived = ArchivedFormSubmission.objects.order_by('-archived_at')
+    if user is not None:
+        forms = forms.filter(user=user)
+        archived = archived.filter(user=user)
+    return FormStatusCounter.objects.filter(user=user).annotate(
+        newest=Subquery(forms.values('last_updated')[:1]),
+        archived=Subquery(archived.values('archived_at')[:1]),
+    ).values_list('total', 'completed', 'newest', 'archived')
+
+
+def forms_version(user=None):
+    """
+    Version of every form, or of one user's, read from the database in one
+    query so writes from any worker or management command change it: the
+    newest last_updated moves on every save and queryset update, the counters
+    on deletes and the newest archived_at when forms are archived.
+    """
+    row = forms_version_query(user).first()
+    if row is None:
+        return '0'
+    total, completed, newest, archived_at = row
+    return f'{total}.{completed}.{_timestamp(newest)}.{_timestamp(archived_at)}'
+
+
+def form_etag(user, version, kind):
+    parts = [kind, version.form_id, _timestamp(version.last_updated), user.user_type]
+    if kind == 'page' and user.user_type == 'csc':
+        # The CSC page also lists previous submissions from other forms
+        parts.append(forms_version())
+    return quote_etag('-'.join(str(part) for part in parts))
+
+
+def dashboard_etag(user, scope, version, *extra):
+    """ETag of a dashboard page showing the forms at `version` (see forms_version)"""
+    parts = ['dashboard', user.pk, scope, version, *extra]
+    return quote_etag('-'.join(str(part) for part in parts))
+
+
+def csrf_version(request):
+    """
+    Digest of the request's CSRF secret. Pages whose forms embed a CSRF token
+    put it in their ETag, so a copy holding the token of an earlier login is
+    never revalidated.
+    """
+    # get_token() creates the secret on a first visit, as rendering would
+    get_token(request)
+    secret = request.META['CSRF_COOKIE']
+    return hashlib.sha256(secret.encode()).hexdigest()[:16]
+
+
+def not_modified(request, etag, last_modified=None):
+    """Return a 304 (or 412) response if the client's copy is current, else None"""
+    # A 304 would leave queued flash messages unshown
+    if len(messages.get_messages(request)):
+        return None
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified=None):
+    response.headers['ETag'] = etag
+    if last_modified is not None:
+        response.headers['Last-Modified'] = http_date(last_modified.timestamp())
+    # Let browsers keep the copy but always revalidate it
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,149 @@
+import io
+import os
+import re
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, UnidentifiedImageError
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # In requirements.txt; without it PDFs only get a page count
+    pdfium = None
+
+# Post-processing of uploaded documents, run by `manage.py process_documents`
+# off the request path: metadata, a small JPEG preview, and recompression of
+# oversized images. process() only touches files; the worker command writes
+# the result back to the FormSubmission.
+
+PDF_PAGE_RE = re.compile(rb'/Type\s*/Page(?![a-zA-Z])')
+PDF_COUNT_RE = re.compile(rb'/Type\s*/Pages\b[^>]*?/Count\s+(\d+)|/Count\s+(\d+)[^>]*?/Type\s*/Pages\b', re.S)
+
+
+def setup_worker():
+    import django
+    django.setup()
+
+
+def preview_name(document_name):
+    # Documents are content-addressed, so forms sharing a file share its preview
+    stem = os.path.splitext(os.path.basename(document_name))[0]
+    return f'form_previews/{stem}.jpg'
+
+
+def _save_preview(image, document_name):
+    name = preview_name(document_name)
+    if default_storage.exists(name):
+        return name
+    image = image.convert('RGB')
+    image.thumbnail(settings.DOCUMENT_PREVIEW_SIZE)
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=80, optimize=True)
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def _pdf_page_count(data):
+    # Page objects inside compressed object streams are invisible to the scan,
+    # so prefer the largest /Count of a /Pages node, which is the page tree root
+    counts = [int(a or b) for a, b in PDF_COUNT_RE.findall(data)]
+    if counts:
+        return max(counts)
+    return len(PDF_PAGE_RE.findall(data)) or None
+
+
+def _process_pdf(data, document_name, metadata):
+    if pdfium is None:
+        metadata['pages'] = _pdf_page_count(data)
+        return None
+    pdf = pdfium.PdfDocument(data)
+    try:
+        metadata['pages'] = len(pdf)
+        page = pdf[0]
+        scale = max(settings.DOCUMENT_PREVIEW_SIZE) / max(page.get_size())
+        image = page.render(scale=scale).to_pil()
+        return _save_preview(image, document_name)
+    finally:
+        pdf.close()
+
+
+def _recompress(image, fmt):
+    """Downscale and re-encode an image; returns (bytes, extension)"""
+    image.thumbnail((settings.DOCUMENT_MAX_IMAGE_DIMENSION,) * 2)
+    buffer = io.BytesIO()
+    if fmt == 'PNG' or image.mode in ('RGBA', 'LA', 'P'):
+        image.save(buffer, 'PNG', optimize=True)
+        return buffer.getvalue(), '.png'
+    image.convert('RGB').save(buffer, 'JPEG', quality=settings.DOCUMENT_JPEG_QUALITY, optimize=True)
+    return buffer.getvalue(), '.jpg'
+
+
+def process(form_submission):
+    """
+    Inspect form_submission.document_file and return a dict with the
+    `document`, `metadata` and `preview` names to store on the form. A
+    recompressed image is saved as a new blob and returned as `document`.
+    """
+    field_file = form_submission.document_file
+    document = field_file.name
+    with field_file.open('rb') as f:
+        data = f.read()
+    metadata = {'size': len(data)}
+    preview = None
+
+    if data.startswith(b'%PDF'):
+        metadata['content_type'] = 'application/pdf'
+        preview = _process_pdf(data, document, metadata)
+    else:
+        try:
+            image = Image.open(io.BytesIO(data))
+            image.load()
+        except (UnidentifiedImageError, OSError):
+            metadata['content_type'] = 'application/octet-stream'
+        else:
+            fmt = image.format
+            metadata['content_type'] = Image.MIME.get(fmt, 'application/octet-stream')
+            metadata['pages'] = getattr(image, 'n_frames', 1)
+            metadata['width'], metadata['height'] = image.size
+            # Multi-page images (e.g. TIFF scans) would lose pages on re-encode
+            oversized = metadata['pages'] == 1 and (
+                len(data) > settings.DOCUMENT_RECOMPRESS_OVER_BYTES
+                or max(image.size) > settings.DOCUMENT_MAX_IMAGE_DIMENSION
+            )
+            if oversized:
+                smaller = image.copy()
+                content, ext = _recompress(smaller, fmt)
+                if len(content) < len(data):
+                    name = field_file.field.generate_filename(form_submission, 'document' + ext)
+                    document = field_file.storage.save(name, ContentFile(content))
+                    metadata.update(
+                        original_size=len(data),
+                        size=len(content),
+                        content_type='image/png' if ext == '.png' else 'image/jpeg',
+                    )
+                    metadata['width'], metadata['height'] = smaller.size
+            preview = _save_preview(image, document)
+
+    return {
+        'form_id': form_submission.form_id,
+        'source': field_file.name,
+        'document': document,
+        'metadata': metadata,
+        'preview': preview,
+    }
+
+
+def apply_result(result):
+    """Store a process() result on its form; False if the document changed meanwhile"""
+    # Imported here: worker processes import this module before django.setup()
+    from .models import FormSubmission
+
+    form_submission = FormSubmission.objects.filter(form_id=result['form_id']).first()
+    if form_submission is None or form_submission.document_file.name != result['source']:
+        return False
+    form_submission.document_file.name = result['document']
+    form_submission.document_metadata = result['metadata']
+    form_submission.document_preview.name = result['preview']
+    # last_updated changes too, so cached pages and ETags pick up the preview
+    form_submission.save(update_fields=['document_file', 'document_metadata', 'document_preview', 'last_updated'])
+    return True
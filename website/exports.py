@@ -0,0 +1,186 @@
+import csv
+import multiprocessing
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from . import pdf
+from .models import FormSubmission, CSCAction
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def filter_forms(status=None, date_from=None, date_to=None, user=None):
+    """FormSubmission queryset for an ExportFilterForm's cleaned_data; date bounds are inclusive"""
+    queryset = FormSubmission.objects.all()
+    if status:
+        queryset = queryset.filter(status=status)
+    # Plain range filters on submission_date so the composite indexes apply
+    if date_from:
+        queryset = queryset.filter(submission_date__gte=_start_of_day(date_from))
+    if date_to:
+        queryset = queryset.filter(submission_date__lt=_start_of_day(date_to + timedelta(days=1)))
+    if user:
+        queryset = queryset.filter(user__username=user)
+    return queryset
+
+
+class _ZipBuffer:
+    """
+    Write-only file object for ZipFile. It has no tell()/seek(), so ZipFile
+    falls back to streaming mode (data descriptors after each entry), and
+    whatever has been written so far can be drained with take().
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _rendered_pdfs(forms, processes):
+    """
+    Yield (form, pdf bytes) in queryset order. Cached PDFs are read from disk,
+    everything else is rendered in a process pool with a bounded number of
+    renders in flight so memory stays flat however many forms are exported.
+    """
+    context = multiprocessing.get_context('spawn')
+    pool = ProcessPoolExecutor(processes, mp_context=context, initializer=pdf.setup_worker)
+    pending = deque()
+    window = processes * 4
+
+    def drain_one():
+        form, result = pending.popleft()
+        if hasattr(result, 'result'):
+            return form, result.result()
+        return form, result
+
+    try:
+        for form in forms:
+            cached = pdf.open_cached(form)
+            if cached is not None:
+                with cached:
+                    pending.append((form, cached.read()))
+            else:
+                pending.append((form, pool.submit(pdf.render_form_pdf, form)))
+            while len(pending) >= window:
+                yield drain_one()
+        while pending:
+            yield drain_one()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_pdf_zip(queryset, processes=None):
+    """Yield the bytes of a ZIP archive holding one PDF per form in the queryset"""
+    processes = processes or settings.BULK_EXPORT_PROCESSES or os.cpu_count() or 1
+    buffer = _ZipBuffer()
+    forms = queryset.order_by('submission_date', 'form_id').iterator(chunk_size=200)
+    # PDFs are already compressed, storing them avoids burning CPU on deflate
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for form, content in _rendered_pdfs(forms, processes):
+            info = zipfile.ZipInfo(
+                f"form_{form.form_id}.pdf",
+                date_time=form.last_updated.timetuple()[:6],
+            )
+            archive.writestr(info, content)
+            yield buffer.take()
+    yield buffer.take()
+
+
+# Row exports (CSV / NDJSON) for reporting. Each source is read with
+# values_list().iterator() in watermark order, so an export holds one chunk of
+# tuples in memory at a time and a nightly job can resume from the last
+# watermark it saw instead of re-dumping the whole table.
+
+EXPORT_SOURCES = {
+    'forms': {
+        'model': FormSubmission,
+        'watermark': 'last_updated',
+        'fields': (
+            'form_id', 'user__username', 'full_name', 'email', 'phone_number', 'address',
+            'date_of_birth', 'occupation', 'purpose', 'emergency_contact_name',
+            'emergency_contact_phone', 'previous_applications', 'additional_notes', 'status',
+            'submission_date', 'last_updated', 'comments', 'document_file',
+        ),
+    },
+    'actions': {
+        'model': CSCAction,
+        'watermark': 'action_date',
+        'fields': (
+            'id', 'form_submission_id', 'csc_user__username', 'action_type', 'action_date', 'notes',
+        ),
+    },
+}
+
+
+class _Echo:
+    """Pseudo-buffer that hands csv.writer output straight back to the caller"""
+
+    def write(self, value):
+        return value
+
+
+class DataExport:
+    def __init__(self, source, since=None, chunk_size=None):
+        config = EXPORT_SOURCES[source]
+        self.model = config['model']
+        self.fields = config['fields']
+        self.watermark_field = config['watermark']
+        self.since = since
+        self.chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+        # Highest watermark value emitted so far, pass it as `since` next time
+        self.watermark = since
+
+    def rows(self):
+        queryset = self.model.objects.all()
+        if self.since is not None:
+            queryset = queryset.filter(**{f'{self.watermark_field}__gt': self.since})
+        queryset = queryset.order_by(self.watermark_field, self.model._meta.pk.name)
+        watermark_index = self.fields.index(self.watermark_field)
+        for row in queryset.values_list(*self.fields).iterator(chunk_size=self.chunk_size):
+            self.watermark = row[watermark_index]
+            yield row
+
+    def _batched(self, lines):
+        # One yield per chunk keeps the per-row overhead out of the response
+        batch = []
+        for line in lines:
+            batch.append(line)
+            if len(batch) >= self.chunk_size:
+                yield ''.join(batch)
+                batch = []
+        if batch:
+            yield ''.join(batch)
+
+    def iter_csv(self):
+        writer = csv.writer(_Echo())
+        yield writer.writerow(self.fields)
+        yield from self._batched(writer.writerow(row) for row in self.rows())
+
+    def iter_ndjson(self):
+        encoder = DjangoJSONEncoder(separators=(',', ':'))
+        yield from self._batched(
+            encoder.encode(dict(zip(self.fields, row))) + '\n' for row in self.rows()
+        )
+
+    def iter_format(self, export_format):
+        return self.iter_csv() if export_format == 'csv' else self.iter_ndjson()
@@ -2,6 +2,7 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth import authenticate
 from .models import CustomUser, FormSubmission
+from . import exports
 
 class CustomUserCreationForm(UserCreationForm):
     email = forms.EmailField(required=True)
@@ -64,6 +65,9 @@ class FormSubmissionForm(forms.ModelForm):
         }
 
 class FormEditForm(forms.ModelForm):
+    # Version the agent started from, see FormSubmission.save_if_version()
+    version = forms.IntegerField(widget=forms.HiddenInput, min_value=1)
+    
     class Meta:
         model = FormSubmission
         fields = [
@@ -85,4 +89,122 @@ class FormEditForm(forms.ModelForm):
             'additional_notes': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
             'status': forms.Select(attrs={'class': 'form-control'}),
             'comments': forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'Add comments about this form'}),
-        }
\ No newline at end of file
+        }
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['version'].initial = self.instance.version
+        # Each field also posts the value the agent started from, so changes
+        # are measured against that rather than against the row as it is now
+        for name in self._meta.fields:
+            self.fields[name].show_hidden_initial = True
+    
+    def changed_fields(self):
+        """Model fields the agent changed; only these are written"""
+        return [name for name in self.changed_data if name != 'version']
+    
+    def _started_from(self, name):
+        field = self.fields[name]
+        return field.hidden_widget().value_from_datadict(self.data, self.files, self.add_initial_prefix(name))
+    
+    def conflicts(self, current):
+        """
+        (label, saved value, submitted value) for fields both this agent and
+        whoever saved `current` changed, to different values
+        """
+        rows = []
+        for name in self.changed_fields():
+            field = self.fields[name]
+            saved, submitted = getattr(current, name), self.cleaned_data.get(name)
+            if not field.has_changed(saved, self._started_from(name)) or not field.has_changed(saved, self.data.get(name)):
+                continue
+            choices = dict(field.choices) if name == 'status' else {}
+            rows.append((field.label, choices.get(saved, saved), choices.get(submitted, submitted)))
+        return rows
+    
+    def rebase(self, current):
+        """
+        A bound form on top of `current`: this agent's changes where they made
+        them, the saved values everywhere else
+        """
+        data = self.data.copy()
+        data['version'] = current.version
+        changed = set(self.changed_fields())
+        for name in self._meta.fields:
+            value = getattr(current, name)
+            value = '' if value is None else str(value)
+            data[self.add_initial_prefix(name)] = value
+            if name in changed:
+                continue
+            if isinstance(self.fields[name].widget, forms.CheckboxInput):
+                if getattr(current, name):
+                    data[name] = 'on'
+                else:
+                    data.pop(name, None)
+            else:
+                data[name] = value
+        return type(self)(data, instance=current)
+
+class ExportFilterForm(forms.Form):
+    status = forms.ChoiceField(
+        choices=[('', 'Any status')] + FormSubmission.STATUS_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+    )
+    date_from = forms.DateField(required=False, widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}))
+    date_to = forms.DateField(required=False, widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}))
+    user = forms.CharField(required=False, widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Username'}))
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from = cleaned_data.get('date_from')
+        date_to = cleaned_data.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            raise forms.ValidationError('The start date must be on or before the end date.')
+        return cleaned_data
+
+
+class BulkUpdateForm(ExportFilterForm):
+    """Selects forms by id or by the export filters, and what to change on them"""
+    form_ids = forms.CharField(required=False, help_text='Comma or space separated form IDs')
+    new_status = forms.ChoiceField(
+        choices=[('', 'Keep status')] + FormSubmission.STATUS_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+    )
+    comment = forms.CharField(
+        required=False,
+        widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 2, 'placeholder': 'Comment for the selected forms'}),
+    )
+    
+    FILTER_FIELDS = ('status', 'date_from', 'date_to', 'user')
+    
+    def clean_form_ids(self):
+        try:
+            return sorted({int(part) for part in self.cleaned_data['form_ids'].replace(',', ' ').split()})
+        except ValueError:
+            raise forms.ValidationError('Form IDs must be whole numbers.')
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        form_ids = cleaned_data.get('form_ids')
+        filters = [name for name in self.FILTER_FIELDS if cleaned_data.get(name)]
+        if form_ids and filters:
+            raise forms.ValidationError('Select forms either by ID or by filter, not both.')
+        if not form_ids and not filters:
+            # An empty selection must never mean every form
+            raise forms.ValidationError('Select forms by ID or by at least one filter.')
+        if not cleaned_data.get('new_status') and not cleaned_data.get('comment'):
+            raise forms.ValidationError('Choose a new status, a comment or both.')
+        return cleaned_data
+    
+    def get_queryset(self):
+        if self.cleaned_data['form_ids']:
+            return FormSubmission.objects.filter(pk__in=self.cleaned_data['form_ids'])
+        return exports.filter_forms(**{name: self.cleaned_data[name] for name in self.FILTER_FIELDS})
+
+
+class DataExportForm(forms.Form):
+    source = forms.ChoiceField(choices=[('forms', 'Form submissions'), ('actions', 'CSC actions')], initial='forms')
+    format = forms.ChoiceField(choices=[('csv', 'CSV'), ('ndjson', 'NDJSON')], initial='csv')
+    since = forms.DateTimeField(required=False, help_text='Only export rows changed after this time')
@@ -0,0 +1,64 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.safestring import mark_safe
+
+FRAGMENT_KEY = 'fragments:html:%s'
+HITS_KEY = 'fragments:hits'
+MISSES_KEY = 'fragments:misses'
+
+
+def get_cache():
+    return caches[settings.FRAGMENT_CACHE_ALIAS]
+
+
+def is_shared():
+    """Whether other processes, e.g. the web workers, use the same fragment cache"""
+    return not isinstance(get_cache(), (LocMemCache, DummyCache))
+
+
+def _incr(cache, key, delta=1):
+    # incr() raises on a missing key, so seed it first. add() is a no-op when
+    # the key already exists.
+    cache.add(key, 0, None)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.set(key, delta, None)
+        return delta
+
+
+def get_or_render(key_parts, render):
+    """Return cached HTML for key_parts, calling render() on a miss."""
+    cache = get_cache()
+    raw = ':'.join(str(part) for part in key_parts)
+    key = FRAGMENT_KEY % hashlib.md5(raw.encode()).hexdigest()
+    html = cache.get(key)
+    if html is None:
+        _incr(cache, MISSES_KEY)
+        html = render()
+        cache.set(key, html, settings.FRAGMENT_CACHE_TIMEOUT)
+    else:
+        _incr(cache, HITS_KEY)
+    return mark_safe(html)
+
+
+def clear():
+    """Drop every cached fragment, e.g. after counters are rebuilt in bulk."""
+    get_cache().clear()
+
+
+def stats():
+    cache = get_cache()
+    return {
+        'hits': cache.get(HITS_KEY, 0),
+        'misses': cache.get(MISSES_KEY, 0),
+    }
+
+
+def reset_stats():
+    get_cache().delete_many([HITS_KEY, MISSES_KEY])
@@ -0,0 +1,43 @@
+import hashlib
+import re
+import unicodedata
+
+# Normalized identity keys used to spot repeat applications by the same person.
+# They are stored on FormSubmission (and ArchivedFormSubmission) in indexed
+# columns, so finding prior submissions is an index lookup, not a scan.
+
+
+def normalize_email(email):
+    """Lowercase, trimmed, with any +tag removed from the local part"""
+    email = (email or '').strip().lower()
+    local, at, domain = email.partition('@')
+    if not at:
+        return email
+    return f"{local.split('+', 1)[0]}@{domain}"
+
+
+def normalize_phone(phone_number):
+    return re.sub(r'\D', '', phone_number or '')
+
+
+def normalize_name(full_name):
+    # Strip accents, case and repeated whitespace so "José  Díaz" == "jose diaz"
+    decomposed = unicodedata.normalize('NFKD', full_name or '')
+    without_marks = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(without_marks.casefold().split())
+
+
+def identity_hash(full_name, date_of_birth):
+    name = normalize_name(full_name)
+    if not name or not date_of_birth:
+        return ''
+    return hashlib.sha256(f"{name}|{date_of_birth.isoformat()}".encode()).hexdigest()
+
+
+def identity_fields(form):
+    """Values for the normalized identity columns of a form-like object"""
+    return {
+        'email_normalized': normalize_email(form.email),
+        'phone_digits': normalize_phone(form.phone_number),
+        'identity_hash': identity_hash(form.full_name, form.date_of_birth),
+    }
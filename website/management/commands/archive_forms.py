@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from website import archive
+from website.models import FormSubmission
+
+
+class Command(BaseCommand):
+    help = 'Move completed forms (and their CSC actions) older than a given age into the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=settings.FORM_ARCHIVE_AFTER_DAYS,
+                            help='Archive completed forms not updated for this many days')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--max-batches', type=int, help='Stop after this many batches; rerun to resume')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['older_than_days'])
+        eligible = FormSubmission.objects.filter(status='completed', last_updated__lt=cutoff)
+
+        moved = batches = 0
+        while options['max_batches'] is None or batches < options['max_batches']:
+            count = archive.archive_batch(eligible, options['batch_size'])
+            if not count:
+                break
+            moved += count
+            batches += 1
+            self.stdout.write(f'Batch {batches}: archived {count} forms')
+
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} forms in {batches} batches'))
@@ -0,0 +1,90 @@
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Django's stock SQLite behaviour: rollback journal, synchronous=FULL,
+# deferred transactions and a 5 second busy timeout
+BASELINE = {
+    'pragmas': {'journal_mode': 'DELETE', 'synchronous': 'FULL'},
+    'transaction_mode': 'DEFERRED',
+    'timeout': 5,
+}
+
+
+class Command(BaseCommand):
+    help = ('Measure concurrent audit-log style write throughput on a scratch SQLite file, '
+            'with Django defaults versus the SQLITE_PRAGMAS/IMMEDIATE configuration in settings')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent writer connections')
+        parser.add_argument('--writes', type=int, default=200, help='Transactions per writer')
+
+    def handle(self, *args, **options):
+        options_setting = settings.DATABASES['default'].get('OPTIONS', {})
+        tuned = {
+            'pragmas': settings.SQLITE_PRAGMAS,
+            'transaction_mode': options_setting.get('transaction_mode') or 'DEFERRED',
+            'timeout': options_setting.get('timeout', 5),
+        }
+        for name, config in (('baseline', BASELINE), ('tuned', tuned)):
+            with tempfile.TemporaryDirectory() as tmp:
+                committed, failed, elapsed = self.run(Path(tmp) / 'bench.sqlite3', config, options)
+            self.stdout.write(
+                f'{name:>8}: {committed / elapsed:8.1f} commits/s, '
+                f'{committed} committed, {failed} failed ("database is locked"), {elapsed:.2f}s'
+            )
+
+    def connect(self, path, config):
+        conn = sqlite3.connect(path, timeout=config['timeout'], isolation_level=None, check_same_thread=False)
+        for name, value in config['pragmas'].items():
+            conn.execute(f'PRAGMA {name}={value}')
+        return conn
+
+    def run(self, path, config, options):
+        setup = self.connect(path, config)
+        setup.execute(
+            'CREATE TABLE action (id INTEGER PRIMARY KEY, form_id INTEGER, action_type TEXT, action_date REAL)'
+        )
+        setup.close()
+
+        counts = {'committed': 0, 'failed': 0}
+        lock = threading.Lock()
+        start = threading.Barrier(options['threads'] + 1)
+
+        def writer():
+            conn = self.connect(path, config)
+            start.wait()
+            committed = failed = 0
+            for i in range(options['writes']):
+                try:
+                    # Read-then-write, like a view that looks a form up and logs an action
+                    conn.execute(f"BEGIN {config['transaction_mode']}")
+                    conn.execute('SELECT COUNT(*) FROM action WHERE form_id = ?', (i,)).fetchone()
+                    conn.execute(
+                        'INSERT INTO action (form_id, action_type, action_date) VALUES (?, ?, ?)',
+                        (i, 'viewed', time.time()),
+                    )
+                    conn.execute('COMMIT')
+                    committed += 1
+                except sqlite3.OperationalError:
+                    if conn.in_transaction:
+                        conn.execute('ROLLBACK')
+                    failed += 1
+            conn.close()
+            with lock:
+                counts['committed'] += committed
+                counts['failed'] += failed
+
+        threads = [threading.Thread(target=writer) for _ in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        began = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        return counts['committed'], counts['failed'], time.perf_counter() - began
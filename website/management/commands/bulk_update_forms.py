@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from website import bulk
+from website.forms import BulkUpdateForm
+from website.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = 'Move many forms to a new status and/or add a CSC comment to them in a few set-based statements'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--as', dest='csc_user', required=True,
+                            help='Username of the CSC agent the actions are recorded for')
+        parser.add_argument('--ids', nargs='+', default=[], help='Form IDs to update')
+        parser.add_argument('--ids-file', help='File of form IDs, separated by whitespace or commas')
+        parser.add_argument('--status', default='', help='Only forms currently in this status')
+        parser.add_argument('--from', dest='date_from', help='First submission date, YYYY-MM-DD')
+        parser.add_argument('--to', dest='date_to', help='Last submission date, YYYY-MM-DD')
+        parser.add_argument('--user', help='Only forms of this username')
+        parser.add_argument('--set-status', default='', help='Status to move the forms to')
+        parser.add_argument('--comment', default='', help='CSC comment to add to the forms')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the forms that would change')
+
+    def handle(self, *args, **options):
+        csc_user = CustomUser.objects.filter(username=options['csc_user'], user_type='csc').first()
+        if csc_user is None:
+            raise CommandError(f'No CSC user named {options["csc_user"]!r}.')
+
+        form_ids = ' '.join(options['ids'])
+        if options['ids_file']:
+            with open(options['ids_file']) as f:
+                form_ids += ' ' + f.read()
+        form = BulkUpdateForm({
+            'form_ids': form_ids,
+            'status': options['status'],
+            'date_from': options['date_from'],
+            'date_to': options['date_to'],
+            'user': options['user'],
+            'new_status': options['set_status'],
+            'comment': options['comment'],
+        })
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+
+        queryset = form.get_queryset()
+        status = form.cleaned_data['new_status'] or None
+        if options['dry_run']:
+            matched = queryset.count()
+            eligible = queryset.filter(status__in=bulk.sources_for(status)).count() if status else matched
+            self.stdout.write(f'Would update {eligible} of {matched} matching forms')
+            return
+
+        try:
+            result = bulk.apply(queryset, csc_user, status=status, comment=form.cleaned_data['comment'] or None)
+        except bulk.BulkError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated {result.updated} of {result.matched} matching forms ({result.skipped} skipped)'
+        ))
@@ -0,0 +1,57 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from website import conditional, queries, workqueue
+from website.models import CustomUser, FormSubmission, CSCAction
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN QUERY PLAN over the view querysets and fail on full table scans'
+
+    def get_querysets(self):
+        # Any user works here, the plan does not depend on the bound value
+        user = CustomUser(pk=0)
+        return {
+            'csc_dashboard.pending_forms': queries.pending_forms(),
+            'csc_dashboard.completed_forms': queries.completed_forms(),
+            'csc_dashboard.forms_version': conditional.forms_version_query(),
+            'csc_dashboard.claims_version': workqueue.active_claims(),
+            'csc_queue.claimed_forms': queries.pending_forms().filter(claim__csc_user=user),
+            'user_dashboard.forms_version': conditional.forms_version_query(user),
+            'user_dashboard.user_forms': queries.user_forms(user),
+            'user_dashboard.completed_forms': queries.user_completed_forms(user),
+            'user_dashboard.pending_forms': queries.user_pending_forms(user),
+            'user_forms_list.user_forms': queries.user_forms(user),
+            'user_forms_list.archived_forms': queries.user_archived_forms(user),
+            'view_form.form_submission': FormSubmission.objects.filter(form_id=0),
+            'view_form.csc_actions': CSCAction.objects.filter(form_submission_id=0),
+        }
+
+    def find_table_scans(self, plan):
+        scans = []
+        for line in plan.splitlines():
+            match = re.search(r'\bSCAN \S+.*', line)
+            if match and ' USING ' not in match.group(0):
+                scans.append(match.group(0))
+        return scans
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('check_query_plans only understands SQLite query plans.')
+
+        failures = []
+        for name, queryset in self.get_querysets().items():
+            plan = queryset.explain()
+            scans = self.find_table_scans(plan)
+            if scans:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f'{name}: {"; ".join(scans)}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{name}: OK'))
+            if options['verbosity'] > 1:
+                self.stdout.write(plan)
+
+        if failures:
+            raise CommandError(f'{len(failures)} queries fall back to a table scan: {", ".join(failures)}')
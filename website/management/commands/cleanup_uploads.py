@@ -0,0 +1,47 @@
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from website import uploads
+from website.models import DocumentUpload
+
+
+class Command(BaseCommand):
+    help = 'Delete unfinished chunked uploads that have been idle for UPLOAD_EXPIRE_AFTER_HOURS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=settings.UPLOAD_EXPIRE_AFTER_HOURS,
+                            help='Idle time after which an unfinished upload is abandoned')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be deleted')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        abandoned = DocumentUpload.objects.filter(status='active', updated_at__lt=cutoff)
+        removed = 0
+        freed = 0
+        for upload in abandoned.iterator():
+            freed += upload.received
+            if not options['dry_run']:
+                # Re-check so an upload that resumed since the query is kept
+                if DocumentUpload.objects.filter(pk=upload.pk, status='active', updated_at__lt=cutoff).delete()[0]:
+                    uploads.discard(upload)
+            removed += 1
+
+        # Part files whose upload row is gone, e.g. after a manual delete
+        orphans = 0
+        temp_dir = Path(settings.UPLOAD_TEMP_DIR)
+        if temp_dir.exists():
+            known = {str(pk) for pk in DocumentUpload.objects.filter(status='active').values_list('pk', flat=True)}
+            for path in temp_dir.glob('*.part'):
+                if path.stem not in known and path.stat().st_mtime < cutoff.timestamp():
+                    orphans += 1
+                    if not options['dry_run']:
+                        path.unlink(missing_ok=True)
+
+        verb = 'Would remove' if options['dry_run'] else 'Removed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {removed} abandoned uploads ({freed} bytes) and {orphans} orphaned part files'
+        ))
@@ -0,0 +1,98 @@
+import gzip
+from collections import Counter, defaultdict
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from website.models import CSCAction, CSCActionDailyRollup
+
+ARCHIVE_FIELDS = ('id', 'form_submission_id', 'csc_user_id', 'action_type', 'action_date', 'notes')
+
+
+class Command(BaseCommand):
+    help = ("Roll old 'viewed' CSC actions up into daily counts and archive old raw actions "
+            "to gzipped NDJSON, deleting the raw rows in bounded batches")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rollup-after-days', type=int, default=settings.CSC_ACTION_ROLLUP_AFTER_DAYS)
+        parser.add_argument('--archive-after-days', type=int, default=settings.CSC_ACTION_ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--archive-dir', default=settings.CSC_ACTION_ARCHIVE_DIR)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many rows would be compacted')
+
+    def handle(self, *args, **options):
+        if options['rollup_after_days'] > options['archive_after_days']:
+            raise CommandError('--rollup-after-days must not be larger than --archive-after-days')
+
+        now = timezone.now()
+        rollup_cutoff = now - timedelta(days=options['rollup_after_days'])
+        archive_cutoff = now - timedelta(days=options['archive_after_days'])
+        archive_dir = Path(options['archive_dir'])
+
+        candidates = CSCAction.objects.filter(
+            Q(action_type='viewed', action_date__lt=rollup_cutoff) | Q(action_date__lt=archive_cutoff)
+        )
+        if options['dry_run']:
+            self.stdout.write(f'{candidates.count()} actions would be compacted')
+            return
+
+        rolled_up = archived = 0
+        last_id = 0
+        while True:
+            rows = list(
+                candidates.filter(id__gt=last_id).order_by('id').values(*ARCHIVE_FIELDS)[:options['batch_size']]
+            )
+            if not rows:
+                break
+            last_id = rows[-1]['id']
+
+            to_archive = [row for row in rows if row['action_date'] < archive_cutoff]
+            to_rollup = [row for row in rows if row['action_type'] == 'viewed']
+            # Archive files are written before the delete commits, so a crash
+            # can at worst leave duplicate archive lines, never lose rows
+            with transaction.atomic():
+                self.archive(archive_dir, to_archive)
+                self.rollup(to_rollup)
+                CSCAction.objects.filter(id__in=[row['id'] for row in rows]).delete()
+            rolled_up += len(to_rollup)
+            archived += len(to_archive)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rolled up {rolled_up} viewed actions, archived {archived} actions to {archive_dir}'
+        ))
+
+    def rollup(self, rows):
+        counts = Counter(
+            (row['form_submission_id'], row['csc_user_id'], row['action_type'],
+             timezone.localtime(row['action_date']).date())
+            for row in rows
+        )
+        for (form_id, user_id, action_type, day), count in counts.items():
+            updated = CSCActionDailyRollup.objects.filter(
+                form_submission_id=form_id, csc_user_id=user_id, action_type=action_type, day=day,
+            ).update(count=F('count') + count)
+            if not updated:
+                CSCActionDailyRollup.objects.create(
+                    form_submission_id=form_id, csc_user_id=user_id, action_type=action_type, day=day, count=count,
+                )
+
+    def archive(self, archive_dir, rows):
+        if not rows:
+            return
+        # One gzip file per month of action_date; appending adds a new gzip
+        # member, which gzip readers treat as one continuous stream
+        by_month = defaultdict(list)
+        for row in rows:
+            by_month[timezone.localtime(row['action_date']).strftime('%Y-%m')].append(row)
+
+        archive_dir.mkdir(parents=True, exist_ok=True)
+        encoder = DjangoJSONEncoder(separators=(',', ':'))
+        for month, month_rows in by_month.items():
+            with gzip.open(archive_dir / f'csc_actions_{month}.ndjson.gz', 'at', encoding='utf-8') as archive:
+                archive.writelines(encoder.encode(row) + '\n' for row in month_rows)
@@ -0,0 +1,73 @@
+import os
+import shutil
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from website.models import ArchivedFormSubmission, DocumentBlob, FormSubmission
+from website.storage import blob_name, hash_file, is_blob_name
+
+
+class Command(BaseCommand):
+    help = 'Move existing form documents into the content-addressed layout, merging identical files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be merged')
+
+    def handle(self, *args, **options):
+        storage = FormSubmission._meta.get_field('document_file').storage
+        dry_run = options['dry_run']
+
+        names = set()
+        for model in (FormSubmission, ArchivedFormSubmission):
+            names.update(
+                model.objects.exclude(document_file='').exclude(document_file__isnull=True)
+                .values_list('document_file', flat=True).distinct()
+            )
+
+        moved = merged = missing = saved = 0
+        for name in sorted(names):
+            if is_blob_name(name):
+                continue
+            if not storage.exists(name):
+                missing += 1
+                self.stderr.write(f'Missing file: {name}')
+                continue
+
+            with storage.open(name, 'rb') as f:
+                digest = hash_file(f)
+            size = storage.size(name)
+            target = blob_name(name, digest)
+            exists = storage.exists(target)
+            if exists:
+                merged += 1
+                saved += size
+            else:
+                moved += 1
+            if dry_run:
+                continue
+
+            # Link rather than move, so the rows can be repointed before the
+            # old name disappears; a crash part way leaves both names valid
+            if not exists:
+                os.makedirs(os.path.dirname(storage.path(target)), exist_ok=True)
+                try:
+                    os.link(storage.path(name), storage.path(target))
+                except OSError:
+                    shutil.copy2(storage.path(name), storage.path(target))
+            DocumentBlob.objects.get_or_create(name=target, defaults={'sha256': digest, 'size': size})
+            with transaction.atomic():
+                refs = FormSubmission.objects.filter(document_file=name).update(document_file=target)
+                refs += ArchivedFormSubmission.objects.filter(document_file=name).update(document_file=target)
+                DocumentBlob.objects.filter(name=target).update(
+                    refcount=F('refcount') + refs, updated_at=timezone.now(),
+                )
+            os.remove(storage.path(name))
+
+        prefix = 'Would move' if dry_run else 'Moved'
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix} {moved} files into the blob store and merged {merged} duplicates '
+            f'({saved} bytes saved); {missing} referenced files were missing'
+        ))
@@ -0,0 +1,48 @@
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from website import exports
+from website.routers import replica_reads
+
+
+class Command(BaseCommand):
+    help = 'Stream FormSubmission or CSCAction rows as CSV or NDJSON, optionally only rows changed since a watermark'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', choices=sorted(exports.EXPORT_SOURCES), default='forms')
+        parser.add_argument('--format', choices=['csv', 'ndjson'], default='csv')
+        parser.add_argument('--output', help='File to write, defaults to stdout')
+        parser.add_argument('--since', help='ISO timestamp; only export rows changed after it')
+        parser.add_argument('--watermark-file',
+                            help='Read --since from this file and store the new watermark in it afterwards')
+        parser.add_argument('--chunk-size', type=int, help='Rows fetched per database round trip')
+        parser.add_argument('--replica', action='store_true', help='Read from the replica database if configured')
+
+    def handle(self, *args, **options):
+        since = options['since']
+        watermark_file = Path(options['watermark_file']) if options['watermark_file'] else None
+        if since is None and watermark_file and watermark_file.exists():
+            since = watermark_file.read_text().strip() or None
+        if since is not None:
+            parsed = parse_datetime(since)
+            if parsed is None:
+                raise CommandError(f'Invalid --since timestamp: {since}')
+            since = parsed
+
+        export = exports.DataExport(options['source'], since=since, chunk_size=options['chunk_size'])
+        output = open(options['output'], 'w', newline='') if options['output'] else sys.stdout
+        try:
+            with replica_reads(use_replica=options['replica']):
+                for chunk in export.iter_format(options['format']):
+                    output.write(chunk)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        if watermark_file and export.watermark is not None:
+            watermark_file.write_text(export.watermark.isoformat())
+        if export.watermark is not None:
+            self.stderr.write(f'Watermark: {export.watermark.isoformat()}')
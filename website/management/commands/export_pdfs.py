@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from website import exports
+from website.forms import ExportFilterForm
+
+
+class Command(BaseCommand):
+    help = 'Write a ZIP of form PDFs matching a status/date/user filter'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Path of the ZIP file to write')
+        parser.add_argument('--status', default='completed',
+                            help='Form status to export, empty for any (default: completed)')
+        parser.add_argument('--from', dest='date_from', help='First submission date, YYYY-MM-DD')
+        parser.add_argument('--to', dest='date_to', help='Last submission date, YYYY-MM-DD')
+        parser.add_argument('--user', help='Only export forms of this username')
+        parser.add_argument('--processes', type=int, help='Number of render processes')
+
+    def handle(self, *args, **options):
+        filter_form = ExportFilterForm({
+            'status': options['status'],
+            'date_from': options['date_from'],
+            'date_to': options['date_to'],
+            'user': options['user'],
+        })
+        if not filter_form.is_valid():
+            raise CommandError(filter_form.errors.as_text())
+
+        forms = exports.filter_forms(**filter_form.cleaned_data)
+        count = forms.count()
+        with open(options['output'], 'wb') as output:
+            for chunk in exports.iter_pdf_zip(forms, processes=options['processes']):
+                output.write(chunk)
+
+        self.stdout.write(self.style.SUCCESS(f'Exported {count} PDFs to {options["output"]}'))
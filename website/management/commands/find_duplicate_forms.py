@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from website.identity import identity_fields
+from website.models import FormSubmission, ArchivedFormSubmission
+
+IDENTITY_FIELDS = ('email_normalized', 'phone_digits', 'identity_hash')
+
+
+class Command(BaseCommand):
+    help = 'Backfill the normalized identity columns and report clusters of forms from the same person'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skip-backfill', action='store_true',
+                            help='Only report, assuming the identity columns are current')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--min-size', type=int, default=2, help='Smallest cluster to report')
+
+    def handle(self, *args, **options):
+        if not options['skip_backfill']:
+            for model in (FormSubmission, ArchivedFormSubmission):
+                updated = self.backfill(model, options['batch_size'])
+                self.stdout.write(f'{model.__name__}: updated identity keys on {updated} rows')
+
+        for field in IDENTITY_FIELDS:
+            self.report(field, options['min_size'])
+
+    def backfill(self, model, batch_size):
+        updated = 0
+        batch = []
+        # bulk_update skips save(), so status counters and timestamps are untouched
+        for form in model.objects.order_by('pk').iterator(chunk_size=batch_size):
+            keys = identity_fields(form)
+            if any(getattr(form, field) != value for field, value in keys.items()):
+                for field, value in keys.items():
+                    setattr(form, field, value)
+                batch.append(form)
+            if len(batch) >= batch_size:
+                model.objects.bulk_update(batch, IDENTITY_FIELDS)
+                updated += len(batch)
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, IDENTITY_FIELDS)
+            updated += len(batch)
+        return updated
+
+    def report(self, field, min_size):
+        # Group across the live and archive tables in one pass, the field
+        # indexes make the per-cluster member lookups below cheap
+        live = FormSubmission._meta.db_table
+        archived = ArchivedFormSubmission._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT key FROM ("
+                f"  SELECT {field} AS key FROM {live} WHERE {field} <> ''"
+                f"  UNION ALL SELECT {field} AS key FROM {archived} WHERE {field} <> ''"
+                f") GROUP BY key HAVING COUNT(*) >= %s ORDER BY COUNT(*) DESC",
+                [min_size],
+            )
+            keys = [row[0] for row in cursor.fetchall()]
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{field}: {len(keys)} clusters'))
+        for key in keys:
+            form_ids = sorted(
+                list(FormSubmission.objects.filter(**{field: key}).values_list('pk', flat=True))
+                + list(ArchivedFormSubmission.objects.filter(**{field: key}).values_list('pk', flat=True))
+            )
+            label = key[:12] if field == 'identity_hash' else key
+            self.stdout.write(f'  {label}: forms {", ".join(f"#{form_id}" for form_id in form_ids)}')
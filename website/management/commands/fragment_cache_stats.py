@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from website import fragments
+
+
+class Command(BaseCommand):
+    help = 'Show dashboard fragment cache hit/miss counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters after printing them')
+        parser.add_argument('--clear', action='store_true', help='Drop every cached fragment')
+
+    def handle(self, *args, **options):
+        if not fragments.is_shared():
+            # This process would only see (and clear) its own empty cache
+            raise CommandError(
+                f'The {settings.FRAGMENT_CACHE_ALIAS!r} cache is local to each process, so the web workers\' '
+                'fragments and counts are out of reach. Set FRAGMENT_CACHE_DIR to share it between processes.'
+            )
+        counts = fragments.stats()
+        lookups = counts['hits'] + counts['misses']
+        ratio = counts['hits'] / lookups if lookups else 0
+        self.stdout.write(
+            f"hits: {counts['hits']}, misses: {counts['misses']}, hit ratio: {ratio:.1%}"
+        )
+        if options['reset']:
+            fragments.reset_stats()
+        if options['clear']:
+            fragments.clear()
+            self.stdout.write(self.style.SUCCESS('Fragment cache cleared'))
@@ -0,0 +1,66 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from website.documents import preview_name
+from website.models import DocumentBlob, FormSubmission
+from website.storage import is_blob_name
+
+
+class Command(BaseCommand):
+    help = 'Delete content-addressed document blobs that no live or archived form references'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=settings.DOCUMENT_GC_GRACE_HOURS,
+                            help='Keep blobs whose references changed more recently than this')
+        parser.add_argument('--recount', action='store_true',
+                            help='Recompute reference counts from the form tables first')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be deleted')
+
+    def handle(self, *args, **options):
+        storage = FormSubmission._meta.get_field('document_file').storage
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        dry_run = options['dry_run']
+
+        if options['recount']:
+            self.stdout.write(f'Recounted references for {DocumentBlob.rebuild()} blobs')
+
+        unreferenced = DocumentBlob.objects.filter(refcount__lte=0, updated_at__lt=cutoff)
+        removed = freed = 0
+        for blob in unreferenced.iterator():
+            if not dry_run:
+                # Re-checked in the DELETE so a blob re-attached meanwhile survives
+                deleted, _ = DocumentBlob.objects.filter(
+                    pk=blob.pk, refcount__lte=0, updated_at__lt=cutoff,
+                ).delete()
+                if not deleted:
+                    continue
+                storage.purge(blob.name)
+                default_storage.delete(preview_name(blob.name))
+            removed += 1
+            freed += blob.size
+
+        # Blob files without a row, e.g. from a save whose transaction rolled back
+        orphans = 0
+        known = set(DocumentBlob.objects.values_list('name', flat=True))
+        for root, _dirs, files in os.walk(storage.location):
+            for filename in files:
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, storage.location).replace(os.sep, '/')
+                if not is_blob_name(name) or name in known:
+                    continue
+                if os.path.getmtime(path) >= cutoff.timestamp():
+                    continue
+                orphans += 1
+                freed += os.path.getsize(path)
+                if not dry_run:
+                    storage.purge(name)
+
+        verb = 'Would remove' if dry_run else 'Removed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {removed} unreferenced blobs and {orphans} orphaned files ({freed} bytes)'
+        ))
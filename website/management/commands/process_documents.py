@@ -0,0 +1,69 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from website import documents
+from website.models import DocumentJob
+
+
+class Command(BaseCommand):
+    help = 'Drain the DocumentJob queue: document metadata, previews and image recompression'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                            help='Number of worker processes (default: CPU count)')
+        parser.add_argument('--batch-size', type=int, default=20,
+                            help='Jobs claimed from the queue per round')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit as soon as the queue is empty')
+
+    def handle(self, *args, **options):
+        if documents.pdfium is None:
+            self.stderr.write(self.style.WARNING(
+                'pypdfium2 is not installed: PDFs get a page count but no preview (pip install -r requirements.txt)'
+            ))
+        stale_after = timedelta(seconds=settings.DOCUMENT_JOB_STALE_AFTER)
+        # spawn keeps the parent's database connections out of the children
+        context = multiprocessing.get_context('spawn')
+        processed = failed = 0
+
+        with ProcessPoolExecutor(options['processes'], mp_context=context, initializer=documents.setup_worker) as pool:
+            try:
+                while True:
+                    jobs = DocumentJob.claim(options['batch_size'], stale_after)
+                    if not jobs:
+                        if options['once']:
+                            break
+                        time.sleep(options['poll_interval'])
+                        continue
+
+                    futures = {}
+                    for job in jobs:
+                        if not job.form_submission.document_file:
+                            job.mark_done()
+                            continue
+                        futures[pool.submit(documents.process, job.form_submission)] = job
+                    for future in as_completed(futures):
+                        job = futures[future]
+                        try:
+                            # Results are written here, so only this process
+                            # updates forms and reference counts
+                            documents.apply_result(future.result())
+                        except Exception as exc:
+                            job.mark_failed(repr(exc), settings.DOCUMENT_JOB_MAX_ATTEMPTS)
+                            failed += 1
+                            self.stderr.write(f'Form {job.form_submission_id}: {exc!r}')
+                        else:
+                            job.mark_done()
+                            processed += 1
+            except KeyboardInterrupt:
+                pass
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} documents, {failed} failed'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from website.models import FormStatusCounter
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-user and global FormStatusCounter rows from FormSubmission'
+
+    def handle(self, *args, **options):
+        # No fragments to clear: their keys include the counter values, see
+        # conditional.forms_version(), so corrected counts miss the cache
+        rows = FormStatusCounter.rebuild()
+        overall = FormStatusCounter.get_for(None)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {rows} counters: {overall.total} forms, {overall.completed} completed, {overall.pending} pending'
+        ))
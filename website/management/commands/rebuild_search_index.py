@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from website import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild and optimize the FTS5 form search index from website_formsubmission'
+
+    def handle(self, *args, **options):
+        search.ensure_triggers()
+        search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt'))
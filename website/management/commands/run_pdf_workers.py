@@ -0,0 +1,58 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from website import pdf
+from website.models import PdfRenderJob
+
+
+class Command(BaseCommand):
+    help = 'Drain the PdfRenderJob queue, rendering PDFs across a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                            help='Number of render processes (default: CPU count)')
+        parser.add_argument('--batch-size', type=int, default=20,
+                            help='Jobs claimed from the queue per round')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit as soon as the queue is empty')
+
+    def handle(self, *args, **options):
+        stale_after = timedelta(seconds=settings.PDF_RENDER_STALE_AFTER)
+        # spawn keeps the parent's database connections out of the children
+        context = multiprocessing.get_context('spawn')
+        rendered = failed = 0
+
+        with ProcessPoolExecutor(options['processes'], mp_context=context, initializer=pdf.setup_worker) as pool:
+            try:
+                while True:
+                    jobs = PdfRenderJob.claim(options['batch_size'], stale_after)
+                    if not jobs:
+                        if options['once']:
+                            break
+                        time.sleep(options['poll_interval'])
+                        continue
+
+                    futures = {pool.submit(pdf.render_to_cache, job.form_submission): job for job in jobs}
+                    for future in as_completed(futures):
+                        job = futures[future]
+                        try:
+                            future.result()
+                        except Exception as exc:
+                            job.mark_failed(repr(exc), settings.PDF_RENDER_MAX_ATTEMPTS)
+                            failed += 1
+                            self.stderr.write(f'Form {job.form_submission_id}: {exc!r}')
+                        else:
+                            job.mark_done()
+                            rendered += 1
+            except KeyboardInterrupt:
+                pass
+
+        self.stdout.write(self.style.SUCCESS(f'Rendered {rendered} PDFs, {failed} failed'))
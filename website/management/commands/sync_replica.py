@@ -0,0 +1,44 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from website.routers import REPLICA
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database into the replica file with the online backup API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float,
+                            help='Keep running and resync every INTERVAL seconds')
+        parser.add_argument('--pages', type=int, default=1024,
+                            help='Pages copied per backup step, lets writers in between steps')
+
+    def handle(self, *args, **options):
+        if REPLICA not in settings.DATABASES:
+            raise CommandError('No replica database is configured (set REPLICA_DATABASE_PATH).')
+        primary = settings.DATABASES['default']['NAME']
+        replica = settings.DATABASES[REPLICA]['NAME']
+
+        # Don't hold Django's own replica connection open while it is rewritten
+        connections[REPLICA].close()
+        while True:
+            started = time.perf_counter()
+            self.sync(primary, replica, options['pages'])
+            self.stdout.write(f'Synced {primary} -> {replica} in {time.perf_counter() - started:.2f}s')
+            if options['interval'] is None:
+                break
+            time.sleep(options['interval'])
+
+    def sync(self, primary, replica, pages):
+        source = sqlite3.connect(primary, timeout=settings.SQLITE_PRAGMAS['busy_timeout'] / 1000)
+        target = sqlite3.connect(replica, timeout=settings.SQLITE_PRAGMAS['busy_timeout'] / 1000)
+        try:
+            # The backup API gives readers of the replica a consistent snapshot
+            source.backup(target, pages=pages)
+        finally:
+            target.close()
+            source.close()
@@ -0,0 +1,142 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.http import content_disposition_header, quote_etag
+
+from .models import DocumentBlob
+from .storage import is_blob_name
+
+# Permission-checked delivery of uploaded documents. Views decide who may see
+# a file; serve() then either hands the transfer to the front proxy
+# (PROTECTED_MEDIA_BACKEND) or streams it from disk itself with Range support.
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def etag_for(field_file):
+    """
+    Strong validator for a stored file: the SHA-256 of a blob in the
+    content-addressed store, otherwise its size and modification time, as
+    legacy uploads and previews can be rewritten under the same name
+    """
+    name = field_file.name
+    if is_blob_name(name):
+        sha256 = DocumentBlob.objects.filter(name=name).values_list('sha256', flat=True).first()
+        if sha256:
+            return quote_etag(sha256)
+    storage = field_file.storage
+    try:
+        size, modified = storage.size(name), storage.get_modified_time(name)
+    except OSError:
+        raise Http404('Document not found.')
+    return quote_etag(f'{size:x}-{int(modified.timestamp() * 1000000):x}')
+
+
+def parse_range(header, size):
+    """
+    Return the inclusive (start, end) byte positions of a single-range Range
+    header; None to send the whole file (absent, malformed or multi-range
+    headers) or False if the range can't be satisfied.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+class _FileRange:
+    """
+    Read-limited view of an open file positioned at the range start. fileno()
+    is passed through so sendfile-capable WSGI servers (gunicorn) still use
+    it; they stop at the Content-Length set on the response.
+    """
+
+    def __init__(self, file, length):
+        self._file = file
+        self._remaining = length
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b''
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self._file.fileno()
+
+    def close(self):
+        self._file.close()
+
+
+def _file_response(request, path, content_type, etag):
+    try:
+        file = open(path, 'rb')
+    except FileNotFoundError:
+        raise Http404('Document not found.')
+    size = os.fstat(file.fileno()).st_size
+
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    if if_range is None or if_range == etag:
+        byte_range = parse_range(request.headers.get('Range'), size)
+
+    if byte_range is False:
+        file.close()
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+    elif byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = byte_range
+        file.seek(start)
+        response = FileResponse(_FileRange(file, end - start + 1), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def serve(request, field_file, filename, as_attachment=False, etag=None):
+    """
+    Response delivering field_file, named `filename` for the browser. etag is
+    the file's etag_for(), if the caller already has it.
+    """
+    name = field_file.name
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    backend = settings.PROTECTED_MEDIA_BACKEND
+
+    if backend == 'x-accel-redirect':
+        # nginx serves the file, Range requests included, from an internal location
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.PROTECTED_MEDIA_INTERNAL_URL + quote(name)
+    elif backend == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = field_file.storage.path(name)
+    elif not backend:
+        response = _file_response(request, field_file.storage.path(name), content_type, etag or etag_for(field_file))
+    else:
+        raise ImproperlyConfigured(f'Unknown PROTECTED_MEDIA_BACKEND {backend!r}')
+
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    return response
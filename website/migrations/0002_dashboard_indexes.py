@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cscaction',
+            index=models.Index(fields=['form_submission', '-action_date'], name='cscaction_form_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='formsubmission',
+            index=models.Index(fields=['status', '-submission_date'], name='form_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='formsubmission',
+            index=models.Index(fields=['user', '-submission_date'], name='form_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='formsubmission',
+            index=models.Index(condition=models.Q(('status', 'completed'), _negated=True), fields=['-submission_date'], name='form_pending_date_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:59
+
+import django.db.models.deletion
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def populate_counters(apps, schema_editor):
+    FormSubmission = apps.get_model('website', 'FormSubmission')
+    FormStatusCounter = apps.get_model('website', 'FormStatusCounter')
+    per_user = (
+        FormSubmission.objects.order_by()
+        .values('user')
+        .annotate(total=Count('pk'), completed=Count('pk', filter=Q(status='completed')))
+    )
+    counters = [
+        FormStatusCounter(user_id=row['user'], total=row['total'], completed=row['completed'])
+        for row in per_user
+    ]
+    counters.append(FormStatusCounter(
+        user=None,
+        total=sum(c.total for c in counters),
+        completed=sum(c.completed for c in counters),
+    ))
+    FormStatusCounter.objects.bulk_create(counters)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0003_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FormStatusCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.IntegerField(default=0)),
+                ('completed', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(django.db.models.functions.comparison.Coalesce('user', models.Value(0)), name='formstatuscounter_scope_unique')],
+            },
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
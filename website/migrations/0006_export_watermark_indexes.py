@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0005_pdfrenderjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cscaction',
+            index=models.Index(fields=['action_date', 'id'], name='cscaction_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='formsubmission',
+            index=models.Index(fields=['last_updated', 'form_id'], name='form_last_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0006_export_watermark_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CSCActionDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action_type', models.CharField(choices=[('viewed', 'Viewed'), ('edited', 'Edited'), ('submitted', 'Submitted'), ('commented', 'Commented')], max_length=20)),
+                ('day', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('csc_user', models.ForeignKey(limit_choices_to={'user_type': 'csc'}, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('form_submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='csc_action_rollups', to='website.formsubmission')),
+            ],
+            options={
+                'ordering': ['-day'],
+                'constraints': [models.UniqueConstraint(fields=('form_submission', 'csc_user', 'action_type', 'day'), name='cscaction_rollup_unique')],
+            },
+        ),
+    ]
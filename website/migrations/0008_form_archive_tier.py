@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:05
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0007_cscactiondailyrollup'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cscactiondailyrollup',
+            name='form_submission',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='csc_action_rollups', to='website.formsubmission'),
+        ),
+        migrations.CreateModel(
+            name='ArchivedFormSubmission',
+            fields=[
+                ('form_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('full_name', models.CharField(max_length=100)),
+                ('email', models.EmailField(max_length=254)),
+                ('phone_number', models.CharField(max_length=15)),
+                ('address', models.TextField()),
+                ('date_of_birth', models.DateField()),
+                ('occupation', models.CharField(max_length=100)),
+                ('purpose', models.TextField()),
+                ('emergency_contact_name', models.CharField(blank=True, max_length=100, null=True)),
+                ('emergency_contact_phone', models.CharField(blank=True, max_length=15, null=True)),
+                ('previous_applications', models.BooleanField(default=False)),
+                ('additional_notes', models.TextField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('submitted', 'Submitted'), ('re-submitted', 'Re-submitted'), ('underprocess', 'Under Process'), ('action-needed', 'Action Needed'), ('completed', 'Completed')], max_length=20)),
+                ('submission_date', models.DateTimeField()),
+                ('last_updated', models.DateTimeField()),
+                ('comments', models.TextField(blank=True, null=True)),
+                ('document_file', models.FileField(blank=True, null=True, upload_to='form_documents/')),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_form_submissions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-submission_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedCSCAction',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('action_type', models.CharField(choices=[('viewed', 'Viewed'), ('edited', 'Edited'), ('submitted', 'Submitted'), ('commented', 'Commented')], max_length=20)),
+                ('action_date', models.DateTimeField()),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('csc_user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('form_submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='csc_actions', to='website.archivedformsubmission')),
+            ],
+            options={
+                'ordering': ['-action_date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedformsubmission',
+            index=models.Index(fields=['user', '-submission_date'], name='archived_form_user_date_idx'),
+        ),
+    ]
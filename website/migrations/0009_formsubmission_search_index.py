@@ -0,0 +1,50 @@
+from django.db import migrations
+
+from website import search
+
+# FTS5 index over the searchable FormSubmission text columns. It is an
+# external-content table (the text lives only in website_formsubmission) kept
+# in sync by triggers, so every save, queryset update and delete is covered.
+# The trigger SQL lives in website.search, which re-creates it after migrate.
+CREATE_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE {search.FTS_TABLE} USING fts5(
+        {search.SEARCH_COLUMNS},
+        content='website_formsubmission',
+        content_rowid='form_id',
+        tokenize='unicode61'
+    )
+    """,
+    *search.TRIGGER_SQL,
+    search.REBUILD_SQL,
+]
+
+DROP_SQL = [
+    *(f'DROP TRIGGER IF EXISTS {name}' for name in reversed(search.TRIGGER_NAMES)),
+    f'DROP TABLE IF EXISTS {search.FTS_TABLE}',
+]
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in CREATE_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0008_form_archive_tier'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:07
+
+from django.db import migrations, models
+
+from website.identity import identity_fields
+
+
+def backfill_identity_keys(apps, schema_editor):
+    for model_name in ('FormSubmission', 'ArchivedFormSubmission'):
+        model = apps.get_model('website', model_name)
+        forms = []
+        for form in model.objects.iterator(chunk_size=1000):
+            for field, value in identity_fields(form).items():
+                setattr(form, field, value)
+            forms.append(form)
+        model.objects.bulk_update(forms, ['email_normalized', 'phone_digits', 'identity_hash'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0009_formsubmission_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedformsubmission',
+            name='email_normalized',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=254),
+        ),
+        migrations.AddField(
+            model_name='archivedformsubmission',
+            name='identity_hash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='archivedformsubmission',
+            name='phone_digits',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=15),
+        ),
+        migrations.AddField(
+            model_name='formsubmission',
+            name='email_normalized',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=254),
+        ),
+        migrations.AddField(
+            model_name='formsubmission',
+            name='identity_hash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='formsubmission',
+            name='phone_digits',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=15),
+        ),
+        migrations.RunPython(backfill_identity_keys, migrations.RunPython.noop),
+    ]
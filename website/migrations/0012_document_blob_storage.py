@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:19
+
+import django.utils.timezone
+import website.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0011_document_upload'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedformsubmission',
+            name='document_file',
+            field=models.FileField(blank=True, null=True, storage=website.storage.document_storage, upload_to='form_documents/'),
+        ),
+        migrations.AlterField(
+            model_name='formsubmission',
+            name='document_file',
+            field=models.FileField(blank=True, null=True, storage=website.storage.document_storage, upload_to='form_documents/'),
+        ),
+        migrations.CreateModel(
+            name='DocumentBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('size', models.PositiveBigIntegerField()),
+                ('refcount', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['refcount', 'updated_at'], name='blob_refcount_updated_idx')],
+            },
+        ),
+    ]
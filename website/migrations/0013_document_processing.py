@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:22
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0012_document_blob_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedformsubmission',
+            name='document_metadata',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='archivedformsubmission',
+            name='document_preview',
+            field=models.FileField(blank=True, editable=False, null=True, upload_to='form_previews/'),
+        ),
+        migrations.AddField(
+            model_name='formsubmission',
+            name='document_metadata',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='formsubmission',
+            name='document_preview',
+            field=models.FileField(blank=True, editable=False, null=True, upload_to='form_previews/'),
+        ),
+        migrations.CreateModel(
+            name='DocumentJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('claim_token', models.CharField(blank=True, default='', max_length=32)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('form_submission', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='document_job', to='website.formsubmission')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='docjob_status_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:27
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0013_document_processing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FormClaim',
+            fields=[
+                ('form_submission', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='claim', serialize=False, to='website.formsubmission')),
+                ('claim_token', models.CharField(max_length=32)),
+                ('claimed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('expires_at', models.DateTimeField()),
+                ('csc_user', models.ForeignKey(limit_choices_to={'user_type': 'csc'}, on_delete=django.db.models.deletion.CASCADE, related_name='form_claims', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['csc_user', 'expires_at'], name='claim_user_expires_idx'), models.Index(fields=['expires_at'], name='claim_expires_idx')],
+            },
+        ),
+    ]
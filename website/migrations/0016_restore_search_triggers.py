@@ -0,0 +1,30 @@
+from django.db import migrations
+
+from website import search
+
+# The AddField migrations 0010, 0013 and 0015 rebuild website_formsubmission on
+# SQLite (copy to a new table, drop the old one, rename), and dropping the old
+# table drops its triggers with it. Put the FTS sync triggers from 0009 back and
+# rebuild the index from the table, since writes since then weren't indexed.
+
+
+def restore_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for name in search.TRIGGER_NAMES:
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {name}')
+    for sql in search.TRIGGER_SQL:
+        schema_editor.execute(sql)
+    schema_editor.execute(search.REBUILD_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0015_formsubmission_version'),
+    ]
+
+    operations = [
+        # Reversing leaves the triggers in place; 0009's reverse drops them
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+    ]
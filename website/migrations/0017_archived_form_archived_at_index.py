@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0016_restore_search_triggers'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='archivedformsubmission',
+            index=models.Index(fields=['archived_at'], name='archived_form_archived_idx'),
+        ),
+    ]
@@ -1,7 +1,18 @@
-from django.db import models
+import uuid
+
+from django.db import models, transaction
+from django.db.models import Case, F, Q, Count, Value, When
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 
+from .identity import identity_fields
+from .storage import document_storage
+
+
+class VersionConflict(Exception):
+    """A compare-and-swap save found the row at a different version than expected"""
+
 # Custom User model extending Django's AbstractUser
 class CustomUser(AbstractUser):
     USER_TYPES = [
@@ -24,6 +35,14 @@ class FormSubmission(models.Model):
         ('action-needed', 'Action Needed'),
         ('completed', 'Completed'),
     ]
+    # Statuses a CSC agent may move a form to from each status in bulk, see bulk.py
+    STATUS_TRANSITIONS = {
+        'submitted': ('underprocess', 'action-needed', 'completed'),
+        're-submitted': ('underprocess', 'action-needed', 'completed'),
+        'underprocess': ('action-needed', 'completed'),
+        'action-needed': ('underprocess', 'completed'),
+        'completed': (),
+    }
     
     # Form identification
     form_id = models.AutoField(primary_key=True)
@@ -49,15 +68,151 @@ class FormSubmission(models.Model):
     submission_date = models.DateTimeField(default=timezone.now)
     last_updated = models.DateTimeField(auto_now=True)
     comments = models.TextField(blank=True, null=True)
+    # Incremented by every write; edits compare-and-swap on it, see save_if_version()
+    version = models.PositiveIntegerField(default=1, editable=False)
     
     # File handling
-    document_file = models.FileField(upload_to='form_documents/', blank=True, null=True)
+    document_file = models.FileField(upload_to='form_documents/', storage=document_storage, blank=True, null=True)
+    # Filled in by the document post-processing worker, see documents.py
+    document_metadata = models.JSONField(default=dict, blank=True, editable=False)
+    document_preview = models.FileField(upload_to='form_previews/', blank=True, null=True, editable=False)
+    
+    # Normalized identity keys for duplicate detection, see identity.py
+    email_normalized = models.CharField(max_length=254, blank=True, default='', editable=False, db_index=True)
+    phone_digits = models.CharField(max_length=15, blank=True, default='', editable=False, db_index=True)
+    identity_hash = models.CharField(max_length=64, blank=True, default='', editable=False, db_index=True)
     
     class Meta:
         ordering = ['-submission_date']
+        indexes = [
+            # form_id breaks ties for keyset pagination, see pagination.py
+            models.Index(fields=['status', '-submission_date', '-form_id'], name='form_status_date_idx'),
+            models.Index(fields=['user', '-submission_date', '-form_id'], name='form_user_date_idx'),
+            # Partial index covering the CSC pending queue only
+            models.Index(
+                fields=['-submission_date', '-form_id'],
+                name='form_pending_date_idx',
+                condition=~models.Q(status='completed'),
+            ),
+            # Incremental exports walk rows changed since a watermark
+            models.Index(fields=['last_updated', 'form_id'], name='form_last_updated_idx'),
+        ]
+    
+    is_archived = False
     
     def __str__(self):
         return f"Form {self.form_id} - {self.full_name} ({self.status})"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_counted_state()
+        return instance
+    
+    def _remember_counted_state(self):
+        # Snapshot of the fields FormStatusCounter depends on, as last read/written
+        deferred = self.get_deferred_fields()
+        self._counted_user_id = None if 'user_id' in deferred else self.user_id
+        self._counted_status = None if 'status' in deferred else self.status
+        self._counted_document = None if 'document_file' in deferred else (self.document_file.name or '')
+    
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        for field, value in identity_fields(self).items():
+            setattr(self, field, value)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'full_name', 'email', 'phone_number', 'date_of_birth'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'email_normalized', 'phone_digits', 'identity_hash'}
+        expected_version = self.__dict__.get('_expected_version')
+        if not adding:
+            # Move the version on in the database itself, so writers that
+            # don't compare-and-swap still invalidate edits read before them
+            self.version = F('version') + 1 if expected_version is None else expected_version + 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'version'}
+        with transaction.atomic(using=kwargs.get('using')):
+            try:
+                super().save(*args, **kwargs)
+            except VersionConflict:
+                self.version = expected_version
+                raise
+            finally:
+                if isinstance(self.version, F):
+                    # Reloaded on next access
+                    del self.__dict__['version']
+            if adding:
+                FormStatusCounter.record_added(self.user_id, self.status)
+            elif self.__dict__.get('_counted_status') is not None:
+                FormStatusCounter.record_changed(
+                    self._counted_user_id, self._counted_status,
+                    self.user_id, self.status,
+                )
+            saved_document = update_fields is None or 'document_file' in update_fields
+            if saved_document and 'document_file' not in self.get_deferred_fields():
+                previous = '' if adding else self.__dict__.get('_counted_document')
+                if previous is not None and previous != (self.document_file.name or ''):
+                    DocumentBlob.release(previous)
+                    DocumentBlob.retain(self.document_file.name)
+        self._remember_counted_state()
+    
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        expected_version = self.__dict__.get('_expected_version')
+        if expected_version is None:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+        # UPDATE ... WHERE version = expected; nothing matched means someone
+        # else saved first (or the form is gone), never fall back to an INSERT
+        base_qs = base_qs.filter(version=expected_version)
+        if not super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update):
+            raise VersionConflict(f"Form {pk_val} is no longer at version {expected_version}")
+        return True
+    
+    def save_if_version(self, expected_version, update_fields=None):
+        """
+        Compare-and-swap save: write update_fields (and last_updated) only if
+        the row is still at expected_version. Raises VersionConflict, having
+        written nothing, if the form was saved since.
+        """
+        if update_fields is not None:
+            update_fields = set(update_fields) | {'last_updated'}
+        self._expected_version = expected_version
+        try:
+            self.save(update_fields=update_fields)
+        finally:
+            del self._expected_version
+    
+    @classmethod
+    def mark_completed(cls, form_id):
+        """
+        Complete a form with a single conditional UPDATE and no read first.
+        Returns the form's user id, or None if the form doesn't exist or is
+        already completed.
+        """
+        with transaction.atomic():
+            updated = cls.objects.filter(form_id=form_id).exclude(status='completed').update(
+                status='completed', version=F('version') + 1, last_updated=timezone.now(),
+            )
+            if not updated:
+                return None
+            # The excluded status guarantees this was a pending form
+            user_id = cls.objects.filter(form_id=form_id).values_list('user_id', flat=True).get()
+            FormStatusCounter.record_changed(user_id, None, user_id, 'completed')
+        return user_id
+    
+    def find_previous_submissions(self, limit=20):
+        """Other live and archived forms sharing this form's email, phone or name and date of birth"""
+        matches = []
+        for model in (FormSubmission, ArchivedFormSubmission):
+            matches.extend(model.objects.filter(identity_match_q(self)).exclude(pk=self.pk)[:limit])
+        matches.sort(key=lambda form: form.submission_date, reverse=True)
+        return matches[:limit]
+    
+def identity_match_q(form):
+    """Q matching forms with any of form's non-empty identity keys"""
+    query = Q(pk__in=[])
+    for field, value in identity_fields(form).items():
+        if value:
+            query |= Q(**{field: value})
+    return query
 
 # CSC Actions log
 class CSCAction(models.Model):
@@ -76,6 +231,460 @@ class CSCAction(models.Model):
     
     class Meta:
         ordering = ['-action_date']
+        indexes = [
+            models.Index(fields=['form_submission', '-action_date'], name='cscaction_form_date_idx'),
+            models.Index(fields=['action_date', 'id'], name='cscaction_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.csc_user.username} {self.action_type} form {self.form_submission.form_id}"
+
+# Daily per-user, per-form action counts that replace raw CSCAction rows
+# once `manage.py compact_csc_actions` has rolled them up
+class CSCActionDailyRollup(models.Model):
+    # No database constraint so rollups outlive forms moved to the archive tier,
+    # where form_submission_id points at an ArchivedFormSubmission instead.
+    # Deleting the form outright removes them in signals.py.
+    form_submission = models.ForeignKey(
+        FormSubmission, on_delete=models.DO_NOTHING, db_constraint=False, related_name='csc_action_rollups',
+    )
+    csc_user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, limit_choices_to={'user_type': 'csc'})
+    action_type = models.CharField(max_length=20, choices=CSCAction.ACTION_TYPES)
+    day = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['-day']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['form_submission', 'csc_user', 'action_type', 'day'],
+                name='cscaction_rollup_unique',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.csc_user.username} {self.action_type} form {self.form_submission_id} x{self.count} on {self.day}"
+
+# Denormalized form counts, one row per user plus a global row (user=None).
+# Maintained by FormSubmission.save() and the delete signal handlers in
+# signals.py; `manage.py rebuild_counters` recomputes them from scratch if they
+# ever drift (e.g. after a raw queryset update).
+class FormStatusCounter(models.Model):
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    total = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            # One row per user and exactly one global row
+            models.UniqueConstraint(Coalesce('user', Value(0)), name='formstatuscounter_scope_unique'),
+        ]
+    
+    def __str__(self):
+        scope = self.user.username if self.user_id else 'global'
+        return f"{scope}: {self.completed}/{self.total} completed"
+    
+    @property
+    def pending(self):
+        return self.total - self.completed
+    
+    @classmethod
+    def get_for(cls, user=None):
+        """Single-row read of the counters for a user, or the global row if user is None"""
+        counter = cls.objects.filter(user=user).first()
+        return counter or cls(user=user)
+    
+    @classmethod
+    def _apply(cls, user_id, total=0, completed=0):
+        if not total and not completed:
+            return
+        for scope in (user_id, None):
+            updated = cls.objects.filter(user_id=scope).update(
+                total=F('total') + total,
+                completed=F('completed') + completed,
+            )
+            # Only additions create a missing row; on removal it is already
+            # gone, e.g. deleted along with its user
+            if not updated and total >= 0:
+                counter, _ = cls.objects.get_or_create(user_id=scope)
+                cls.objects.filter(pk=counter.pk).update(
+                    total=F('total') + total,
+                    completed=F('completed') + completed,
+                )
+    
+    @classmethod
+    def record_added(cls, user_id, status):
+        cls._apply(user_id, total=1, completed=int(status == 'completed'))
+    
+    @classmethod
+    def record_removed(cls, user_id, status):
+        cls._apply(user_id, total=-1, completed=-int(status == 'completed'))
+    
+    @classmethod
+    def record_changed(cls, old_user_id, old_status, new_user_id, new_status):
+        if old_user_id != new_user_id:
+            cls.record_removed(old_user_id, old_status)
+            cls.record_added(new_user_id, new_status)
+        elif (old_status == 'completed') != (new_status == 'completed'):
+            cls._apply(new_user_id, completed=1 if new_status == 'completed' else -1)
+    
+    @classmethod
+    def record_completed_changes(cls, deltas):
+        """
+        Apply {user_id: change in completed forms} for many users at once: one
+        CASE UPDATE over their rows and one for the global row.
+        """
+        deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        # Rows normally exist from the forms' creation; create any missing ones
+        cls.objects.bulk_create([cls(user_id=user_id) for user_id in deltas], ignore_conflicts=True)
+        cls.objects.filter(user_id__in=deltas).update(completed=F('completed') + Case(
+            *[When(user_id=user_id, then=Value(delta)) for user_id, delta in deltas.items()],
+            default=Value(0),
+        ))
+        cls._apply_global(completed=sum(deltas.values()))
+    
+    @classmethod
+    def _apply_global(cls, completed):
+        if not cls.objects.filter(user__isnull=True).update(completed=F('completed') + completed):
+            counter, _ = cls.objects.get_or_create(user=None)
+            cls.objects.filter(pk=counter.pk).update(completed=F('completed') + completed)
+    
+    @classmethod
+    def rebuild(cls):
+        """Recompute every counter from live and archived forms; returns the number of rows written"""
+        counters = {}
+        for model in (FormSubmission, ArchivedFormSubmission):
+            per_user = (
+                model.objects.order_by()
+                .values('user')
+                .annotate(total=Count('pk'), completed=Count('pk', filter=Q(status='completed')))
+            )
+            for row in per_user:
+                counter = counters.setdefault(row['user'], cls(user_id=row['user']))
+                counter.total += row['total']
+                counter.completed += row['completed']
+        counters = list(counters.values())
+        counters.append(cls(
+            user=None,
+            total=sum(c.total for c in counters),
+            completed=sum(c.completed for c in counters),
+        ))
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(counters)
+        return len(counters)
+
+
+class DocumentBlob(models.Model):
+    """
+    A file in website.storage.ContentAddressedStorage. refcount is the number
+    of live and archived forms whose document_file names it, kept up to date by
+    FormSubmission.save() and signals.py; `manage.py gc_documents` purges blobs once
+    it drops to zero.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField()
+    refcount = models.IntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    # Last reference change; gc_documents leaves recently touched blobs alone
+    updated_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['refcount', 'updated_at'], name='blob_refcount_updated_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.refcount} refs)"
+    
+    @classmethod
+    def _adjust(cls, name, delta):
+        # Legacy, non content-addressed names have no row and are skipped
+        if name:
+            cls.objects.filter(name=name).update(refcount=F('refcount') + delta, updated_at=timezone.now())
+    
+    @classmethod
+    def retain(cls, name):
+        cls._adjust(name, 1)
+    
+    @classmethod
+    def release(cls, name):
+        cls._adjust(name, -1)
+    
+    @classmethod
+    def rebuild(cls):
+        """Recount references from live and archived forms; returns the number of blobs"""
+        counts = {}
+        for model in (FormSubmission, ArchivedFormSubmission):
+            rows = (
+                model.objects.exclude(document_file='').exclude(document_file__isnull=True)
+                .order_by().values('document_file').annotate(refs=Count('pk'))
+            )
+            for row in rows:
+                counts[row['document_file']] = counts.get(row['document_file'], 0) + row['refs']
+        blobs = list(cls.objects.all())
+        for blob in blobs:
+            blob.refcount = counts.get(blob.name, 0)
+        with transaction.atomic():
+            cls.objects.bulk_update(blobs, ['refcount'], batch_size=500)
+        return len(blobs)
+
+# Queue of PDF renders for the `run_pdf_workers` command, one row per form
+class QueuedJob(models.Model):
+    """
+    A per-form background job drained by a worker command. Subclasses add a
+    OneToOneField `form_submission` and their own indexes.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    claim_token = models.CharField(max_length=32, blank=True, default='')
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+    
+    class Meta:
+        abstract = True
+    
+    @property
+    def is_active(self):
+        return self.status in ('pending', 'running')
+    
+    @classmethod
+    def enqueue(cls, form_submission, force=False):
+        """Queue a job; unless force is set an already queued or running job is left alone"""
+        job, created = cls.objects.get_or_create(form_submission=form_submission)
+        if created or (job.is_active and not force):
+            return job
+        cls.objects.filter(pk=job.pk).update(
+            status='pending', attempts=0, claim_token='', created_at=timezone.now(), error=None,
+        )
+        job.refresh_from_db()
+        return job
+    
+    @classmethod
+    def enqueue_many(cls, form_ids):
+        """enqueue(force=True) for many forms in two statements"""
+        cls.objects.bulk_create([cls(form_submission_id=pk) for pk in form_ids], ignore_conflicts=True)
+        cls.objects.filter(form_submission_id__in=form_ids).update(
+            status='pending', attempts=0, claim_token='', created_at=timezone.now(), error=None,
+        )
+    
+    @classmethod
+    def claim(cls, limit, stale_after):
+        """
+        Atomically claim up to `limit` jobs, including running jobs whose worker
+        has been silent for longer than `stale_after`. The conditional UPDATE
+        means concurrent workers can never claim the same job twice.
+        """
+        now = timezone.now()
+        claimable = Q(status='pending') | Q(status='running', started_at__lt=now - stale_after)
+        ids = list(cls.objects.filter(claimable).order_by('created_at').values_list('pk', flat=True)[:limit])
+        if not ids:
+            return []
+        token = uuid.uuid4().hex
+        cls.objects.filter(claimable, pk__in=ids).update(
+            status='running', claim_token=token, started_at=now, attempts=F('attempts') + 1,
+        )
+        return list(cls.objects.filter(claim_token=token, status='running').select_related('form_submission'))
+    
+    def mark_done(self):
+        # A job re-queued while running keeps its pending status and runs again
+        type(self).objects.filter(pk=self.pk, claim_token=self.claim_token, status='running').update(
+            status='done', finished_at=timezone.now(), error=None,
+        )
+    
+    def mark_failed(self, error, max_attempts):
+        type(self).objects.filter(pk=self.pk, claim_token=self.claim_token, status='running').update(
+            status='failed' if self.attempts >= max_attempts else 'pending',
+            finished_at=timezone.now(),
+            error=error,
+        )
+
+
+class PdfRenderJob(QueuedJob):
+    form_submission = models.OneToOneField(FormSubmission, on_delete=models.CASCADE, related_name='pdf_job')
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='pdfjob_status_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"PDF job for form {self.form_submission_id} ({self.status})"
+
+
+class DocumentJob(QueuedJob):
+    """Post-processing of a form's document_file, see website/documents.py"""
+    form_submission = models.OneToOneField(FormSubmission, on_delete=models.CASCADE, related_name='document_job')
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='docjob_status_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Document job for form {self.form_submission_id} ({self.status})"
+
+
+class FormClaim(models.Model):
+    """
+    A CSC agent's lease on a pending form, see website/workqueue.py. A claim
+    whose expires_at has passed no longer counts and is taken over by the
+    next agent to claim the form.
+    """
+    form_submission = models.OneToOneField(
+        FormSubmission, on_delete=models.CASCADE, primary_key=True, related_name='claim',
+    )
+    csc_user = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name='form_claims', limit_choices_to={'user_type': 'csc'},
+    )
+    claim_token = models.CharField(max_length=32)
+    claimed_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['csc_user', 'expires_at'], name='claim_user_expires_idx'),
+            models.Index(fields=['expires_at'], name='claim_expires_idx'),
+        ]
+    
+    @property
+    def is_active(self):
+        return self.expires_at > timezone.now()
+    
+    def __str__(self):
+        return f"Form {self.form_submission_id} claimed by {self.csc_user.username}"
+
+
+class DocumentUpload(models.Model):
+    """
+    A chunked, resumable document upload. Chunks are appended to a temp file
+    under UPLOAD_TEMP_DIR (see website/uploads.py) and the finished file is
+    attached to a FormSubmission on finalize.
+    """
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('complete', 'Complete'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='document_uploads')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
+    # Held while a chunk is being written so two requests can't write the same offset
+    lock_token = models.CharField(max_length=32, blank=True, default='')
+    locked_at = models.DateTimeField(blank=True, null=True)
+    sha256 = models.CharField(max_length=64, blank=True, default='')
+    form_submission = models.ForeignKey(
+        FormSubmission, on_delete=models.SET_NULL, blank=True, null=True, related_name='document_uploads',
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'updated_at'], name='upload_status_updated_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Upload {self.id} of {self.filename} ({self.received}/{self.size} bytes)"
+    
+    @property
+    def is_complete(self):
+        return self.status == 'complete'
+    
+    def lock(self, offset, stale_after):
+        """
+        Claim the upload for writing the chunk at `offset`. The conditional
+        UPDATE fails if another request holds a live lock or the offset is not
+        where the upload currently ends. Returns the lock token or None.
+        """
+        now = timezone.now()
+        token = uuid.uuid4().hex
+        claimed = DocumentUpload.objects.filter(
+            Q(lock_token='') | Q(locked_at__lt=now - stale_after),
+            pk=self.pk, status='active', received=offset,
+        ).update(lock_token=token, locked_at=now)
+        return token if claimed else None
+    
+    def unlock(self, token, received=None):
+        """Release the lock, recording the new end of the upload if given"""
+        values = {'lock_token': '', 'locked_at': None, 'updated_at': timezone.now()}
+        if received is not None:
+            values['received'] = received
+        return DocumentUpload.objects.filter(pk=self.pk, lock_token=token).update(**values)
+
+
+# Archive tier for completed forms, filled by `manage.py archive_forms`.
+# Rows keep their original primary keys so archived form_ids still resolve
+# through website.archive.get_form_submission().
+class ArchivedFormSubmission(models.Model):
+    form_id = models.IntegerField(primary_key=True)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='archived_form_submissions')
+    
+    full_name = models.CharField(max_length=100)
+    email = models.EmailField()
+    phone_number = models.CharField(max_length=15)
+    address = models.TextField()
+    date_of_birth = models.DateField()
+    occupation = models.CharField(max_length=100)
+    purpose = models.TextField()
+    
+    emergency_contact_name = models.CharField(max_length=100, blank=True, null=True)
+    emergency_contact_phone = models.CharField(max_length=15, blank=True, null=True)
+    previous_applications = models.BooleanField(default=False)
+    additional_notes = models.TextField(blank=True, null=True)
+    
+    status = models.CharField(max_length=20, choices=FormSubmission.STATUS_CHOICES)
+    submission_date = models.DateTimeField()
+    last_updated = models.DateTimeField()
+    comments = models.TextField(blank=True, null=True)
+    document_file = models.FileField(upload_to='form_documents/', storage=document_storage, blank=True, null=True)
+    document_metadata = models.JSONField(default=dict, blank=True, editable=False)
+    document_preview = models.FileField(upload_to='form_previews/', blank=True, null=True, editable=False)
+    
+    email_normalized = models.CharField(max_length=254, blank=True, default='', editable=False, db_index=True)
+    phone_digits = models.CharField(max_length=15, blank=True, default='', editable=False, db_index=True)
+    identity_hash = models.CharField(max_length=64, blank=True, default='', editable=False, db_index=True)
+    
+    archived_at = models.DateTimeField(default=timezone.now)
+    
+    is_archived = True
+    
+    class Meta:
+        ordering = ['-submission_date']
+        indexes = [
+            models.Index(fields=['user', '-submission_date'], name='archived_form_user_date_idx'),
+            # Newest archiving run, part of the dashboards' version, see conditional.py
+            models.Index(fields=['archived_at'], name='archived_form_archived_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Archived form {self.form_id} - {self.full_name} ({self.status})"
+
+class ArchivedCSCAction(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    form_submission = models.ForeignKey(ArchivedFormSubmission, on_delete=models.CASCADE, related_name='csc_actions')
+    csc_user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='+')
+    action_type = models.CharField(max_length=20, choices=CSCAction.ACTION_TYPES)
+    action_date = models.DateTimeField()
+    notes = models.TextField(blank=True, null=True)
+    
+    class Meta:
+        ordering = ['-action_date']
+    
+    def __str__(self):
+        return f"{self.csc_user.username} {self.action_type} archived form {self.form_submission_id}"
@@ -0,0 +1,123 @@
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+# Keyset (cursor) pagination for FormSubmission lists ordered newest first.
+# Pages are addressed by an opaque token holding the (submission_date, form_id)
+# of the boundary row, so every page is a single indexed range query with no
+# OFFSET and no COUNT(*).
+
+def encode_cursor(form, direction):
+    payload = json.dumps([direction, form.submission_date.isoformat(), form.form_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return (direction, submission_date, form_id) or None for a bad token"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        direction, submission_date, form_id = json.loads(base64.urlsafe_b64decode(padded))
+        submission_date = parse_datetime(submission_date)
+    except (ValueError, TypeError):
+        return None
+    if direction not in ('next', 'prev') or submission_date is None or not isinstance(form_id, int):
+        return None
+    return direction, submission_date, form_id
+
+
+class CursorPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def _sort_key(row):
+    if isinstance(row, dict):
+        return row['submission_date'], row['form_id']
+    return row.submission_date, row.form_id
+
+
+class CursorPaginator:
+    def __init__(self, queryset, per_page, row_class=None):
+        # A list of querysets is paged as one list, merged newest first (e.g.
+        # live and archived forms, whose form_ids never collide); each page
+        # is still one indexed range query per queryset
+        self.querysets = list(queryset) if isinstance(queryset, (list, tuple)) else [queryset]
+        self.per_page = per_page
+        # Wraps each row of a values() queryset, e.g. queries.FormRow
+        self.row_class = row_class
+
+    def _fetch(self, conditions, ordering):
+        rows = []
+        for queryset in self.querysets:
+            rows.extend(queryset.filter(*conditions).order_by(*ordering)[:self.per_page + 1])
+        if len(self.querysets) > 1:
+            rows.sort(key=_sort_key, reverse=ordering[0].startswith('-'))
+            rows = rows[:self.per_page + 1]
+        if self.row_class is not None:
+            rows = [self.row_class(**row) for row in rows]
+        return rows
+
+    def get_page(self, cursor=None):
+        """Return a CursorPage, falling back to the first page on a bad cursor"""
+        decoded = decode_cursor(cursor) if cursor else None
+        if decoded is None:
+            return self._page_after(None)
+        direction, submission_date, form_id = decoded
+        if direction == 'prev':
+            return self._page_before(submission_date, form_id)
+        return self._page_after((submission_date, form_id))
+
+    def _page_after(self, key):
+        conditions = ()
+        if key is not None:
+            submission_date, form_id = key
+            # The leading submission_date bound keeps this an index range seek
+            conditions = (
+                Q(submission_date__lte=submission_date),
+                Q(submission_date__lt=submission_date) | Q(form_id__lt=form_id),
+            )
+        rows = self._fetch(conditions, ('-submission_date', '-form_id'))
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return CursorPage(
+            rows,
+            next_cursor=encode_cursor(rows[-1], 'next') if has_next else None,
+            previous_cursor=encode_cursor(rows[0], 'prev') if key is not None and rows else None,
+        )
+
+    def _page_before(self, submission_date, form_id):
+        conditions = (
+            Q(submission_date__gte=submission_date),
+            Q(submission_date__gt=submission_date) | Q(form_id__gt=form_id),
+        )
+        rows = self._fetch(conditions, ('submission_date', 'form_id'))
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        if not rows:
+            return self._page_after(None)
+        return CursorPage(
+            rows,
+            next_cursor=encode_cursor(rows[-1], 'next'),
+            previous_cursor=encode_cursor(rows[0], 'prev') if has_previous else None,
+        )
+
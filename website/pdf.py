@@ -0,0 +1,154 @@
+import hashlib
+import io
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+
+# Building the sample stylesheet is surprisingly expensive, share one per process
+_styles = None
+
+
+def get_styles():
+    global _styles
+    if _styles is None:
+        _styles = getSampleStyleSheet()
+    return _styles
+
+
+def render_form_pdf(form_submission):
+    """Render a FormSubmission to PDF and return the bytes"""
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    styles = get_styles()
+    
+    # Build PDF content
+    story = []
+    story.append(Paragraph(f"Form Submission #{form_submission.form_id}", styles['Title']))
+    story.append(Spacer(1, 12))
+    
+    # Form details
+    details = [
+        f"<b>Full Name:</b> {form_submission.full_name}",
+        f"<b>Email:</b> {form_submission.email}",
+        f"<b>Phone:</b> {form_submission.phone_number}",
+        f"<b>Date of Birth:</b> {form_submission.date_of_birth}",
+        f"<b>Occupation:</b> {form_submission.occupation}",
+        f"<b>Address:</b> {form_submission.address}",
+        f"<b>Purpose:</b> {form_submission.purpose}",
+        f"<b>Submission Date:</b> {form_submission.submission_date.strftime('%Y-%m-%d %H:%M:%S')}",
+        f"<b>Status:</b> {form_submission.get_status_display()}",
+    ]
+    
+    if form_submission.emergency_contact_name:
+        details.append(f"<b>Emergency Contact:</b> {form_submission.emergency_contact_name} - {form_submission.emergency_contact_phone}")
+    
+    if form_submission.additional_notes:
+        details.append(f"<b>Additional Notes:</b> {form_submission.additional_notes}")
+    
+    if form_submission.comments:
+        details.append(f"<b>Comments:</b> {form_submission.comments}")
+    
+    for detail in details:
+        story.append(Paragraph(detail, styles['Normal']))
+        story.append(Spacer(1, 6))
+    
+    doc.build(story)
+    return buffer.getvalue()
+
+
+# On-disk render cache under PDF_CACHE_DIR. Entries are named
+# form_<form_id>_<digest>.pdf where the digest covers form_id and last_updated,
+# so any change to the row produces a new key. Recency is tracked through the
+# file mtime and the least recently used files are evicted once the directory
+# grows past PDF_CACHE_MAX_BYTES. Storing a render only writes its own key: a
+# late render of an older version must not delete the newer entry, so stale
+# versions are left to eviction, or to invalidate() when the form is edited.
+
+def _cache_dir():
+    return Path(settings.PDF_CACHE_DIR)
+
+
+def cache_key(form_submission):
+    source = f"{form_submission.form_id}:{form_submission.last_updated.isoformat()}"
+    return hashlib.sha256(source.encode()).hexdigest()[:32]
+
+
+def cache_path(form_submission):
+    return _cache_dir() / f"form_{form_submission.form_id}_{cache_key(form_submission)}.pdf"
+
+
+def open_cached(form_submission):
+    """Open the cached PDF for the current version of a form, or return None on a miss"""
+    path = cache_path(form_submission)
+    try:
+        cached = open(path, 'rb')
+    except FileNotFoundError:
+        return None
+    os.utime(path)
+    return cached
+
+
+def open_cached_pdf(form_submission):
+    """Open an up to date cached PDF for reading, rendering and storing it on a miss"""
+    cached = open_cached(form_submission)
+    if cached is None:
+        store_pdf(form_submission, render_form_pdf(form_submission))
+        cached = open(cache_path(form_submission), 'rb')
+    return cached
+
+
+def store_pdf(form_submission, content):
+    path = cache_path(form_submission)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write to a temp file first so readers never see a partial PDF
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as tmp:
+        tmp.write(content)
+    os.replace(tmp_path, path)
+    evict(settings.PDF_CACHE_MAX_BYTES)
+    return path
+
+
+def invalidate(form_id):
+    """Drop every cached PDF for a form"""
+    for path in _cache_dir().glob(f"form_{form_id}_*.pdf"):
+        path.unlink(missing_ok=True)
+
+
+def evict(max_bytes):
+    """Delete least recently used entries until the cache fits in max_bytes"""
+    entries = []
+    total = 0
+    for path in _cache_dir().glob('form_*.pdf'):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+        total += stat.st_size
+    
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+
+
+# Entry points for the `run_pdf_workers` process pool. They live here rather
+# than in the command module so worker processes can unpickle them before
+# Django is set up.
+
+def setup_worker():
+    import django
+    django.setup()
+
+
+def render_to_cache(form_submission):
+    store_pdf(form_submission, render_form_pdf(form_submission))
+    return form_submission.form_id
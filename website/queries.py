@@ -0,0 +1,69 @@
+from django.db.models import F, FilteredRelation, Q
+from django.db.models.functions import Substr
+from django.utils import timezone
+
+from .models import ArchivedFormSubmission, FormSubmission
+
+# Shared FormSubmission querysets used by the dashboard views.
+# Keep the filters here in the exact shape the indexes on FormSubmission expect
+# so that `manage.py check_query_plans` audits the same SQL the views run.
+
+# Columns the list tables render. Full details are fetched per form through
+# the `form_detail` JSON endpoint when a row's modal is opened, so list views
+# never load the large TextFields.
+CSC_TABLE_FIELDS = ('form_id', 'full_name', 'status', 'submission_date', 'last_updated')
+USER_TABLE_FIELDS = ('form_id', 'status', 'submission_date', 'comments_preview')
+# The pending table also shows who holds each form in the CSC work queue
+CSC_PENDING_FIELDS = CSC_TABLE_FIELDS + ('claimed_by', 'claimed_until')
+
+# Enough of the CSC comments for the `truncatewords:10` previews
+COMMENTS_PREVIEW_CHARS = 200
+
+STATUS_LABELS = dict(FormSubmission.STATUS_CHOICES)
+
+
+class FormRow:
+    """Lightweight list-view row built from a `values()` projection"""
+    __slots__ = (
+        'form_id', 'full_name', 'status', 'submission_date', 'last_updated', 'comments_preview',
+        'claimed_by', 'claimed_until',
+    )
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            setattr(self, name, values.get(name))
+
+    def get_status_display(self):
+        return STATUS_LABELS.get(self.status, self.status)
+
+
+def table_rows(queryset, fields):
+    """Project queryset onto fields; wrap the results with FormRow"""
+    if 'comments_preview' in fields:
+        queryset = queryset.annotate(comments_preview=Substr('comments', 1, COMMENTS_PREVIEW_CHARS))
+    if 'claimed_by' in fields:
+        # LEFT JOIN onto the active claim only; expired leases read as unclaimed
+        queryset = queryset.annotate(
+            active_claim=FilteredRelation('claim', condition=Q(claim__expires_at__gt=timezone.now())),
+            claimed_by=F('active_claim__csc_user__username'),
+            claimed_until=F('active_claim__expires_at'),
+        )
+    return queryset.values(*fields)
+
+def pending_forms():
+    return FormSubmission.objects.exclude(status='completed').order_by('-submission_date', '-form_id')
+
+def completed_forms():
+    return FormSubmission.objects.filter(status='completed').order_by('-submission_date', '-form_id')
+
+def user_forms(user):
+    return FormSubmission.objects.filter(user=user).order_by('-submission_date', '-form_id')
+
+def user_archived_forms(user):
+    return ArchivedFormSubmission.objects.filter(user=user).order_by('-submission_date', '-form_id')
+
+def user_completed_forms(user):
+    return user_forms(user).filter(status='completed')
+
+def user_pending_forms(user):
+    return user_forms(user).exclude(status='completed')
@@ -0,0 +1,119 @@
+import contextvars
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+
+# Read/write splitting between the `default` primary and an optional `replica`
+# alias. Reads only go to the replica inside views (or blocks) that opt in with
+# @read_from_replica, and never after the current request wrote something or
+# while the session is inside its sticky-to-primary window after a write.
+
+REPLICA = 'replica'
+SESSION_KEY = '_db_primary_until'
+
+
+class RoutingState:
+    def __init__(self, use_replica=False):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+_state = contextvars.ContextVar('db_routing_state', default=None)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+class ReplicaRouter:
+    # Sessions and the like are written on most requests, keep them on the primary
+    primary_only_apps = {'sessions', 'contenttypes', 'admin'}
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if (state is not None and state.use_replica and not state.wrote
+                and model._meta.app_label not in self.primary_only_apps):
+            return REPLICA
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema from sync_replica copies
+        return db != REPLICA
+
+
+@contextmanager
+def replica_reads(use_replica=True):
+    """Enable (or disable) replica reads for the block, sharing any outer request state"""
+    use_replica = use_replica and replica_configured()
+    state = _state.get()
+    if state is None:
+        state = RoutingState(use_replica)
+        token = _state.set(state)
+        try:
+            yield state
+        finally:
+            _state.reset(token)
+    else:
+        previous = state.use_replica
+        state.use_replica = use_replica
+        try:
+            yield state
+        finally:
+            state.use_replica = previous
+
+
+def stream_with_current_routing(iterator):
+    """Keep the current routing for a streamed response body, which is consumed after the view returns"""
+    current = _state.get()
+    state = RoutingState(use_replica=current is not None and current.use_replica and not current.wrote)
+
+    def generate():
+        chunks = iter(iterator)
+        while True:
+            token = _state.set(state)
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                return
+            finally:
+                _state.reset(token)
+            yield chunk
+
+    return generate()
+
+
+def read_from_replica(view):
+    """Route the view's reads to the replica unless the session recently wrote"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        sticky = request.session.get(SESSION_KEY, 0) > time.time()
+        with replica_reads(use_replica=not sticky):
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaStickinessMiddleware:
+    """Pin a session to the primary for REPLICA_STICKY_SECONDS after any request that wrote"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with replica_reads(use_replica=False) as state:
+            response = self.get_response(request)
+            wrote = state.wrote
+        if wrote and replica_configured() and hasattr(request, 'session'):
+            request.session[SESSION_KEY] = time.time() + settings.REPLICA_STICKY_SECONDS
+        return response
@@ -0,0 +1,98 @@
+import re
+
+from django.db import connection, connections
+from django.db.models.expressions import RawSQL
+
+from .models import FormSubmission
+
+# Full-text search over FormSubmission backed by the FTS5 table created in
+# migration 0009. Results are ranked with bm25(), best match first.
+
+FTS_TABLE = 'website_formsubmission_fts'
+
+SEARCH_COLUMNS = 'full_name, email, phone_number, address, purpose, occupation, comments'
+NEW_VALUES = ', '.join(f'new.{column}' for column in SEARCH_COLUMNS.split(', '))
+OLD_VALUES = ', '.join(f'old.{column}' for column in SEARCH_COLUMNS.split(', '))
+
+# The sync triggers, also run by migrations 0009 and 0016 so there is one copy
+# of the SQL. Any later SQLite table rebuild of website_formsubmission drops
+# them again, so ensure_triggers() re-creates whichever are missing after every
+# migrate.
+TRIGGER_SQL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON website_formsubmission BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {SEARCH_COLUMNS})
+        VALUES (new.form_id, {NEW_VALUES});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON website_formsubmission BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {SEARCH_COLUMNS})
+        VALUES ('delete', old.form_id, {OLD_VALUES});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF {SEARCH_COLUMNS} ON website_formsubmission BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {SEARCH_COLUMNS})
+        VALUES ('delete', old.form_id, {OLD_VALUES});
+        INSERT INTO {FTS_TABLE}(rowid, {SEARCH_COLUMNS})
+        VALUES (new.form_id, {NEW_VALUES});
+    END
+    """,
+]
+TRIGGER_NAMES = [f'{FTS_TABLE}_insert', f'{FTS_TABLE}_delete', f'{FTS_TABLE}_update']
+REBUILD_SQL = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+
+
+def build_match_query(text):
+    """Turn free text into a safe FTS5 query: every word must match, as a prefix"""
+    terms = re.findall(r'\w+', text)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_forms(text, limit, offset=0):
+    """Return up to `limit` FormSubmissions matching text, best ranked first"""
+    match = build_match_query(text)
+    if not match:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY bm25({FTS_TABLE}) LIMIT %s OFFSET %s',
+            [match, limit, offset],
+        )
+        form_ids = [row[0] for row in cursor.fetchall()]
+    forms = FormSubmission.objects.in_bulk(form_ids)
+    return [forms[form_id] for form_id in form_ids if form_id in forms]
+
+
+def matching_form_ids(text):
+    """Subquery of form_ids matching text, for use in `form_id__in` filters"""
+    return RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [build_match_query(text)])
+
+
+def rebuild_index():
+    with connection.cursor() as cursor:
+        cursor.execute(REBUILD_SQL)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+
+
+def ensure_triggers(using='default', **kwargs):
+    """
+    post_migrate handler: re-create any missing sync trigger, then rebuild the
+    index since writes made without the trigger weren't indexed.
+    """
+    db = connections[using]
+    if db.vendor != 'sqlite':
+        return
+    with db.cursor() as cursor:
+        tables = db.introspection.table_names(cursor)
+        if FTS_TABLE not in tables or FormSubmission._meta.db_table not in tables:
+            return
+        cursor.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name IN (%s, %s, %s)", TRIGGER_NAMES,
+        )
+        if cursor.fetchone()[0] == len(TRIGGER_NAMES):
+            return
+        for sql in TRIGGER_SQL:
+            cursor.execute(sql)
+        cursor.execute(REBUILD_SQL)
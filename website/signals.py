@@ -0,0 +1,21 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from . import archive
+from .models import ArchivedFormSubmission, CSCActionDailyRollup, DocumentBlob, FormStatusCounter, FormSubmission
+
+
+@receiver(post_delete, sender=FormSubmission)
+@receiver(post_delete, sender=ArchivedFormSubmission)
+def release_form_references(sender, instance, **kwargs):
+    # Here rather than in delete() so queryset deletes (admin "delete selected")
+    # and cascades from a deleted user are counted too
+    if sender is FormSubmission and archive.archiving.get():
+        return
+    FormStatusCounter.record_removed(instance.user_id, instance.status)
+    # The rollup FK has no constraint or cascade so rollups survive archiving;
+    # a real delete of the live or archived form takes them with it
+    CSCActionDailyRollup.objects.filter(form_submission_id=instance.pk).delete()
+    document = instance.__dict__.get('_counted_document', instance.document_file.name)
+    if document:
+        DocumentBlob.release(document)
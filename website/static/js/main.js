@@ -26,6 +26,153 @@ window.onclick = function(event) {
     });
 }
 
+// Lazy form detail modal
+// Dashboard rows only carry a data-detail-url; the details are fetched the
+// first time a row is opened and reused for the rest of the page view.
+const formDetailCache = {};
+
+function detailField(label, value, block) {
+    const div = document.createElement('div');
+    if (block) {
+        div.style.marginTop = '1rem';
+    }
+    const strong = document.createElement('strong');
+    strong.textContent = label + ':';
+    div.appendChild(strong);
+    div.appendChild(document.createElement('br'));
+    if (value instanceof Node) {
+        div.appendChild(value);
+    } else {
+        div.appendChild(document.createTextNode(value || ''));
+    }
+    return div;
+}
+
+function renderFormDetail(data) {
+    const body = document.getElementById('formDetailBody');
+    body.textContent = '';
+
+    const badge = document.createElement('span');
+    badge.className = 'status-badge ' + getStatusBadgeClass(data.status);
+    badge.textContent = data.status_display;
+
+    const grid = document.createElement('div');
+    grid.style.cssText = 'display: grid; grid-template-columns: repeat(auto-fit, minmax(250px, 1fr)); gap: 1rem;';
+    grid.appendChild(detailField('Full Name', data.full_name));
+    grid.appendChild(detailField('Email', data.email));
+    grid.appendChild(detailField('Phone', data.phone_number));
+    grid.appendChild(detailField('Date of Birth', data.date_of_birth));
+    grid.appendChild(detailField('Occupation', data.occupation));
+    grid.appendChild(detailField('Status', badge));
+    body.appendChild(grid);
+
+    body.appendChild(detailField('Address', data.address, true));
+    body.appendChild(detailField('Purpose', data.purpose, true));
+    if (data.additional_notes) {
+        body.appendChild(detailField('Additional Notes', data.additional_notes, true));
+    }
+    if (data.emergency_contact_name) {
+        body.appendChild(detailField('Emergency Contact', data.emergency_contact_name + ' - ' + (data.emergency_contact_phone || ''), true));
+    }
+    if (data.comments) {
+        body.appendChild(detailField('Comments', data.comments, true));
+    }
+    if (data.document_preview_url) {
+        const preview = document.createElement('img');
+        preview.src = data.document_preview_url;
+        preview.alt = 'Document preview';
+        preview.style.cssText = 'display: block; max-width: 320px; max-height: 320px; border: 1px solid #e9ecef; border-radius: 4px;';
+        const link = document.createElement('a');
+        link.href = data.document_url;
+        link.target = '_blank';
+        link.appendChild(preview);
+        body.appendChild(detailField('Document', link, true));
+    } else if (data.document_url) {
+        const link = document.createElement('a');
+        link.href = data.document_url;
+        link.target = '_blank';
+        link.textContent = 'Open document';
+        body.appendChild(detailField('Document', link, true));
+    }
+    body.appendChild(detailField('Submission Date', data.submission_date, true));
+    if (data.status === 'completed') {
+        body.appendChild(detailField('Completion Date', data.last_updated, true));
+    }
+}
+
+function openFormDetail(button) {
+    const url = button.dataset.detailUrl;
+    const title = document.getElementById('formDetailTitle');
+    const body = document.getElementById('formDetailBody');
+
+    if (formDetailCache[url]) {
+        title.textContent = 'Form #' + formDetailCache[url].form_id + ' Details';
+        renderFormDetail(formDetailCache[url]);
+        openModal('formDetailModal');
+        return;
+    }
+
+    title.textContent = 'Form Details';
+    body.textContent = 'Loading...';
+    openModal('formDetailModal');
+
+    fetch(url, {credentials: 'same-origin', headers: {'Accept': 'application/json'}})
+        .then(response => {
+            if (!response.ok) {
+                throw new Error('HTTP ' + response.status);
+            }
+            return response.json();
+        })
+        .then(data => {
+            formDetailCache[url] = data;
+            title.textContent = 'Form #' + data.form_id + ' Details';
+            renderFormDetail(data);
+        })
+        .catch(() => {
+            body.textContent = 'Could not load form details. Please try again.';
+        });
+}
+
+// Bulk actions on the forms ticked in the CSC pending table
+function toggleBulkSelection(source) {
+    document.querySelectorAll('.bulk-select').forEach(box => {
+        box.checked = source.checked;
+    });
+}
+
+function submitBulkUpdate(form) {
+    const ids = Array.from(document.querySelectorAll('.bulk-select:checked')).map(box => box.value);
+    if (!ids.length) {
+        alert('Select at least one form in the pending table.');
+        return false;
+    }
+    if (!confirmAction('Apply this change to ' + ids.length + ' form(s)?')) {
+        return false;
+    }
+
+    const data = new FormData(form);
+    data.set('form_ids', ids.join(','));
+    fetch(form.dataset.url, {method: 'POST', body: data, credentials: 'same-origin', headers: {'Accept': 'application/json'}})
+        .then(response => response.json().then(body => ({ok: response.ok, body: body})))
+        .then(result => {
+            if (!result.ok) {
+                const errors = result.body.errors ? Object.values(result.body.errors).flat().join(' ') : '';
+                alert((result.body.error || 'Bulk update failed.') + (errors ? ' ' + errors : ''));
+                return;
+            }
+            let message = 'Updated ' + result.body.updated + ' form(s).';
+            if (result.body.skipped) {
+                message += ' Skipped ' + result.body.skipped + ' that cannot move to that status.';
+            }
+            alert(message);
+            window.location.reload();
+        })
+        .catch(() => {
+            alert('Bulk update failed. Please try again.');
+        });
+    return false;
+}
+
 // Form validation
 function validateForm(formId) {
     const form = document.getElementById(formId);
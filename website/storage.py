@@ -0,0 +1,82 @@
+import hashlib
+import os
+import re
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+
+# Content-addressed storage for form documents. A file is stored once, at
+# <upload_to>/<aa>/<bb>/<sha256><ext>, however many forms attach it; the
+# DocumentBlob table counts the references and `manage.py gc_documents`
+# removes blobs nothing points at any more.
+
+BLOB_NAME_RE = re.compile(r'(?:^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(?:\.[a-z0-9]{1,10})?$')
+HASH_BLOCK_SIZE = 64 * 1024
+
+
+def is_blob_name(name):
+    return bool(name and BLOB_NAME_RE.search(name))
+
+
+def hash_file(file):
+    """SHA-256 of a Django File (or file object), leaving it rewound"""
+    hasher = hashlib.sha256()
+    file.seek(0)
+    if hasattr(file, 'chunks'):
+        blocks = file.chunks(HASH_BLOCK_SIZE)
+    else:
+        blocks = iter(lambda: file.read(HASH_BLOCK_SIZE), b'')
+    for block in blocks:
+        hasher.update(block)
+    file.seek(0)
+    return hasher.hexdigest()
+
+
+def blob_name(name, digest):
+    """Content address for digest, in the directory and with the extension of name"""
+    directory = os.path.dirname(name)
+    ext = os.path.splitext(name)[1].lower()
+    if not re.fullmatch(r'\.[a-z0-9]{1,10}', ext):
+        ext = ''
+    return '/'.join(part for part in (directory, digest[:2], digest[2:4], digest + ext) if part)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # Names are content addresses, so an existing file is the same file
+        return name
+
+    def _save(self, name, content):
+        from .models import DocumentBlob
+
+        # Chunked uploads hash while streaming and pass the digest along
+        digest = getattr(content, 'sha256', None) or hash_file(content)
+        name = blob_name(name, digest)
+        if not self.exists(name):
+            # Write under a unique name and rename over the blob, so concurrent
+            # saves of the same content can't collide or leave a partial file
+            temp_name = f'{name}.{uuid.uuid4().hex}.tmp'
+            temp_name = super()._save(temp_name, content)
+            os.replace(self.path(temp_name), self.path(name))
+        DocumentBlob.objects.get_or_create(name=name, defaults={'sha256': digest, 'size': content.size})
+        return name
+
+    def delete(self, name):
+        # Blobs are shared between forms; gc_documents purges unreferenced ones
+        if is_blob_name(name):
+            return
+        super().delete(name)
+
+    def purge(self, name):
+        """Remove a blob file regardless of references, then its empty shard directories"""
+        super().delete(name)
+        shard = os.path.dirname(self.path(name))
+        for directory in (shard, os.path.dirname(shard)):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+
+
+def document_storage():
+    return ContentAddressedStorage()
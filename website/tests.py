@@ -1,3 +1,1410 @@
-from django.test import TestCase
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from reportlab.pdfgen import canvas
+
+from . import archive, audit, documents, exports, fragments, pdf, queries, routers, search, storage, workqueue
+from .forms import FormEditForm
+from .management.commands import sync_replica
+from .models import (
+    ArchivedFormSubmission, CSCAction, CSCActionDailyRollup, CustomUser, DocumentBlob, DocumentJob, FormClaim,
+    FormStatusCounter, FormSubmission, PdfRenderJob, VersionConflict,
+)
+
+
+def create_form(user, **fields):
+    """Create a valid FormSubmission for user; fields override the defaults"""
+    values = {
+        'full_name': 'Applicant', 'email': 'a@example.com', 'phone_number': '5550100', 'address': '1 Main St',
+        'date_of_birth': date(1990, 1, 1), 'occupation': 'Engineer', 'purpose': 'Passport',
+    }
+    values.update(fields)
+    return FormSubmission.objects.create(user=user, **values)
+
+
+class ListViewProjectionTests(TestCase):
+    """List views only select the columns their tables show, in a fixed number of queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.csc = CustomUser.objects.create_user('csc', 'csc@example.com', 'pw', user_type='csc')
+        cls.user = CustomUser.objects.create_user('applicant', 'applicant@example.com', 'pw', user_type='user')
+        for i in range(15):
+            FormSubmission.objects.create(
+                user=cls.user, full_name=f'Applicant {i}', email=f'a{i}@example.com',
+                phone_number='5550100', address='A long address ' * 100, date_of_birth=date(1990, 1, 1),
+                occupation='Engineer', purpose='A long purpose ' * 100, comments='note ' * 500,
+                status='completed' if i % 3 == 0 else 'submitted',
+            )
+
+    def setUp(self):
+        # Fragment hits would skip the queries under test
+        fragments.clear()
+
+    def get_list(self, user, url_name, expected_queries):
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse(url_name))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(captured), expected_queries)
+        # Table reads, not the dashboards' version lookup (a counter read with
+        # FormSubmission subqueries)
+        selects = [
+            q['sql'] for q in captured
+            if 'FROM "website_formsubmission"' in q['sql'] and 'FROM "website_formstatuscounter"' not in q['sql']
+        ]
+        self.assertTrue(selects)
+        return response, [set(re.findall(r'AS "(\w+)"', sql.split(' FROM ')[0])) for sql in selects]
+
+    def test_csc_dashboard(self):
+        # session, user, forms version, claims version, global counter,
+        # pending page, completed page, the agent's claimed forms
+        response, columns = self.get_list(self.csc, 'csc_dashboard', 8)
+        self.assertEqual(columns, [
+            set(queries.CSC_PENDING_FIELDS), set(queries.CSC_TABLE_FIELDS), set(queries.CSC_PENDING_FIELDS),
+        ])
+        self.assertContains(response, 'Applicant 1')
+
+    def test_csc_dashboard_page_footer(self):
+        create_form(self.user, full_name='Applicant 15')
+        self.client.force_login(self.csc)
+        # Shown under the paginated table, from the same global counter as the stat cards
+        self.assertContains(self.client.get(reverse('csc_dashboard')), 'Pending: 11 forms')
+
+    def test_user_dashboard(self):
+        # session, user, forms version, user counter, latest five live and
+        # five archived forms
+        response, columns = self.get_list(self.user, 'user_dashboard', 6)
+        self.assertEqual(columns, [set(queries.USER_TABLE_FIELDS)])
+        self.assertContains(response, 'note note')
+
+    def test_user_forms_list(self):
+        # session, user, live and archived form pages, user counter
+        response, columns = self.get_list(self.user, 'user_forms_list', 5)
+        self.assertEqual(columns, [set(queries.USER_TABLE_FIELDS)])
+        self.assertEqual(len(response.context['forms']), 10)
+        self.assertIsInstance(response.context['forms'].object_list[0], queries.FormRow)
+
+    def test_user_lists_include_archived_forms(self):
+        archive.archive_batch(FormSubmission.objects.filter(status='completed'), 100)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('user_forms_list'))
+        self.assertContains(response, 'All Forms (15)')
+        form_ids = [row.form_id for row in response.context['forms']]
+        response = self.client.get(reverse('user_forms_list'), {'cursor': response.context['forms'].next_cursor})
+        form_ids += [row.form_id for row in response.context['forms']]
+        self.assertFalse(response.context['forms'].has_next())
+        previous = self.client.get(reverse('user_forms_list'), {'cursor': response.context['forms'].previous_cursor})
+        self.assertEqual([row.form_id for row in previous.context['forms']], form_ids[:10])
+        # Newest first across both tables, each form once
+        expected = [
+            *FormSubmission.objects.values_list('form_id', flat=True),
+            *ArchivedFormSubmission.objects.values_list('form_id', flat=True),
+        ]
+        self.assertEqual(form_ids, sorted(expected, reverse=True))
+
+        response = self.client.get(reverse('user_dashboard'))
+        self.assertEqual([row.form_id for row in response.context['user_forms']], form_ids[:5])
+
+
+class SearchIndexTests(TestCase):
+    """The FTS index follows FormSubmission writes through its triggers"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('applicant', 'applicant@example.com', 'pw', user_type='user')
+
+    def create_form(self, full_name):
+        return create_form(self.user, full_name=full_name)
+
+    def test_rename_is_searchable(self):
+        form = self.create_form('Marguerite Oyelaran')
+        self.assertEqual(search.search_forms('Marguerite', 10), [form])
+        form.full_name = 'Beatrix Halvorsen'
+        form.save()
+        self.assertEqual(search.search_forms('Beatrix', 10), [form])
+        self.assertEqual(search.search_forms('Marguerite', 10), [])
+
+    def test_create_is_searchable(self):
+        form = self.create_form('Ottoline Vasquez')
+        self.assertEqual(search.search_forms('ottoline vasq', 10), [form])
+
+    def test_queryset_update_is_searchable(self):
+        form = self.create_form('Ottoline Vasquez')
+        FormSubmission.objects.filter(pk=form.pk).update(occupation='Cartographer')
+        self.assertEqual(search.search_forms('Cartographer', 10), [form])
+
+    def test_delete_leaves_index(self):
+        form = self.create_form('Ottoline Vasquez')
+        form.delete()
+        self.assertEqual(search.search_forms('Ottoline', 10), [])
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {search.FTS_TABLE} WHERE {search.FTS_TABLE} MATCH 'Ottoline'")
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_ensure_triggers_restores_missing_trigger(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {search.FTS_TABLE}_insert')
+        unindexed = self.create_form('Ottoline Vasquez')
+        search.ensure_triggers()
+        self.assertEqual(search.search_forms('Ottoline', 10), [unindexed])
+        form = self.create_form('Peregrine Vasquez')
+        self.assertEqual(search.search_forms('Peregrine', 10), [form])
+
+
+class DashboardConditionalGetTests(TestCase):
+    """Dashboards answer 304 only while the client's copy is still current"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.csc = CustomUser.objects.create_user('csc', 'csc@example.com', 'pw', user_type='csc')
+        cls.user = CustomUser.objects.create_user('applicant', 'applicant@example.com', 'pw', user_type='user')
+        cls.form = create_form(cls.user, full_name='Rosalind Achterberg')
+
+    def setUp(self):
+        fragments.clear()
+
+    def revalidate(self, url_name, etag):
+        return self.client.get(reverse(url_name), HTTP_IF_NONE_MATCH=etag)
+
+    def test_queryset_update_changes_dashboards(self):
+        # Written without signals, as by bulk_update_forms in another process
+        for user, url_name in ((self.user, 'user_dashboard'), (self.csc, 'csc_dashboard')):
+            self.client.force_login(user)
+            etag = self.client.get(reverse(url_name))['ETag']
+            self.assertEqual(self.revalidate(url_name, etag).status_code, 304)
+            FormSubmission.objects.filter(pk=self.form.pk).update(
+                status='underprocess' if user == self.user else 'action-needed', last_updated=timezone.now(),
+            )
+            response = self.revalidate(url_name, etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertContains(response, 'Under Process' if user == self.user else 'Action Needed')
+
+    def test_archiving_changes_csc_dashboard(self):
+        FormSubmission.objects.filter(pk=self.form.pk).update(status='completed')
+        self.client.force_login(self.csc)
+        response = self.client.get(reverse('csc_dashboard'))
+        self.assertContains(response, 'Rosalind Achterberg')
+        archive.archive_batch(FormSubmission.objects.all(), 10)
+        response = self.revalidate('csc_dashboard', response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Rosalind Achterberg')
+
+    def login(self):
+        response = self.client.post(reverse('csc_login'), {'username': 'csc', 'password': 'pw'})
+        self.assertRedirects(response, reverse('csc_dashboard'), fetch_redirect_response=False)
+
+    def test_csc_dashboard_revalidates_after_new_login(self):
+        self.login()
+        etag = self.client.get(reverse('csc_dashboard'))['ETag']
+        self.assertEqual(self.client.get(reverse('csc_dashboard'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.client.get(reverse('logout'))
+        self.client.get(reverse('landing_page'))  # shows the logout message
+        self.login()
+        # The cached page holds the CSRF token of the previous login
+        response = self.client.get(reverse('csc_dashboard'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class DeleteBookkeepingTests(TestCase):
+    """Status counters and blob refcounts follow every kind of delete"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('applicant', 'applicant@example.com', 'pw', user_type='user')
+        cls.blob = DocumentBlob.objects.create(name='form_documents/ab/abc.pdf', sha256='abc', size=3)
+
+    def create_form(self, status='submitted', user=None, **fields):
+        return create_form(user or self.user, status=status, **fields)
+
+    def assertCounts(self, user, total, completed):
+        for counter in (FormStatusCounter.get_for(user), FormStatusCounter.get_for(None)):
+            self.assertEqual((counter.total, counter.completed), (total, completed))
+
+    def test_queryset_delete(self):
+        self.create_form(document_file=self.blob.name)
+        self.create_form('completed')
+        self.create_form()
+        self.blob.refresh_from_db()
+        self.assertEqual(self.blob.refcount, 1)
+        self.assertCounts(self.user, 3, 1)
+
+        FormSubmission.objects.exclude(document_file='').exclude(document_file__isnull=True).delete()
+        FormSubmission.objects.filter(status='completed').delete()
+        self.assertCounts(self.user, 1, 0)
+        self.blob.refresh_from_db()
+        self.assertEqual(self.blob.refcount, 0)
+
+    def test_archive_keeps_counts(self):
+        self.create_form('completed', document_file=self.blob.name)
+        self.assertEqual(archive.archive_batch(FormSubmission.objects.all(), 10), 1)
+        self.assertCounts(self.user, 1, 1)
+        self.blob.refresh_from_db()
+        self.assertEqual(self.blob.refcount, 1)
+
+    def test_user_cascade(self):
+        other = CustomUser.objects.create_user('other', 'other@example.com', 'pw', user_type='user')
+        self.create_form('completed', user=other, document_file=self.blob.name)
+        archive.archive_batch(FormSubmission.objects.all(), 10)
+        self.create_form(user=other)
+        self.create_form()
+        other_id = other.pk
+        other.delete()
+        self.assertFalse(ArchivedFormSubmission.objects.exists())
+        self.assertFalse(FormStatusCounter.objects.filter(user_id=other_id).exists())
+        self.assertCounts(self.user, 1, 0)
+        self.blob.refresh_from_db()
+        self.assertEqual(self.blob.refcount, 0)
+
+
+class AuditLogWriterTests(TestCase):
+    """Buffered CSC actions are written in batches without ever failing the request"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.csc = CustomUser.objects.create_user('csc', 'csc@example.com', 'pw', user_type='csc')
+        cls.user = CustomUser.objects.create_user('applicant', 'applicant@example.com', 'pw', user_type='user')
+        cls.forms = [create_form(cls.user, full_name=f'Applicant {i}') for i in range(3)]
+
+    def setUp(self):
+        self.writer = audit.AuditLogWriter(batch_size=3, flush_interval=60)
+        self.addCleanup(self.writer.flush)
+
+    def add(self, form_id):
+        self.writer.add(CSCAction(form_submission_id=form_id, csc_user=self.csc, action_type='viewed'))
+
+    def test_batches(self):
+        self.add(self.forms[0].pk)
+        self.add(self.forms[1].pk)
+        self.assertEqual(self.writer.pending(), 2)
+        self.assertFalse(CSCAction.objects.exists())
+        self.add(self.forms[2].pk)
+        self.assertEqual(self.writer.pending(), 0)
+        self.assertEqual(CSCAction.objects.count(), 3)
+
+    def test_actions_of_removed_forms_are_dropped(self):
+        self.add(self.forms[0].pk)
+        self.add(self.forms[1].pk)
+        self.forms[1].delete()
+        with self.assertLogs('website.audit', 'WARNING'):
+            self.add(self.forms[2].pk)
+        self.assertEqual(
+            set(CSCAction.objects.values_list('form_submission_id', flat=True)), {self.forms[0].pk, self.forms[2].pk},
+        )
+
+    def test_failed_batch_falls_back_to_single_rows(self):
+        self.add(self.forms[0].pk)
+        self.add(self.forms[1].pk)
+        with mock.patch.object(CSCAction.objects, 'bulk_create', side_effect=DatabaseError('locked')):
+            with self.assertLogs('website.audit', 'WARNING'):
+                self.add(self.forms[2].pk)
+        self.assertEqual(CSCAction.objects.count(), 3)
+
+    def test_flush_errors_stay_out_of_the_request(self):
+        self.add(self.forms[0].pk)
+        self.add(self.forms[1].pk)
+        with mock.patch.object(FormSubmission.objects, 'filter', side_effect=DatabaseError('gone')):
+            with self.assertLogs('website.audit', 'ERROR'):
+                self.add(self.forms[2].pk)
+        self.assertEqual(self.writer.pending(), 0)
+
+
+class BulkUpdateTests(TestCase):
+    """csc_bulk_update applies allowed transitions and comments in one go"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.csc = CustomUser.objects.create_user('csc', 'csc@example.com', 'pw', user_type='csc')
+        cls.user = CustomUser.objects.create_user('applicant', 'applicant@example.com', 'pw', user_type='user')
+        cls.forms = [
+            create_form(cls.user, status=status, comments=comments)
+            for status, comments in [('submitted', 'Call back on Monday'), ('underprocess', None), ('completed', '')]
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.csc)
+
+    def bulk_update(self, **data):
+        data.setdefault('form_ids', ' '.join(str(form.pk) for form in self.forms))
+        return self.client.post(reverse('csc_bulk_update'), data)
+
+    def test_transition_skips_disallowed_forms(self):
+        response = self.bulk_update(new_status='completed')
+        self.assertEqual(response.json(), {'matched': 3, 'updated': 2, 'skipped': 1})
+        self.assertEqual(set(FormSubmission.objects.values_list('status', flat=True)), {'completed'})
+        self.assertEqual(
+            (FormStatusCounter.get_for(self.user).completed, FormStatusCounter.get_for(None).completed), (3, 3),
+        )
+        self.assertEqual(CSCAction.objects.filter(action_type='submitted').count(), 2)
+
+    def test_comment_is_appended(self):
+        response = self.bulk_update(comment='Missing ID')
+        self.assertEqual(response.json()['updated'], 3)
+        comments = dict(FormSubmission.objects.values_list('pk', 'comments'))
+        self.assertEqual(comments, {
+            self.forms[0].pk: 'Call back on Monday\nMissing ID',
+            self.forms[1].pk: 'Missing ID',
+            self.forms[2].pk: 'Missing ID',
+        })
+        self.assertEqual(CSCAction.objects.filter(action_type='commented', notes='Missing ID').count(), 3)
+
+    def test_nothing_to_change(self):
+        self.assertEqual(self.bulk_update().status_code, 400)
+        self.assertEqual(self.bulk_update(new_status='submitted').status_code, 400)
+        self.assertFalse(CSCAction.objects.exists())
+
+
+@override_settings(PDF_RENDER_ASYNC=True, PDF_RENDER_MAX_ATTEMPTS=2)
+class PdfRenderQueueTests(TestCase):
+    """PDFs are rendered by queue workers; each job is claimed by one worker at a time"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('applicant', 'applicant@example.com', 'pw', user_type='user')
+        cls.forms = [create_form(cls.user, status='completed') for _ in range(3)]
+
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.cache_dir = Path(cache_dir.name)
+        cache_settings = override_settings(PDF_CACHE_DIR=cache_dir.name)
+        cache_settings.enable()
+        self.addCleanup(cache_settings.disable)
+
+    def test_late_render_of_older_version_keeps_newer_entry(self):
+        old = FormSubmission.objects.get(pk=self.forms[0].pk)
+        new = FormSubmission.objects.get(pk=self.forms[0].pk)
+        new.last_updated += timedelta(seconds=1)
+        pdf.store_pdf(new, b'new')
+        pdf.store_pdf(old, b'old')
+        self.assertEqual(pdf.cache_path(new).read_bytes(), b'new')
+        with pdf.open_cached(new) as cached:
+            self.assertEqual(cached.read(), b'new')
+        pdf.invalidate(new.form_id)
+        self.assertEqual(list(self.cache_dir.glob('form_*.pdf')), [])
+
+    def test_evict_drops_least_recently_used_first(self):
+        paths = [pdf.store_pdf(form, b'x' * 100) for form in self.forms]
+        now = time.time()
+        for age, path in zip((300, 200, 100), paths):
+            os.utime(path, (now - age, now - age))
+        # Reading the oldest entry makes it the most recently used
+        pdf.open_cached(self.forms[0]).close()
+        pdf.evict(250)
+        self.assertEqual(sorted(self.cache_dir.glob('form_*.pdf')), sorted([paths[0], paths[2]]))
+        pdf.evict(150)
+        self.assertEqual(list(self.cache_dir.glob('form_*.pdf')), [paths[0]])
+
+    def test_store_keeps_cache_under_byte_limit(self):
+        paths = []
+        with override_settings(PDF_CACHE_MAX_BYTES=250):
+            for age, form in zip((20, 10, 0), self.forms):
+                paths.append(pdf.store_pdf(form, b'x' * 100))
+                os.utime(paths[-1], (time.time() - age, time.time() - age))
+        self.assertEqual(sorted(self.cache_dir.glob('form_*.pdf')), sorted(paths[1:]))
+
+    def test_claims_are_exclusive(self):
+        PdfRenderJob.enqueue_many([form.pk for form in self.forms])
+        first = PdfRenderJob.claim(2, timedelta(minutes=5))
+        second = PdfRenderJob.claim(5, timedelta(minutes=5))
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertFalse({job.pk for job in first} & {job.pk for job in second})
+        self.assertEqual(PdfRenderJob.claim(5, timedelta(minutes=5)), [])
+
+    def test_stale_job_is_reclaimed(self):
+        PdfRenderJob.enqueue(self.forms[0])
+        [job] = PdfRenderJob.claim(1, timedelta(minutes=5))
+        PdfRenderJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(minutes=10))
+        [retry] = PdfRenderJob.claim(1, timedelta(minutes=5))
+        self.assertEqual(retry.attempts, 2)
+        # The silent worker's late result doesn't clobber the new claim
+        job.mark_done()
+        self.assertEqual(PdfRenderJob.objects.get(pk=job.pk).status, 'running')
+
+    def test_failures_retry_up_to_max_attempts(self):
+        PdfRenderJob.enqueue(self.forms[0])
+        for expected in ('pending', 'failed'):
+            [job] = PdfRenderJob.claim(1, timedelta(minutes=5))
+            job.mark_failed('boom', settings.PDF_RENDER_MAX_ATTEMPTS)
+            self.assertEqual(PdfRenderJob.objects.get(pk=job.pk).status, expected)
+
+    def test_download_waits_for_worker(self):
+        self.client.force_login(self.user)
+        url = reverse('download_form_pdf', args=[self.forms[0].pk])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 202)
+        [job] = PdfRenderJob.claim(5, timedelta(minutes=5))
+        pdf.render_to_cache(job.form_submission)
+        job.mark_done()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content)[:5], b'%PDF-')
+
+
+@override_settings(AUDIT_LOG_BUFFERED=False)
+class FormDetailTests(TestCase):
+    """The JSON behind the dashboard detail modals"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.csc = CustomUser.objects.create_user('csc', 'csc@example.com', 'pw', user_type='csc')
+        cls.user = CustomUser.objects.create_user('applicant', 'applicant@example.com', 'pw', user_type='user')
+        cls.other = CustomUser.objects.create_user('other', 'other@example.com', 'pw', user_type='user')
+        cls.form = create_form(cls.user, full_name='Detail Applicant', comments='Looks fine')
+
+    def get(self, user, form_id=None):
+        self.client.force_login(user)
+        return self.client.get(reverse('form_detail', args=[form_id or self.form.pk]))
+
+    def test_owner_gets_form_fields(self):
+        response = self.get(self.user)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['form_id'], self.form.pk)
+        self.assertEqual(data['full_name'], 'Detail Applicant')
+        self.assertEqual(data['date_of_birth'], 'Jan. 1, 1990')
+        self.assertEqual(data['status'], 'submitted')
+        self.assertEqual(data['status_display'], 'Submitted')
+        self.assertEqual(data['comments'], 'Looks fine')
+        self.assertIsNone(data['document_url'])
+        self.assertIsNone(data['document_preview_url'])
+        self.assertEqual(data['document_metadata'], {})
+        self.assertFalse(CSCAction.objects.exists())
+
+    def test_other_user_is_denied(self):
+        response = self.get(self.other)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json(), {'error': 'Access denied.'})
+
+    def test_missing_form(self):
+        self.assertEqual(self.get(self.csc, form_id=self.form.pk + 100).status_code, 404)
+
+    def test_csc_view_is_logged(self):
+        response = self.get(self.csc)
+        self.assertEqual(response.json()['full_name'], 'Detail Applicant')
+        action = CSCAction.objects.get()
+        self.assertEqual((action.form_submission_id, action.csc_user, action.action_type),
+                         (self.form.pk, self.csc, 'viewed'))
+
+    def test_archived_form_is_served_without_logging(self):
+        archive.archive_batch(FormSubmission.objects.filter(pk=self.form.pk), 10)
+        response = self.get(self.csc)
+        self.assertEqual(response.json()['full_name'], 'Detail Applicant')
+        self.assertFalse(CSCAction.objects.exists())
+
+
+class ExportTests(TestCase):
+    """Streamed exports for CSC agents"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.csc = CustomUser.objects.create_user('csc', 'csc@example.com', 'pw', user_type='csc')
+        cls.user = CustomUser.objects.create_user('applicant', 'applicant@example.com', 'pw', user_type='user')
+        cls.completed = [create_form(cls.user, status='completed', full_name=f'Done {i}') for i in range(2)]
+        cls.pending = create_form(cls.user, full_name='Waiting, "quoted"')
+
+    def setUp(self):
+        self.client.force_login(self.csc)
+
+    def test_pdf_zip(self):
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(PDF_CACHE_DIR=cache_dir):
+            # Cached PDFs are streamed as they are, without the render pool
+            for form in self.completed:
+                pdf.render_to_cache(form)
+            response = self.client.get(reverse('export_pdfs'))
+            content = b''.join(response.streaming_content)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertEqual(archive.namelist(), [f'form_{form.pk}.pdf' for form in self.completed])
+            self.assertTrue(archive.read(archive.namelist()[0]).startswith(b'%PDF-'))
+
+    def test_csv(self):
+        response = self.client.get(reverse('export_data'), {'source': 'forms', 'format': 'csv'})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([row['form_id'] for row in rows], [str(form.pk) for form in [*self.completed, self.pending]])
+        self.assertEqual(rows[-1]['full_name'], 'Waiting, "quoted"')
+        self.assertEqual(rows[-1]['user__username'], 'applicant')
+
+    def test_ndjson_resumes_from_watermark(self):
+        export = exports.DataExport('forms')
+        self.assertEqual(len(list(export.rows())), 3)
+        FormSubmission.objects.filter(pk=self.pending.pk).update(
+            comments='Checked', last_updated=timezone.now() + timedelta(seconds=1),
+        )
+        response = self.client.get(reverse('export_data'), {
+            'source': 'forms', 'format': 'ndjson', 'since': export.watermark.isoformat(),
+        })
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['comments'] for line in lines], ['Checked'])
+
+    def test_user_is_refused(self):
+        self.client.force_login(self.user)
+        self.assertRedirects(self.client.get(reverse('export_pdfs')), reverse('landing_page'))
+        self.assertRedirects(self.client.get(reverse('export_data')), reverse('landing_page'))
+
+
+class CSCActionCompactionTests(TestCase):
+    """compact_csc_actions rolls up old views and moves very old actions to gzipped NDJSON"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.csc = CustomUser.objects.create_user('csc', 'csc@example.com', 'pw', user_type='csc')
+        cls.user = CustomUser.objects.create_user('applicant', 'applicant@example.com', 'pw', user_type='user')
+        cls.form = create_form(cls.user)
+
+    def setUp(self):
+        archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_dir.cleanup)
+        self.archive_dir = Path(archive_dir.name)
+
+    def action(self, action_type, days_ago, form=None):
+        return CSCAction.objects.create(
+            form_submission=form or self.form, csc_user=self.csc, action_type=action_type,
+            action_date=timezone.now() - timedelta(days=days_ago), notes=f'{action_type} {days_ago}',
+        )
+
+    def compact(self, **options):
+        out = io.StringIO()
+        call_command('compact_csc_actions', rollup_after_days=30, archive_after_days=180,
+                     archive_dir=str(self.archive_dir), stdout=out, **options)
+        return out.getvalue()
+
+    def archived_rows(self):
+        rows = []
+        for path in sorted(self.archive_dir.glob('csc_actions_*.ndjson.gz')):
+            with gzip.open(path, 'rt', encoding='utf-8') as archive_file:
+                rows.extend(json.loads(line) for line in archive_file)
+        return rows
+
+    def test_rolls_up_views_and_archives_old_actions(self):
+        recent = self.action('viewed', 1)
+        kept_edit = self.action('edited', 60)
+        views = [self.action('viewed', 60), self.action('viewed', 60)]
+        old_edit = self.action('edited', 200)
+        old_view = self.action('viewed', 200)
+
+        output = self.compact(batch_size=2)
+
+        self.assertIn('Rolled up 3 viewed actions, archived 2 actions', output)
+        self.assertEqual(set(CSCAction.objects.values_list('pk', flat=True)), {recent.pk, kept_edit.pk})
+        rollups = {
+            (rollup.day, rollup.count)
+            for rollup in CSCActionDailyRollup.objects.filter(form_submission=self.form, action_type='viewed')
+        }
+        self.assertEqual(rollups, {
+            (timezone.localtime(views[0].action_date).date(), 2),
+            (timezone.localtime(old_view.action_date).date(), 1),
+        })
+        archived = self.archived_rows()
+        self.assertEqual({row['id'] for row in archived}, {old_edit.pk, old_view.pk})
+        row = next(row for row in archived if row['id'] == old_edit.pk)
+        self.assertEqual(row['form_submission_id'], self.form.pk)
+        self.assertEqual(row['action_type'], 'edited')
+        self.assertEqual(row['notes'], 'edited 200')
+
+    def test_second_run_adds_to_rollup_and_appends_archive(self):
+        first = self.action('viewed', 200)
+        self.compact()
+        second = CSCAction.objects.create(
+            form_submission=self.form, csc_user=self.csc, action_type='viewed', action_date=first.action_date,
+        )
+        self.compact()
+        self.assertEqual(CSCActionDailyRollup.objects.get().count, 2)
+        self.assertEqual([row['id'] for row in self.archived_rows()], [first.pk, second.pk])
+
+    def test_dry_run_changes_nothing(self):
+        self.action('viewed', 60)
+        self.assertIn('1 actions would be compacted', self.compact(dry_run=True))
+        self.assertEqual(CSCAction.objects.count(), 1)
+        self.assertFalse(CSCActionDailyRollup.objects.exists())
+
+    def test_rejects_rollup_after_archive(self):
+        with self.assertRaises(CommandError):
+            call_command('compact_csc_actions', rollup_after_days=200, archive_after_days=180)
+
+    def test_rollups_follow_the_form(self):
+        other = create_form(self.user)
+        self.action('viewed', 60)
+        self.action('viewed', 60, form=other)
+        self.compact()
+        archive.archive_batch(FormSubmission.objects.filter(pk=other.pk), 10)
+        self.assertEqual(CSCActionDailyRollup.objects.count(), 2)
+
+        self.form.delete()
+        ArchivedFormSubmission.objects.get(pk=other.pk).delete()
+        self.assertFalse(CSCActionDailyRollup.objects.exists())
+
+    def test_admin_lists_rollups_of_archived_forms(self):
+        self.action('viewed', 60)
+        self.compact()
+        archive.archive_batch(FormSubmission.objects.filter(pk=self.form.pk), 10)
+        CustomUser.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.login(username='admin', password='pw')
+        response = self.client.get(reverse('admin:website_cscactiondailyrollup_changelist'))
+        self.assertEqual(response.context['cl'].result_count, 1)
+        response = self.client.get(
+            reverse('admin:website_cscactiondailyrollup_changelist'), {'q': str(self.form.pk)},
+        )
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+
+class ArchiveTests(TestCase):
+    """archive_forms moves old completed forms and their actions to the archive tables"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.csc = CustomUser.objects.create_user('csc', 'csc@example.com', 'pw', user_type='csc')
+        cls.user = CustomUser.objects.create_user('applicant', 'applicant@example.com', 'pw', user_type='user')
+        cls.old = [create_form(cls.user, status='completed', full_name=f'Old {i}') for i in range(3)]
+        cls.recent = create_form(cls.user, status='completed', full_name='Recent')
+        cls.pending = create_form(cls.user, full_name='Pending')
+        FormSubmission.objects.filter(pk__in=[form.pk for form in cls.old]).update(
+            last_updated=timezone.now() - timedelta(days=400),
+        )
+        CSCAction.objects.create(form_submission=cls.old[0], csc_user=cls.csc, action_type='submitted')
+
+    def test_archive_command(self):
+        call_command('archive_forms', older_than_days=365, batch_size=2, stdout=io.StringIO())
+        self.assertEqual(
+            set(ArchivedFormSubmission.objects.values_list('pk', flat=True)), {form.pk for form in self.old},
+        )
+        self.assertEqual(
+            set(FormSubmission.objects.values_list('pk', flat=True)), {self.recent.pk, self.pending.pk},
+        )
+        self.assertEqual(ArchivedFormSubmission.objects.get(pk=self.old[0].pk).csc_actions.count(), 1)
+        self.assertFalse(CSCAction.objects.exists())
+
+    def test_archived_form_still_resolves(self):
+        archive.archive_batch(FormSubmission.objects.filter(pk=self.old[0].pk), 10)
+        form = archive.get_form_submission(self.old[0].pk)
+        self.assertTrue(form.is_archived)
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(reverse('view_form', args=[form.pk])), 'Old 0')
+
+
+class PreviousSubmissionTests(TestCase):
+    """Repeat applications are found through the normalized identity keys, live or archived"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('applicant', 'applicant@example.com', 'pw', user_type='user')
+        now = timezone.now()
+        cls.form = create_form(cls.user, full_name='José Díaz', email='Jose+visa@Example.com',
+                               phone_number='(555) 010-0001', date_of_birth=date(1980, 5, 1))
+        cls.same_email = create_form(cls.user, full_name='Someone', email='jose@example.com', phone_number='1',
+                                     submission_date=now - timedelta(days=1))
+        cls.same_phone = create_form(cls.user, full_name='Other', email='o@example.com', phone_number='555-010-0001',
+                                     submission_date=now - timedelta(days=2))
+        cls.same_person = create_form(cls.user, full_name='jose  diaz', email='x@example.com', phone_number='2',
+                                      date_of_birth=date(1980, 5, 1), submission_date=now - timedelta(days=3))
+        cls.stranger = create_form(cls.user, full_name='Jose Diaz', email='s@example.com', phone_number='3',
+                                   date_of_birth=date(1981, 5, 1))
+
+    def test_matches_any_identity_key_newest_first(self):
+        self.assertEqual(
+            self.form.find_previous_submissions(),
+            [self.same_email, self.same_phone, self.same_person],
+        )
+
+    def test_includes_archived_forms(self):
+        archive.archive_batch(FormSubmission.objects.filter(pk=self.same_phone.pk), 10)
+        matches = self.form.find_previous_submissions()
+        self.assertEqual([match.pk for match in matches], [self.same_email.pk, self.same_phone.pk, self.same_person.pk])
+        self.assertTrue(matches[1].is_archived)
+
+    def test_limit(self):
+        self.assertEqual(self.form.find_previous_submissions(limit=1), [self.same_email])
+
+    def test_find_duplicate_forms_backfills_and_reports(self):
+        # Rows written before the identity columns existed have them empty
+        FormSubmission.objects.update(email_normalized='', phone_digits='', identity_hash='')
+        out = io.StringIO()
+        call_command('find_duplicate_forms', batch_size=2, stdout=out)
+        output = out.getvalue()
+        self.assertIn('FormSubmission: updated identity keys on 5 rows', output)
+        self.assertEqual(FormSubmission.objects.get(pk=self.same_email.pk).email_normalized, 'jose@example.com')
+        self.assertIn(f'jose@example.com: forms #{self.form.pk}, #{self.same_email.pk}', output)
+        self.assertIn(f'5550100001: forms #{self.form.pk}, #{self.same_phone.pk}', output)
+        self.assertIn('identity_hash: 1 clusters', output)
+
+    def test_find_duplicate_forms_min_size(self):
+        out = io.StringIO()
+        call_command('find_duplicate_forms', skip_backfill=True, min_size=3, stdout=out)
+        self.assertNotIn('FormSubmission: updated', out.getvalue())
+        self.assertIn('email_normalized: 0 clusters', out.getvalue())
+
+
+class MediaTestCase(TestCase):
+    """Keeps uploads, blobs and render caches in a throwaway MEDIA_ROOT"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.media_root = Path(media_root.name)
+        media_settings = override_settings(
+            MEDIA_ROOT=media_root.name, UPLOAD_TEMP_DIR=self.media_root / 'uploads_tmp',
+            PDF_CACHE_DIR=self.media_root / 'pdf_cache',
+        )
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+
+class FormConditionalGetTests(MediaTestCase):
+    """Form pages and PDFs revalidate from the form's last_updated"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('applicant', 'applicant@example.com', 'pw', user_type='user')
+        cls.form = create_form(cls.user, status='completed')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def test_form_page(self):
+        url = reverse('view_form', args=[self.form.pk])
+        response = self.client.get(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+        FormSubmission.objects.filter(pk=self.form.pk).update(
+            comments='Approved', last_updated=timezone.now() + timedelta(seconds=1),
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertContains(response, 'Approved')
+
+    @override_settings(PDF_RENDER_ASYNC=False)
+    def test_pdf(self):
+        url = reverse('download_form_pdf', args=[self.form.pk])
+        etag = self.client.get(url)['ETag']
+        with mock.patch.object(pdf, 'render_form_pdf') as render:
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        render.assert_not_called()
+
+    def test_no_304_for_other_users(self):
+        url = reverse('view_form', args=[self.form.pk])
+        etag = self.client.get(url)['ETag']
+        other = CustomUser.objects.create_user('other', 'other@example.com', 'pw', user_type='user')
+        self.client.force_login(other)
+        self.assertRedirects(self.client.get(url, HTTP_IF_NONE_MATCH=etag), reverse('user_dashboard'))
+
+
+class ChunkedUploadTests(MediaTestCase):
+    """Documents arrive in resumable chunks and are attached on finalize"""
+
+    CONTENT = b'%PDF-1.4 ' + b'x' * 1000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('applicant', 'applicant@example.com', 'pw', user_type='user')
+        cls.form = create_form(cls.user)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def initiate(self, content=CONTENT, filename='id.pdf'):
+        response = self.client.post(reverse('upload_initiate'), {'filename': filename, 'size': len(content)})
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def put(self, url, offset, chunk):
+        return self.client.put(url, chunk, content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset))
+
+    def upload(self, form, content=CONTENT):
+        upload = self.initiate(content)
+        self.assertEqual(self.put(upload['upload_url'], 0, content).status_code, 200)
+        response = self.client.post(reverse('upload_finalize', args=[upload['upload_id']]), {
+            'form_id': form.pk, 'sha256': hashlib.sha256(content).hexdigest(),
+        })
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_resumable_upload(self):
+        upload = self.initiate()
+        url = upload['upload_url']
+        self.assertEqual(self.put(url, 0, self.CONTENT[:600]).json()['offset'], 600)
+        # A retried or out of order chunk is refused with the offset to resume from
+        response = self.put(url, 100, self.CONTENT[100:600])
+        self.assertEqual((response.status_code, response.json()['offset']), (409, 600))
+        self.assertEqual(self.client.get(url).json()['offset'], 600)
+        self.assertEqual(self.put(url, 600, self.CONTENT[600:]).json()['offset'], len(self.CONTENT))
+
+        response = self.client.post(reverse('upload_finalize', args=[upload['upload_id']]), {
+            'form_id': self.form.pk, 'sha256': hashlib.sha256(self.CONTENT).hexdigest(),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.form.refresh_from_db()
+        with self.form.document_file.open('rb') as f:
+            self.assertEqual(f.read(), self.CONTENT)
+        self.assertEqual(DocumentJob.objects.get(form_submission=self.form).status, 'pending')
+        self.assertFalse(any((self.media_root / 'uploads_tmp').iterdir()))
+
+    def test_checksum_mismatch(self):
+        upload = self.initiate()
+        self.put(upload['upload_url'], 0, self.CONTENT)
+        response = self.client.post(reverse('upload_finalize', args=[upload['upload_id']]), {
+            'form_id': self.form.pk, 'sha256': '0' * 64,
+        })
+        self.assertEqual(response.status_code, 422)
+        self.form.refresh_from_db()
+        self.assertFalse(self.form.document_file)
+
+    def test_other_users_form_is_refused(self):
+        other = CustomUser.objects.create_user('other', 'other@example.com', 'pw', user_type='user')
+        upload = self.initiate()
+        self.put(upload['upload_url'], 0, self.CONTENT)
+        response = self.client.post(reverse('upload_finalize', args=[upload['upload_id']]), {
+            'form_id': create_form(other).pk,
+        })
+        self.assertEqual(response.status_code, 400)
+
+
+class DocumentDedupTests(MediaTestCase):
+    """Identical documents are stored once and reference counted"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('applicant', 'applicant@example.com', 'pw', user_type='user')
+
+    def test_identical_documents_share_a_blob(self):
+        first, second = create_form(self.user), create_form(self.user)
+        first.document_file.save('scan.pdf', ContentFile(b'same bytes'))
+        second.document_file.save('copy-of-scan.pdf', ContentFile(b'same bytes'))
+        self.assertEqual(first.document_file.name, second.document_file.name)
+        blob = DocumentBlob.objects.get()
+        self.assertEqual((blob.refcount, blob.sha256), (2, hashlib.sha256(b'same bytes').hexdigest()))
+
+        second.document_file.save('other.pdf', ContentFile(b'other bytes'))
+        first.delete()
+        blob.refresh_from_db()
+        self.assertEqual(blob.refcount, 0)
+
+        call_command('gc_documents', grace_hours=0, stdout=io.StringIO())
+        self.assertEqual(list(DocumentBlob.objects.values_list('name', flat=True)), [second.document_file.name])
+        self.assertFalse(second.document_file.storage.exists(blob.name))
+        self.assertTrue(second.document_file.storage.exists(second.document_file.name))
+
+    def test_dedup_legacy_files(self):
+        legacy = self.media_root / 'form_documents'
+        legacy.mkdir()
+        forms = []
+        for name in ('a.pdf', 'b.pdf'):
+            (legacy / name).write_bytes(b'same bytes')
+            form = create_form(self.user)
+            # Rows written before the blob store, with plain upload names
+            FormSubmission.objects.filter(pk=form.pk).update(document_file=f'form_documents/{name}')
+            forms.append(form)
+
+        call_command('dedup_documents', stdout=io.StringIO())
+        names = set(FormSubmission.objects.values_list('document_file', flat=True))
+        self.assertEqual(len(names), 1)
+        self.assertTrue(storage.is_blob_name(names.pop()))
+        self.assertEqual(DocumentBlob.objects.get().refcount, 2)
+        self.assertEqual(list(legacy.glob('*.pdf')), [])
+
+
+@override_settings(CSC_CLAIM_MAX_ACTIVE=3)
+class WorkQueueTests(TestCase):
+    """Agents lease disjoint pending forms, oldest first, up to a cap"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.csc = CustomUser.objects.create_user('csc', 'csc@example.com', 'pw', user_type='csc')
+        cls.other_csc = CustomUser.objects.create_user('csc2', 'csc2@example.com', 'pw', user_type='csc')
+        cls.user = CustomUser.objects.create_user('applicant', 'applicant@example.com', 'pw', user_type='user')
+        start = timezone.now() - timedelta(days=1)
+        cls.forms = [create_form(cls.user, submission_date=start + timedelta(minutes=i)) for i in range(5)]
+        create_form(cls.user, status='completed', submission_date=start - timedelta(minutes=1))
+
+    def test_oldest_first_and_capped(self):
+        self.assertEqual(workqueue.claim_next(self.csc, 2), [f.pk for f in self.forms[:2]])
+        # Only one more fits under the cap of three
+        self.assertEqual(workqueue.claim_next(self.csc, 5), [self.forms[2].pk])
+        self.assertEqual(workqueue.claim_next(self.csc, 5), [])
+
+    def test_agents_get_disjoint_forms(self):
+        mine = workqueue.claim_next(self.csc, 3)
+        theirs = workqueue.claim_next(self.other_csc, 3)
+        self.assertEqual(set(mine) & set(theirs), set())
+        self.assertEqual(len(theirs), 2)
+
+    def test_expired_lease_taken_over(self):
+        claimed = workqueue.claim_next(self.csc, 1)
+        FormClaim.objects.filter(pk__in=claimed).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(workqueue.claim_next(self.other_csc, 1), claimed)
+        self.assertEqual(workqueue.holder(claimed[0]).csc_user, self.other_csc)
+        self.assertFalse(workqueue.renew(self.csc, claimed[0]))
+
+    def test_release(self):
+        form_id = workqueue.claim_next(self.csc, 1)[0]
+        self.assertFalse(workqueue.release(form_id, user=self.other_csc))
+        self.assertTrue(workqueue.release(form_id, user=self.csc))
+        self.assertIsNone(workqueue.holder(form_id))
+
+    def test_claim_and_release_views(self):
+        self.client.force_login(self.csc)
+        response = self.client.post(reverse('csc_claim_forms'), {'count': 50})
+        self.assertRedirects(response, reverse('csc_dashboard'), fetch_redirect_response=False)
+        self.assertEqual(FormClaim.objects.filter(csc_user=self.csc).count(), 3)
+
+        form_id = self.forms[0].pk
+        self.client.post(reverse('csc_release_form', args=[form_id]))
+        self.assertIsNone(workqueue.holder(form_id))
+
+    def test_views_csc_only(self):
+        self.client.force_login(self.user)
+        self.client.post(reverse('csc_claim_forms'))
+        self.assertFalse(FormClaim.objects.exists())
+
+
+class EditConflictTests(TestCase):
+    """CSC edits only write the changed fields, and only over the version the agent saw"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.csc = CustomUser.objects.create_user('csc', 'csc@example.com', 'pw', user_type='csc')
+        cls.user = CustomUser.objects.create_user('applicant', 'applicant@example.com', 'pw', user_type='user')
+        cls.form = create_form(cls.user)
+
+    def setUp(self):
+        self.client.force_login(self.csc)
+        self.url = reverse('edit_form', args=[self.form.pk])
+
+    def edit_data(self, form, **changes):
+        """POST data for the edit page as rendered for form, with changes applied"""
+        data = {'version': form.version}
+        for name in FormEditForm._meta.fields:
+            value = getattr(form, name)
+            if isinstance(value, bool):
+                value = 'on' if value else ''
+            value = '' if value is None else str(value)
+            data[name] = data[f'initial-{name}'] = value
+        data.update(changes)
+        return data
+
+    def test_save_if_version(self):
+        stale = FormSubmission.objects.get(pk=self.form.pk)
+        FormSubmission.objects.get(pk=self.form.pk).save()
+        stale.occupation = 'Teacher'
+        with self.assertRaises(VersionConflict):
+            stale.save_if_version(self.form.version, update_fields=['occupation'])
+        self.assertEqual(FormSubmission.objects.get(pk=self.form.pk).occupation, 'Engineer')
+
+    def test_overlapping_edit_shows_conflict(self):
+        data = self.edit_data(self.form, occupation='Teacher')
+        FormSubmission.objects.filter(pk=self.form.pk).update(occupation='Doctor', version=self.form.version + 1)
+
+        response = self.client.post(self.url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Edit conflict')
+        self.assertEqual(FormSubmission.objects.get(pk=self.form.pk).occupation, 'Doctor')
+
+    def test_disjoint_edit_rebased(self):
+        data = self.edit_data(self.form, occupation='Teacher')
+        FormSubmission.objects.filter(pk=self.form.pk).update(comments='Checked', version=self.form.version + 1)
+
+        response = self.client.post(self.url, data)
+        self.assertRedirects(response, reverse('csc_dashboard'), fetch_redirect_response=False)
+        form = FormSubmission.objects.get(pk=self.form.pk)
+        self.assertEqual((form.occupation, form.comments), ('Teacher', 'Checked'))
+        self.assertEqual(form.version, self.form.version + 2)
+
+
+class ReplicaTestCase(TransactionTestCase):
+    """
+    Adds a `replica` alias backed by a second in-memory SQLite database, which
+    only sees the primary's data as of the last sync_replica(). Transactional,
+    as the backup only copies committed rows.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # Added here rather than in settings, so the runner doesn't set it up
+        replica = {
+            **connections['default'].settings_dict,
+            'NAME': 'file:memorydb_replica?mode=memory&cache=shared',
+            # Not flushed between tests, the next backup overwrites it
+            'TEST': {'MIRROR': 'default'},
+        }
+        databases = mock.patch.dict(settings.DATABASES, {routers.REPLICA: replica})
+        databases.start()
+        cls.addClassCleanup(databases.stop)
+        cls.addClassCleanup(connections.__delitem__, routers.REPLICA)
+        cls.addClassCleanup(lambda: connections[routers.REPLICA].close())
+        cls.databases = {'default', routers.REPLICA}
+        super().setUpClass()
+
+    def setUp(self):
+        fragments.clear()
+
+    def sync_replica(self):
+        """What sync_replica does between the two files"""
+        replica = connections[routers.REPLICA]
+        replica.ensure_connection()
+        connections['default'].connection.backup(replica.connection)
+
+    def capture(self):
+        """Captured queries of the primary and the replica"""
+        return CaptureQueriesContext(connections['default']), CaptureQueriesContext(connections[routers.REPLICA])
+
+
+def form_queries(captured):
+    return [q['sql'] for q in captured if 'FROM "website_formsubmission"' in q['sql']]
+
+
+class ReplicaRoutingTests(ReplicaTestCase):
+    """Opted-in reads go to the replica; writes, and reads after them, stay on the primary"""
+
+    def setUp(self):
+        super().setUp()
+        self.csc = CustomUser.objects.create_user('csc', 'csc@example.com', 'pw', user_type='csc')
+        self.user = CustomUser.objects.create_user('applicant', 'applicant@example.com', 'pw', user_type='user')
+        self.synced = create_form(self.user, full_name='Synced Applicant')
+        self.sync_replica()
+        # Only on the primary until the next sync
+        self.lagging = create_form(self.user, full_name='Lagging Applicant')
+
+    def get(self, user, url_name, **params):
+        self.client.force_login(user)
+        primary, replica = self.capture()
+        with primary, replica:
+            response = self.client.get(reverse(url_name), params)
+            # Streamed bodies are read after the view returned
+            content = b''.join(response.streaming_content) if response.streaming else response.content
+        return content.decode(), primary, replica
+
+    def assertListsForms(self, content, forms):
+        listed = {int(form_id) for form_id in re.findall(r'/forms/(\d+)/view/', content)}
+        self.assertEqual(listed, {form.pk for form in forms})
+
+    def test_dashboard_reads_replica(self):
+        content, primary, replica = self.get(self.user, 'user_dashboard')
+        self.assertListsForms(content, [self.synced])
+        self.assertTrue(form_queries(replica))
+        self.assertEqual(form_queries(primary), [])
+        # Sessions are written on most requests and never leave the primary
+        self.assertTrue(any('"django_session"' in q['sql'] for q in primary))
+        self.assertFalse(any('"django_session"' in q['sql'] for q in replica))
+
+    def test_session_sticks_to_primary_after_write(self):
+        # Logging in writes last_login
+        self.client.post(reverse('user_login'), {'username': 'applicant', 'password': 'pw'})
+        content, primary, replica = self.get(self.user, 'user_forms_list')
+        self.assertListsForms(content, [self.synced, self.lagging])
+        self.assertEqual(form_queries(replica), [])
+
+        with mock.patch('time.time', return_value=time.time() + settings.REPLICA_STICKY_SECONDS + 1):
+            content, primary, replica = self.get(self.user, 'user_forms_list')
+        self.assertListsForms(content, [self.synced])
+        self.assertTrue(form_queries(replica))
+
+    def test_writes_and_later_reads_use_primary(self):
+        primary, replica = self.capture()
+        with primary, replica, routers.replica_reads():
+            self.assertEqual(FormSubmission.objects.count(), 1)
+            create_form(self.user)
+            self.assertEqual(FormSubmission.objects.count(), 3)
+        self.assertEqual(len(replica), 1)
+        self.assertFalse(any(q['sql'].startswith('INSERT') for q in replica))
+
+    def test_streamed_export_keeps_routing(self):
+        content, primary, replica = self.get(self.csc, 'export_data', source='forms', format='csv')
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual([row['full_name'] for row in rows], ['Synced Applicant'])
+        self.assertEqual(form_queries(primary), [])
+
+    def test_no_replica_reads_without_the_alias(self):
+        with mock.patch.dict(settings.DATABASES):
+            del settings.DATABASES[routers.REPLICA]
+            with routers.replica_reads() as state:
+                self.assertFalse(state.use_replica)
+
+
+class SyncReplicaTests(TestCase):
+    """sync_replica copies the primary file into the replica with the backup API"""
+
+    def test_sync(self):
+        with tempfile.TemporaryDirectory() as directory:
+            primary, replica = Path(directory, 'primary.sqlite3'), Path(directory, 'replica.sqlite3')
+            with closing(sqlite3.connect(primary)) as db, db:
+                db.execute('CREATE TABLE t (value TEXT)')
+                db.execute("INSERT INTO t VALUES ('copied')")
+            sync_replica.Command().sync(str(primary), str(replica), pages=1)
+            with closing(sqlite3.connect(replica)) as db:
+                self.assertEqual(db.execute('SELECT value FROM t').fetchall(), [('copied',)])
+
+    def test_requires_replica(self):
+        with self.assertRaises(CommandError):
+            call_command('sync_replica', stdout=io.StringIO())
+
+
+class AuditReplicaTests(ReplicaTestCase):
+    """Audit flushes inside replica-routed views check and write on the primary"""
+
+    def test_flush_in_replica_view(self):
+        csc = CustomUser.objects.create_user('csc', 'csc@example.com', 'pw', user_type='csc')
+        user = CustomUser.objects.create_user('applicant', 'applicant@example.com', 'pw', user_type='user')
+        synced = create_form(user)
+        self.sync_replica()
+        lagging = [create_form(user), create_form(user)]
+
+        writer = audit.AuditLogWriter(batch_size=3, flush_interval=60)
+        self.addCleanup(writer.flush)
+        # By id: assigning instances would ask the router for a write database
+        for form in lagging:
+            writer.add(CSCAction(form_submission_id=form.pk, csc_user_id=csc.pk, action_type='edited'))
+        primary, replica = self.capture()
+        # As in view_form, whose 'viewed' action fills the batch
+        with primary, replica, routers.replica_reads():
+            writer.add(CSCAction(form_submission_id=synced.pk, csc_user_id=csc.pk, action_type='viewed'))
+
+        self.assertEqual(CSCAction.objects.count(), 3)
+        self.assertEqual(len(replica), 0)
+
+
+class DocumentProcessingTests(MediaTestCase):
+    """process_documents records metadata, writes previews and shrinks oversized images"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('applicant', 'applicant@example.com', 'pw', user_type='user')
+
+    def attach(self, name, content):
+        form = create_form(self.user)
+        form.document_file.save(name, ContentFile(content))
+        return form
+
+    def pdf_bytes(self, pages):
+        buffer = io.BytesIO()
+        document = canvas.Canvas(buffer)
+        for page in range(pages):
+            document.drawString(100, 750, f'Page {page + 1}')
+            document.showPage()
+        document.save()
+        return buffer.getvalue()
+
+    def image_bytes(self, size, fmt='JPEG'):
+        buffer = io.BytesIO()
+        Image.effect_noise(size, 64).convert('RGB').save(buffer, fmt)
+        return buffer.getvalue()
+
+    def test_pdf(self):
+        form = self.attach('scan.pdf', self.pdf_bytes(3))
+        result = documents.process(form)
+        self.assertEqual(result['metadata']['pages'], 3)
+        self.assertEqual(result['metadata']['content_type'], 'application/pdf')
+        self.assertEqual(result['document'], form.document_file.name)
+        with default_storage.open(result['preview']) as f, Image.open(f) as preview:
+            self.assertEqual(preview.format, 'JPEG')
+            self.assertLessEqual(max(preview.size), max(settings.DOCUMENT_PREVIEW_SIZE))
+
+        self.assertTrue(documents.apply_result(result))
+        form.refresh_from_db()
+        self.assertEqual(form.document_metadata['pages'], 3)
+        self.assertEqual(form.document_preview.name, result['preview'])
+
+    def test_pdf_without_pdfium(self):
+        form = self.attach('scan.pdf', self.pdf_bytes(2))
+        with mock.patch.object(documents, 'pdfium', None):
+            result = documents.process(form)
+        self.assertEqual(result['metadata']['pages'], 2)
+        self.assertIsNone(result['preview'])
+
+    @override_settings(DOCUMENT_MAX_IMAGE_DIMENSION=200)
+    def test_oversized_image_recompressed(self):
+        content = self.image_bytes((800, 400))
+        form = self.attach('photo.jpg', content)
+        result = documents.process(form)
+        metadata = result['metadata']
+        self.assertNotEqual(result['document'], form.document_file.name)
+        self.assertEqual((metadata['width'], metadata['height'], metadata['original_size']), (200, 100, len(content)))
+        self.assertLess(metadata['size'], len(content))
+
+        self.assertTrue(documents.apply_result(result))
+        form.refresh_from_db()
+        self.assertEqual(form.document_file.name, result['document'])
+        with form.document_file.open('rb') as f, Image.open(f) as image:
+            self.assertEqual(image.size, (200, 100))
+
+    def test_small_image_kept(self):
+        form = self.attach('photo.png', self.image_bytes((120, 80), 'PNG'))
+        result = documents.process(form)
+        self.assertEqual(result['document'], form.document_file.name)
+        self.assertEqual(result['metadata']['content_type'], 'image/png')
+        self.assertTrue(default_storage.exists(result['preview']))
+
+    def test_result_for_replaced_document_is_ignored(self):
+        form = self.attach('scan.pdf', self.pdf_bytes(1))
+        result = documents.process(form)
+        form.document_file.save('other.pdf', ContentFile(self.pdf_bytes(2)))
+        self.assertFalse(documents.apply_result(result))
+        form.refresh_from_db()
+        self.assertEqual(form.document_metadata, {})
+
+    def test_command(self):
+        form = self.attach('scan.pdf', self.pdf_bytes(2))
+        DocumentJob.enqueue(form)
+
+        def pool(processes, mp_context, initializer):
+            # Threads see this test's MEDIA_ROOT, spawned processes would not
+            return ThreadPoolExecutor(processes)
+
+        with mock.patch('website.management.commands.process_documents.ProcessPoolExecutor', pool):
+            call_command('process_documents', once=True, processes=1, stdout=io.StringIO())
+        self.assertEqual(DocumentJob.objects.get(form_submission=form).status, 'done')
+        form.refresh_from_db()
+        self.assertEqual(form.document_metadata['pages'], 2)
+
+    def test_command_warns_without_pdfium(self):
+        stderr = io.StringIO()
+        with mock.patch.object(documents, 'pdfium', None):
+            call_command('process_documents', once=True, processes=1, stdout=io.StringIO(), stderr=stderr)
+        self.assertIn('pypdfium2 is not installed', stderr.getvalue())
+
+
+class DocumentDownloadTests(MediaTestCase):
+    """Documents are served to their owner and CSC agents, with Range support or by the front proxy"""
+
+    CONTENT = b'%PDF-1.4 0123456789'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('applicant', 'applicant@example.com', 'pw', user_type='user')
+
+    def setUp(self):
+        super().setUp()
+        self.form = create_form(self.user)
+        self.form.document_file.save('scan.pdf', ContentFile(self.CONTENT))
+        self.url = reverse('download_form_document', args=[self.form.pk])
+        self.client.force_login(self.user)
+
+    def test_full_download(self):
+        response = self.client.get(self.url)
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT)
+        self.assertEqual(response['ETag'], f'"{hashlib.sha256(self.CONTENT).hexdigest()}"')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=9-12')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 9-12/{len(self.CONTENT)}')
+        self.assertEqual(b''.join(response.streaming_content), b'0123')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(b''.join(response.streaming_content), b'789')
+
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.CONTENT)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.CONTENT)}')
+
+    def test_if_range(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-3', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+        # A changed file is sent whole
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-3', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT)
+
+    def test_legacy_file_etag_follows_content(self):
+        legacy = self.media_root / 'form_documents' / 'legacy.pdf'
+        legacy.write_bytes(self.CONTENT)
+        FormSubmission.objects.filter(pk=self.form.pk).update(document_file='form_documents/legacy.pdf')
+        etag = self.client.get(self.url)['ETag']
+
+        # Same name and size, new content
+        legacy.write_bytes(b'%PDF-1.4 9876543210')
+        modified = legacy.stat().st_mtime + 1
+        os.utime(legacy, (modified, modified))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4 9876543210')
+
+    @override_settings(PROTECTED_MEDIA_BACKEND='x-accel-redirect')
+    def test_x_accel_redirect(self):
+        response = self.client.get(self.url)
+        self.assertEqual(
+            response['X-Accel-Redirect'], settings.PROTECTED_MEDIA_INTERNAL_URL + self.form.document_file.name,
+        )
+        self.assertEqual(response.content, b'')
+
+    @override_settings(PROTECTED_MEDIA_BACKEND='x-sendfile')
+    def test_x_sendfile(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Sendfile'], self.form.document_file.path)
+        self.assertEqual(response.content, b'')
+
+    def test_other_users_are_refused(self):
+        other = CustomUser.objects.create_user('other', 'other@example.com', 'pw', user_type='user')
+        self.client.force_login(other)
+        self.assertRedirects(self.client.get(self.url), reverse('user_dashboard'))
+
+
+class FragmentCacheTests(TestCase):
+    """Dashboard fragments are rendered once per key and counted as hits or misses"""
+
+    def setUp(self):
+        fragments.clear()
+        self.render = mock.Mock(return_value='<p>stats</p>')
+
+    def test_hits_and_misses(self):
+        for _ in range(3):
+            self.assertEqual(fragments.get_or_render(('csc', 'stats', 1), self.render), '<p>stats</p>')
+        fragments.get_or_render(('csc', 'stats', 2), self.render)
+        self.assertEqual(self.render.call_count, 2)
+        self.assertEqual(fragments.stats(), {'hits': 2, 'misses': 2})
+        fragments.reset_stats()
+        self.assertEqual(fragments.stats(), {'hits': 0, 'misses': 0})
+
+    def test_clear(self):
+        fragments.get_or_render(('csc', 'stats', 1), self.render)
+        fragments.clear()
+        fragments.get_or_render(('csc', 'stats', 1), self.render)
+        self.assertEqual(self.render.call_count, 2)
+
+    def test_command_refuses_per_process_cache(self):
+        with self.assertRaisesMessage(CommandError, 'FRAGMENT_CACHE_DIR'):
+            call_command('fragment_cache_stats', stdout=io.StringIO())
+
+    def test_command_with_shared_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(CACHES={
+            **settings.CACHES,
+            'fragments': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cache_dir},
+        }):
+            fragments.get_or_render(('csc', 'stats', 1), self.render)
+            fragments.get_or_render(('csc', 'stats', 1), self.render)
+            stdout = io.StringIO()
+            call_command('fragment_cache_stats', clear=True, stdout=stdout)
+            self.assertIn('hits: 1, misses: 1', stdout.getvalue())
+            fragments.get_or_render(('csc', 'stats', 1), self.render)
+        self.assertEqual(self.render.call_count, 2)
@@ -0,0 +1,195 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+
+from .models import DocumentUpload, FormSubmission
+
+# Chunked document uploads. Each DocumentUpload streams into
+# UPLOAD_TEMP_DIR/<id>.part; on finalize the part file is moved (not copied)
+# into the FileField's storage and attached to the form.
+
+READ_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """A chunk or finalize request that can't be applied; carries an HTTP status"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class _HashCache:
+    """
+    Running SHA-256 per upload, fed as chunks stream in. hashlib objects can't
+    be stored in the database, so the state lives in this process; a chunk
+    that lands on another worker, or a restart, falls back to re-reading the
+    part file once.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, upload_id, offset):
+        """Remove and return the hasher for upload_id if it covers exactly `offset` bytes"""
+        with self._lock:
+            entry = self._entries.pop(upload_id, None)
+        if entry is not None and entry[0] == offset:
+            return entry[1]
+        return None
+
+    def put(self, upload_id, offset, hasher):
+        with self._lock:
+            self._entries[upload_id] = (offset, hasher)
+            self._entries.move_to_end(upload_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, upload_id):
+        with self._lock:
+            self._entries.pop(upload_id, None)
+
+
+hashes = _HashCache(max_entries=1000)
+
+
+def _stale_after():
+    return timedelta(seconds=settings.UPLOAD_LOCK_STALE_AFTER)
+
+
+def part_path(upload):
+    return Path(settings.UPLOAD_TEMP_DIR) / f'{upload.pk}.part'
+
+
+def _hash_file(path, length):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        remaining = length
+        while remaining:
+            block = f.read(min(READ_SIZE, remaining))
+            if not block:
+                break
+            hasher.update(block)
+            remaining -= len(block)
+    return hasher
+
+
+def write_chunk(upload, offset, stream, length):
+    """
+    Stream `length` bytes from `stream` into the upload's part file at
+    `offset`, hashing as they are written. Returns the new received count.
+    """
+    if length > settings.UPLOAD_CHUNK_MAX_BYTES:
+        raise UploadError('Chunk too large.', status=413)
+    if offset + length > upload.size:
+        raise UploadError('Chunk extends past the declared upload size.', status=416)
+
+    token = upload.lock(offset, _stale_after())
+    if token is None:
+        upload.refresh_from_db()
+        raise UploadError('Upload offset mismatch.', status=409)
+
+    path = part_path(upload)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    hasher = hashes.take(upload.pk, offset)
+    if hasher is None:
+        hasher = _hash_file(path, offset) if offset else hashlib.sha256()
+
+    written = 0
+    try:
+        with open(path, 'r+b' if path.exists() else 'wb') as f:
+            f.seek(offset)
+            while written < length:
+                block = stream.read(min(READ_SIZE, length - written))
+                if not block:
+                    break
+                f.write(block)
+                hasher.update(block)
+                written += len(block)
+        if written != length:
+            raise UploadError('Chunk body shorter than Content-Length.')
+    except BaseException:
+        # Bytes past `received` are overwritten by the retried chunk
+        upload.unlock(token)
+        raise
+
+    received = offset + written
+    upload.unlock(token, received=received)
+    hashes.put(upload.pk, received, hasher)
+    upload.received = received
+    return received
+
+
+def finalize(upload, form_submission, expected_sha256=''):
+    """Verify the finished upload and attach it to form_submission"""
+    if upload.received != upload.size:
+        raise UploadError('Upload is incomplete.', status=409)
+    # The same lock as a chunk write at the end offset, so a concurrent
+    # finalize or a stray chunk can't interleave with this one
+    token = upload.lock(upload.size, _stale_after())
+    if token is None:
+        raise UploadError('Upload is busy or already finalized.', status=409)
+
+    path = part_path(upload)
+    try:
+        # A retried chunk may have left bytes past the end
+        with open(path, 'r+b') as f:
+            f.truncate(upload.size)
+        hasher = hashes.take(upload.pk, upload.size) or _hash_file(path, upload.size)
+        digest = hasher.hexdigest()
+        if expected_sha256 and expected_sha256.lower() != digest:
+            hashes.put(upload.pk, upload.size, hasher)
+            raise UploadError('SHA-256 mismatch.', status=422)
+
+        field = FormSubmission._meta.get_field('document_file')
+        name = field.generate_filename(form_submission, upload.filename)
+        with open(path, 'rb') as f:
+            stored = field.storage.save(name, _PartFile(f, path, digest), max_length=field.max_length)
+    except BaseException:
+        upload.unlock(token)
+        raise
+
+    form_submission.document_file.name = stored
+    # Metadata and preview belong to the previous document until reprocessed
+    form_submission.document_metadata = {}
+    form_submission.document_preview = None
+    form_submission.save(update_fields=['document_file', 'document_metadata', 'document_preview', 'last_updated'])
+    DocumentUpload.objects.filter(pk=upload.pk, lock_token=token).update(
+        status='complete', sha256=digest, form_submission=form_submission,
+        lock_token='', locked_at=None, updated_at=timezone.now(),
+    )
+    upload.refresh_from_db()
+    if path.exists():
+        path.unlink()
+    return digest
+
+
+def discard(upload):
+    """Delete an upload's part file and in-memory hash state"""
+    hashes.discard(upload.pk)
+    try:
+        os.remove(part_path(upload))
+    except FileNotFoundError:
+        pass
+
+
+class _PartFile(File):
+    # FileSystemStorage moves files that expose a temporary path instead of
+    # copying them block by block, and the document storage reuses the digest
+    # rather than hashing the file again
+    def __init__(self, file, path, sha256):
+        super().__init__(file, name=path.name)
+        self._path = path
+        self.sha256 = sha256
+
+    def temporary_file_path(self):
+        return str(self._path)
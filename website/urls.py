@@ -15,15 +15,31 @@ urlpatterns = [
     # Dashboard URLs
     path('user/dashboard/', views.user_dashboard, name='user_dashboard'),
     path('csc/dashboard/', views.csc_dashboard, name='csc_dashboard'),
+    path('csc/search/', views.csc_search, name='csc_search'),
+    path('csc/forms/bulk/', views.csc_bulk_update, name='csc_bulk_update'),
+    path('csc/queue/claim/', views.csc_claim_forms, name='csc_claim_forms'),
+    path('csc/queue/<int:form_id>/release/', views.csc_release_form, name='csc_release_form'),
     path('technician/dashboard/', views.technician_dashboard, name='technician_dashboard'),
     
     # Form management URLs
     path('user/forms/create/', views.create_form, name='create_form'),
     path('user/forms/', views.user_forms_list, name='user_forms_list'),
     path('forms/<int:form_id>/view/', views.view_form, name='view_form'),
+    path('forms/<int:form_id>/detail/', views.form_detail, name='form_detail'),
     path('forms/<int:form_id>/edit/', views.edit_form, name='edit_form'),
     path('forms/<int:form_id>/submit/', views.submit_form, name='submit_form'),
     path('forms/<int:form_id>/download/', views.download_form_pdf, name='download_form_pdf'),
+    path('forms/<int:form_id>/document/', views.download_form_document, name='download_form_document'),
+    path('forms/<int:form_id>/document/preview/', views.download_form_document, {'preview': True}, name='form_document_preview'),
+    
+    # Chunked upload URLs
+    path('uploads/', views.upload_initiate, name='upload_initiate'),
+    path('uploads/<uuid:upload_id>/', views.upload_chunk, name='upload_chunk'),
+    path('uploads/<uuid:upload_id>/finalize/', views.upload_finalize, name='upload_finalize'),
+    
+    # Export URLs
+    path('csc/export/pdfs/', views.export_pdfs, name='export_pdfs'),
+    path('csc/export/data/', views.export_data, name='export_data'),
     
     # Legacy URLs (keeping for compatibility)
     path('home/', views.home, name='home'),
@@ -1,19 +1,24 @@
-from django.http import HttpResponse, Http404
+import os
+
+from django.http import HttpResponse, Http404, FileResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
+from django.template.defaultfilters import date as format_date
+from django.template.loader import render_to_string
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.core.paginator import Paginator
+from django.conf import settings
 from django.db.models import Q
 from django.utils import timezone
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-import io
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.http import require_http_methods, require_POST
 
-from .models import CustomUser, FormSubmission, CSCAction
-from .forms import CustomUserCreationForm, CustomAuthenticationForm, FormSubmissionForm, FormEditForm
+from .models import CustomUser, FormSubmission, VersionConflict, FormStatusCounter, PdfRenderJob, DocumentJob, DocumentUpload
+from . import archive, audit, bulk, conditional, exports, fragments, media, pdf, queries, search, uploads, workqueue
+from .pagination import CursorPaginator
+from .routers import read_from_replica, stream_with_current_routing
+from .forms import CustomUserCreationForm, CustomAuthenticationForm, FormSubmissionForm, FormEditForm, ExportFilterForm, DataExportForm, BulkUpdateForm
 
 
 def create_superuser_view(request):
@@ -101,48 +106,149 @@ def user_logout(request):
 
 # Dashboard Views
 @login_required
+@read_from_replica
 def user_dashboard(request):
     if request.user.user_type != 'user':
         messages.error(request, 'Access denied.')
         return redirect('landing_page')
     
-    user_forms = FormSubmission.objects.filter(user=request.user)
-    total_forms = user_forms.count()
-    completed_forms = user_forms.filter(status='completed').count()
-    pending_forms = user_forms.exclude(status='completed').count()
+    user_id = request.user.pk
+    version = conditional.forms_version(request.user)
+    etag = conditional.dashboard_etag(request.user, user_id, version)
+    response = conditional.not_modified(request, etag)
+    if response is not None:
+        return response
+    
+    # Fragments are keyed by the version of the user's forms, which every
+    # write moves on, so the queries below only run on a cache miss
+    def render_stats():
+        counter = FormStatusCounter.get_for(request.user)
+        return render_to_string('user/_stats.html', {
+            'total_forms': counter.total,
+            'completed_forms': counter.completed,
+            'pending_forms': counter.pending,
+        })
+    
+    def render_recent_forms():
+        # Latest 5 forms, archived ones included as they are in the counts
+        page = CursorPaginator(_user_form_tables(request.user), 5, row_class=queries.FormRow).get_page()
+        return render_to_string('user/_recent_forms.html', {'user_forms': page.object_list})
     
     context = {
-        'user_forms': user_forms[:5],  # Show latest 5 forms
-        'total_forms': total_forms,
-        'completed_forms': completed_forms,
-        'pending_forms': pending_forms,
+        'stats_html': fragments.get_or_render(('user', user_id, 'stats', version), render_stats),
+        'recent_forms_html': fragments.get_or_render(('user', user_id, 'recent', version), render_recent_forms),
     }
-    return render(request, 'user/dashboard.html', context)
+    return conditional.set_validators(render(request, 'user/dashboard.html', context), etag)
 
 @login_required
+@read_from_replica
 def csc_dashboard(request):
     if request.user.user_type != 'csc':
         messages.error(request, 'Access denied.')
         return redirect('landing_page')
     
-    pending_forms = FormSubmission.objects.exclude(status__in=['completed']).order_by('-submission_date')
-    completed_forms = FormSubmission.objects.filter(status='completed').order_by('-submission_date')
+    pending_cursor = request.GET.get('pending_cursor', '')
+    completed_cursor = request.GET.get('completed_cursor', '')
+    # Every CSC agent sees the same dashboard, so fragments are shared across
+    # the role and only re-rendered after a write to the forms or, for the
+    # pending table, a change in the work queue leases
+    version = conditional.forms_version()
+    claims = workqueue.claims_version()
+    # The queue and bulk forms embed a CSRF token
+    etag = conditional.dashboard_etag(request.user, 'all', version, claims, conditional.csrf_version(request))
+    response = conditional.not_modified(request, etag)
+    if response is not None:
+        return response
+    
+    # Read once, and only if a fragment below misses
+    counter = SimpleLazyObject(lambda: FormStatusCounter.get_for(None))
+    
+    def render_stats():
+        return render_to_string('csc/_stats.html', {
+            'pending_count': counter.pending,
+            'completed_count': counter.completed,
+            'total_count': counter.total,
+        })
+    
+    def render_pending():
+        table = queries.table_rows(queries.pending_forms(), queries.CSC_PENDING_FIELDS)
+        page = CursorPaginator(table, 10, row_class=queries.FormRow).get_page(pending_cursor)
+        return render_to_string('csc/_pending_forms.html', {'pending_forms': page, 'pending_count': counter.pending})
+    
+    def render_completed():
+        table = queries.table_rows(queries.completed_forms(), queries.CSC_TABLE_FIELDS)
+        page = CursorPaginator(table, 10, row_class=queries.FormRow).get_page(completed_cursor)
+        return render_to_string('csc/_completed_forms.html', {
+            'completed_forms': page, 'completed_count': counter.completed,
+        })
     
-    # Pagination
-    pending_paginator = Paginator(pending_forms, 10)
-    completed_paginator = Paginator(completed_forms, 10)
+    context = {
+        'stats_html': fragments.get_or_render(('csc', 'stats', version), render_stats),
+        'pending_forms_html': fragments.get_or_render(('csc', 'pending', pending_cursor, version, claims), render_pending),
+        'completed_forms_html': fragments.get_or_render(('csc', 'completed', completed_cursor, version), render_completed),
+        # Per agent and small, so never cached
+        'claimed_forms': workqueue.claimed_forms(request.user),
+        'claim_batch_size': settings.CSC_CLAIM_BATCH_SIZE,
+        'bulk_form': BulkUpdateForm(),
+    }
+    return conditional.set_validators(render(request, 'csc/dashboard.html', context), etag)
+
+@login_required
+@require_POST
+def csc_claim_forms(request):
+    if request.user.user_type != 'csc':
+        messages.error(request, 'Access denied.')
+        return redirect('landing_page')
+    
+    try:
+        count = int(request.POST.get('count', settings.CSC_CLAIM_BATCH_SIZE))
+    except ValueError:
+        count = settings.CSC_CLAIM_BATCH_SIZE
+    count = max(1, min(count, settings.CSC_CLAIM_MAX_ACTIVE))
+    
+    claimed = workqueue.claim_next(request.user, count)
+    if claimed:
+        messages.success(request, f'Claimed {len(claimed)} form(s) for {settings.CSC_CLAIM_LEASE_SECONDS // 60} minutes.')
+    else:
+        messages.warning(request, 'No unclaimed pending forms available, or you already hold the maximum.')
+    return redirect('csc_dashboard')
+
+@login_required
+@require_POST
+def csc_release_form(request, form_id):
+    if request.user.user_type != 'csc':
+        messages.error(request, 'Access denied.')
+        return redirect('landing_page')
+    
+    if workqueue.release(form_id, user=request.user):
+        messages.success(request, f'Form #{form_id} returned to the queue.')
+    return redirect('csc_dashboard')
+
+@login_required
+def csc_search(request):
+    if request.user.user_type != 'csc':
+        messages.error(request, 'Access denied.')
+        return redirect('landing_page')
     
-    pending_page = request.GET.get('pending_page')
-    completed_page = request.GET.get('completed_page')
+    query = request.GET.get('q', '').strip()
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    per_page = 20
     
-    pending_forms_page = pending_paginator.get_page(pending_page)
-    completed_forms_page = completed_paginator.get_page(completed_page)
+    # Fetch one extra row to know whether there is a next page
+    results = search.search_forms(query, per_page + 1, (page - 1) * per_page) if query else []
     
     context = {
-        'pending_forms': pending_forms_page,
-        'completed_forms': completed_forms_page,
+        'query': query,
+        'results': results[:per_page],
+        'page': page,
+        'has_previous': page > 1,
+        'has_next': len(results) > per_page,
+        'show_back_button': True,
     }
-    return render(request, 'csc/dashboard.html', context)
+    return render(request, 'csc/search.html', context)
 
 @login_required
 def technician_dashboard(request):
@@ -165,6 +271,8 @@ def create_form(request):
             form_submission = form.save(commit=False)
             form_submission.user = request.user
             form_submission.save()
+            if form_submission.document_file:
+                DocumentJob.enqueue(form_submission, force=True)
             messages.success(request, f'Form #{form_submission.form_id} submitted successfully!')
             return redirect('user_dashboard')
     else:
@@ -173,8 +281,23 @@ def create_form(request):
     return render(request, 'user/create_form.html', {'form': form, 'show_back_button': True})
 
 @login_required
+@read_from_replica
 def view_form(request, form_id):
-    form_submission = get_object_or_404(FormSubmission, form_id=form_id)
+    # Revalidation is answered from a single lookup of last_updated
+    version = conditional.form_version(form_id)
+    etag = last_modified = None
+    if version is not None and conditional.can_access(request.user, version):
+        etag = conditional.form_etag(request.user, version, 'page')
+        # The CSC page also depends on other forms, so only the ETag applies
+        if request.user.user_type == 'user':
+            last_modified = version.last_updated
+        response = conditional.not_modified(request, etag, last_modified)
+        if response is not None:
+            if request.user.user_type == 'csc' and not version.is_archived:
+                audit.log_action(form_id, request.user, 'viewed')
+            return response
+    
+    form_submission = archive.get_form_submission(form_id)
     
     # Check permissions
     if request.user.user_type == 'user' and form_submission.user != request.user:
@@ -185,18 +308,57 @@ def view_form(request, form_id):
         return redirect('landing_page')
     
     # Log CSC action
-    if request.user.user_type == 'csc':
-        CSCAction.objects.create(
-            form_submission=form_submission,
-            csc_user=request.user,
-            action_type='viewed'
-        )
+    if request.user.user_type == 'csc' and not form_submission.is_archived:
+        audit.log_action(form_submission, request.user, 'viewed')
     
     context = {
         'form_submission': form_submission,
         'show_back_button': True,
     }
-    return render(request, 'forms/view_form.html', context)
+    if request.user.user_type == 'csc' and not form_submission.is_archived:
+        context['previous_submissions'] = form_submission.find_previous_submissions()
+    response = render(request, 'forms/view_form.html', context)
+    if etag is not None:
+        conditional.set_validators(response, etag, last_modified)
+    return response
+
+@login_required
+@read_from_replica
+def form_detail(request, form_id):
+    """Compact JSON for the dashboard detail modals, loaded on demand"""
+    form_submission = archive.get_form_submission(form_id)
+    
+    if request.user.user_type == 'user' and form_submission.user_id != request.user.pk:
+        return JsonResponse({'error': 'Access denied.'}, status=403)
+    elif request.user.user_type not in ['user', 'csc']:
+        return JsonResponse({'error': 'Access denied.'}, status=403)
+    
+    # Opening the modal is a view like view_form, log it the same way
+    if request.user.user_type == 'csc' and not form_submission.is_archived:
+        audit.log_action(form_submission, request.user, 'viewed')
+    
+    data = {
+        'form_id': form_submission.form_id,
+        'full_name': form_submission.full_name,
+        'email': form_submission.email,
+        'phone_number': form_submission.phone_number,
+        'date_of_birth': format_date(form_submission.date_of_birth),
+        'occupation': form_submission.occupation,
+        'address': form_submission.address,
+        'purpose': form_submission.purpose,
+        'additional_notes': form_submission.additional_notes,
+        'emergency_contact_name': form_submission.emergency_contact_name,
+        'emergency_contact_phone': form_submission.emergency_contact_phone,
+        'status': form_submission.status,
+        'status_display': form_submission.get_status_display(),
+        'comments': form_submission.comments,
+        'submission_date': format_date(form_submission.submission_date, 'F d, Y H:i'),
+        'last_updated': format_date(form_submission.last_updated, 'F d, Y H:i'),
+        'document_url': reverse('download_form_document', args=[form_id]) if form_submission.document_file else None,
+        'document_preview_url': reverse('form_document_preview', args=[form_id]) if form_submission.document_preview else None,
+        'document_metadata': form_submission.document_metadata,
+    }
+    return JsonResponse(data)
 
 @login_required
 def edit_form(request, form_id):
@@ -205,26 +367,62 @@ def edit_form(request, form_id):
         return redirect('landing_page')
     
     form_submission = get_object_or_404(FormSubmission, form_id=form_id)
+    conflicts = None
     
     if request.method == 'POST':
         form = FormEditForm(request.POST, instance=form_submission)
         if form.is_valid():
-            form.save()
-            # Log CSC action
-            CSCAction.objects.create(
-                form_submission=form_submission,
-                csc_user=request.user,
-                action_type='edited',
-                notes=f"Form updated by {request.user.username}"
-            )
-            messages.success(request, f'Form #{form_id} updated successfully!')
-            return redirect('csc_dashboard')
+            changed = form.changed_fields()
+            if not changed:
+                messages.success(request, f'No changes to Form #{form_id}.')
+                return redirect('csc_dashboard')
+            # Only the changed columns, and only if nobody saved since the
+            # agent opened the form. Edits to different fields are replayed
+            # on top of the newer version; overlapping ones go back to the agent.
+            expected_version = form.cleaned_data['version']
+            for _ in range(3):
+                try:
+                    form_submission.save_if_version(expected_version, update_fields=changed)
+                    conflicts = None
+                    break
+                except VersionConflict:
+                    form_submission = get_object_or_404(FormSubmission, form_id=form_id)
+                    conflicts = form.conflicts(form_submission)
+                    if conflicts:
+                        break
+                    for name in changed:
+                        setattr(form_submission, name, form.cleaned_data[name])
+                    expected_version = form_submission.version
+            if conflicts is not None:
+                form_submission.refresh_from_db()
+                form = form.rebase(form_submission)
+                messages.warning(request, f'Form #{form_id} was changed by someone else while you were editing. Review the differences below before saving again.')
+            else:
+                pdf.invalidate(form_id)
+                if form_submission.status == 'completed':
+                    workqueue.release(form_id)
+                    if settings.PDF_RENDER_ASYNC:
+                        PdfRenderJob.enqueue(form_submission, force=True)
+                # Log CSC action
+                audit.log_action(form_submission, request.user, 'edited', notes=f"Form updated by {request.user.username} ({', '.join(changed)})")
+                messages.success(request, f'Form #{form_id} updated successfully!')
+                return redirect('csc_dashboard')
     else:
         form = FormEditForm(instance=form_submission)
+        # Working on a claimed form keeps its lease alive; warn anyone else
+        if not workqueue.renew(request.user, form_id):
+            claim = workqueue.holder(form_id)
+            if claim is not None:
+                messages.warning(
+                    request,
+                    f'Form #{form_id} is claimed by {claim.csc_user.username} until {format_date(timezone.localtime(claim.expires_at), "H:i")}.',
+                )
     
     context = {
         'form': form,
         'form_submission': form_submission,
+        'conflicts': conflicts,
+        'previous_submissions': form_submission.find_previous_submissions(),
         'show_back_button': True,
     }
     return render(request, 'csc/edit_form.html', context)
@@ -235,43 +433,83 @@ def submit_form(request, form_id):
         messages.error(request, 'Access denied.')
         return redirect('landing_page')
     
-    form_submission = get_object_or_404(FormSubmission, form_id=form_id)
-    form_submission.status = 'completed'
-    form_submission.save()
+    # One conditional UPDATE; no need to load the form first
+    if FormSubmission.mark_completed(form_id) is None:
+        if not FormSubmission.objects.filter(form_id=form_id).exists():
+            raise Http404('No FormSubmission matches the given query.')
+        messages.warning(request, f'Form #{form_id} is already completed.')
+        return redirect('csc_dashboard')
+    workqueue.release(form_id)
+    if settings.PDF_RENDER_ASYNC:
+        PdfRenderJob.enqueue(FormSubmission(form_id=form_id), force=True)
     
     # Log CSC action
-    CSCAction.objects.create(
-        form_submission=form_submission,
-        csc_user=request.user,
-        action_type='submitted',
-        notes=f"Form completed by {request.user.username}"
-    )
+    audit.log_action(form_id, request.user, 'submitted', notes=f"Form completed by {request.user.username}")
     
     messages.success(request, f'Form #{form_id} has been marked as completed!')
     return redirect('csc_dashboard')
 
 @login_required
+@require_POST
+def csc_bulk_update(request):
+    """Status transition and/or comment for many forms at once, see bulk.py"""
+    if request.user.user_type != 'csc':
+        return JsonResponse({'error': 'Access denied.'}, status=403)
+    
+    form = BulkUpdateForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'error': 'Invalid bulk update.', 'errors': form.errors}, status=400)
+    
+    try:
+        result = bulk.apply(
+            form.get_queryset(),
+            request.user,
+            status=form.cleaned_data['new_status'] or None,
+            comment=form.cleaned_data['comment'] or None,
+        )
+    except bulk.BulkError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(result._asdict())
+
+def _user_form_tables(user):
+    # The user's live and archived forms, listed together; FormStatusCounter
+    # counts both
+    return [
+        queries.table_rows(queries.user_forms(user), queries.USER_TABLE_FIELDS),
+        queries.table_rows(queries.user_archived_forms(user), queries.USER_TABLE_FIELDS),
+    ]
+
+@login_required
+@read_from_replica
 def user_forms_list(request):
     if request.user.user_type != 'user':
         messages.error(request, 'Access denied.')
         return redirect('landing_page')
     
-    user_forms = FormSubmission.objects.filter(user=request.user).order_by('-submission_date')
-    
     # Pagination
-    paginator = Paginator(user_forms, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    paginator = CursorPaginator(_user_form_tables(request.user), 10, row_class=queries.FormRow)
+    cursor = request.GET.get('cursor')
+    page_obj = paginator.get_page(cursor)
     
     context = {
         'forms': page_obj,
+        'total_forms': FormStatusCounter.get_for(request.user).total,
         'show_back_button': True,
     }
     return render(request, 'user/forms_list.html', context)
 
 @login_required
 def download_form_pdf(request, form_id):
-    form_submission = get_object_or_404(FormSubmission, form_id=form_id)
+    # A PDF only changes with its form, so last_updated validates it
+    version = conditional.form_version(form_id)
+    etag = None
+    if version is not None and version.status == 'completed' and conditional.can_access(request.user, version):
+        etag = conditional.form_etag(request.user, version, 'pdf')
+        response = conditional.not_modified(request, etag, version.last_updated)
+        if response is not None:
+            return response
+    
+    form_submission = archive.get_form_submission(form_id)
     
     # Check permissions
     if request.user.user_type == 'user' and form_submission.user != request.user:
@@ -286,50 +524,205 @@ def download_form_pdf(request, form_id):
         messages.error(request, 'PDF download is only available for completed forms.')
         return redirect('user_dashboard' if request.user.user_type == 'user' else 'csc_dashboard')
     
-    # Create PDF
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    styles = getSampleStyleSheet()
-    
-    # Build PDF content
-    story = []
-    story.append(Paragraph(f"Form Submission #{form_submission.form_id}", styles['Title']))
-    story.append(Spacer(1, 12))
-    
-    # Form details
-    details = [
-        f"<b>Full Name:</b> {form_submission.full_name}",
-        f"<b>Email:</b> {form_submission.email}",
-        f"<b>Phone:</b> {form_submission.phone_number}",
-        f"<b>Date of Birth:</b> {form_submission.date_of_birth}",
-        f"<b>Occupation:</b> {form_submission.occupation}",
-        f"<b>Address:</b> {form_submission.address}",
-        f"<b>Purpose:</b> {form_submission.purpose}",
-        f"<b>Submission Date:</b> {form_submission.submission_date.strftime('%Y-%m-%d %H:%M:%S')}",
-        f"<b>Status:</b> {form_submission.get_status_display()}",
-    ]
+    # Serve from the render cache; misses are rendered by run_pdf_workers.
+    # Archived forms never change again, so they are rendered once inline.
+    if settings.PDF_RENDER_ASYNC and not form_submission.is_archived:
+        cached = pdf.open_cached(form_submission)
+        if cached is None:
+            PdfRenderJob.enqueue(form_submission)
+            response = HttpResponse(
+                'Your PDF is being generated. Please try again in a few seconds.',
+                status=202,
+                content_type='text/plain',
+            )
+            response['Retry-After'] = str(settings.PDF_RENDER_RETRY_AFTER)
+            return response
+    else:
+        cached = pdf.open_cached_pdf(form_submission)
     
-    if form_submission.emergency_contact_name:
-        details.append(f"<b>Emergency Contact:</b> {form_submission.emergency_contact_name} - {form_submission.emergency_contact_phone}")
+    response = FileResponse(
+        cached,
+        as_attachment=True,
+        filename=f"form_{form_id}.pdf",
+        content_type='application/pdf',
+    )
+    if etag is not None:
+        conditional.set_validators(response, etag, version.last_updated)
+    return response
+
+@login_required
+@read_from_replica
+def download_form_document(request, form_id, preview=False):
+    form_submission = archive.get_form_submission(form_id)
     
-    if form_submission.additional_notes:
-        details.append(f"<b>Additional Notes:</b> {form_submission.additional_notes}")
+    # Same rules as view_form
+    if request.user.user_type == 'user' and form_submission.user_id != request.user.pk:
+        messages.error(request, 'Access denied.')
+        return redirect('user_dashboard')
+    elif request.user.user_type not in ['user', 'csc']:
+        messages.error(request, 'Access denied.')
+        return redirect('landing_page')
     
-    if form_submission.comments:
-        details.append(f"<b>Comments:</b> {form_submission.comments}")
+    field_file = form_submission.document_preview if preview else form_submission.document_file
+    if not field_file:
+        raise Http404('No document attached.')
     
-    for detail in details:
-        story.append(Paragraph(detail, styles['Normal']))
-        story.append(Spacer(1, 6))
+    etag = media.etag_for(field_file)
+    response = conditional.not_modified(request, etag)
+    if response is not None:
+        return response
     
-    doc.build(story)
-    buffer.seek(0)
+    if preview:
+        filename = f"form_{form_id}_preview.jpg"
+    else:
+        filename = f"form_{form_id}_document{os.path.splitext(field_file.name)[1]}"
+    response = media.serve(request, field_file, filename, etag=etag)
+    return conditional.set_validators(response, etag)
+
+@login_required
+@read_from_replica
+def export_pdfs(request):
+    if request.user.user_type != 'csc':
+        messages.error(request, 'Access denied.')
+        return redirect('landing_page')
     
-    response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="form_{form_id}.pdf"'
+    data = request.GET.copy()
+    data.setdefault('status', 'completed')
+    filter_form = ExportFilterForm(data)
+    if not filter_form.is_valid():
+        messages.error(request, 'Invalid export filter.')
+        return redirect('csc_dashboard')
+    
+    # The ZIP is produced incrementally while the PDFs are rendered
+    forms = exports.filter_forms(**filter_form.cleaned_data)
+    response = StreamingHttpResponse(
+        stream_with_current_routing(exports.iter_pdf_zip(forms)),
+        content_type='application/zip',
+    )
+    response['Content-Disposition'] = 'attachment; filename="forms.zip"'
+    return response
+
+@login_required
+@read_from_replica
+def export_data(request):
+    if request.user.user_type != 'csc':
+        messages.error(request, 'Access denied.')
+        return redirect('landing_page')
     
+    data = request.GET.copy()
+    data.setdefault('source', 'forms')
+    data.setdefault('format', 'csv')
+    export_form = DataExportForm(data)
+    if not export_form.is_valid():
+        messages.error(request, 'Invalid export parameters.')
+        return redirect('csc_dashboard')
+    
+    source = export_form.cleaned_data['source']
+    export_format = export_form.cleaned_data['format']
+    export = exports.DataExport(source, since=export_form.cleaned_data['since'])
+    content_type = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    response = StreamingHttpResponse(
+        stream_with_current_routing(export.iter_format(export_format)),
+        content_type=content_type,
+    )
+    response['Content-Disposition'] = f'attachment; filename="{source}.{export_format}"'
     return response
 
+# Chunked document uploads
+def _upload_state(upload):
+    return {
+        'upload_id': str(upload.pk),
+        'filename': upload.filename,
+        'size': upload.size,
+        'offset': upload.received,
+        'complete': upload.is_complete,
+        'sha256': upload.sha256 or None,
+    }
+
+def _get_upload(request, upload_id):
+    return get_object_or_404(DocumentUpload, pk=upload_id, user=request.user)
+
+@login_required
+@require_POST
+def upload_initiate(request):
+    """Start an upload: POST filename and size, then PUT chunks to the returned URL"""
+    if request.user.user_type != 'user':
+        return JsonResponse({'error': 'Access denied.'}, status=403)
+    
+    filename = os.path.basename(request.POST.get('filename', '').strip())
+    try:
+        size = int(request.POST.get('size', ''))
+    except ValueError:
+        size = 0
+    if not filename or size <= 0:
+        return JsonResponse({'error': 'filename and a positive size are required.'}, status=400)
+    if size > settings.UPLOAD_MAX_BYTES:
+        return JsonResponse({'error': 'File too large.'}, status=413)
+    
+    upload = DocumentUpload.objects.create(user=request.user, filename=filename, size=size)
+    data = _upload_state(upload)
+    data['upload_url'] = reverse('upload_chunk', args=[upload.pk])
+    return JsonResponse(data, status=201)
+
+@login_required
+@require_http_methods(['GET', 'HEAD', 'PUT'])
+def upload_chunk(request, upload_id):
+    """
+    GET reports how many bytes were received, which is where a resumed upload
+    continues. PUT writes the raw request body at the Upload-Offset header.
+    """
+    if request.user.user_type != 'user':
+        return JsonResponse({'error': 'Access denied.'}, status=403)
+    
+    upload = _get_upload(request, upload_id)
+    if request.method == 'PUT':
+        if upload.is_complete:
+            return JsonResponse({'error': 'Upload already finalized.'}, status=409)
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.META.get('CONTENT_LENGTH') or '')
+        except ValueError:
+            return JsonResponse({'error': 'Upload-Offset and Content-Length headers are required.'}, status=400)
+        try:
+            uploads.write_chunk(upload, offset, request, length)
+        except uploads.UploadError as e:
+            data = _upload_state(upload)
+            data['error'] = str(e)
+            return JsonResponse(data, status=e.status)
+    
+    return JsonResponse(_upload_state(upload))
+
+@login_required
+@require_POST
+def upload_finalize(request, upload_id):
+    """Verify the optional sha256 and attach the file to the user's form_id"""
+    if request.user.user_type != 'user':
+        return JsonResponse({'error': 'Access denied.'}, status=403)
+    
+    upload = _get_upload(request, upload_id)
+    try:
+        form_id = int(request.POST.get('form_id', ''))
+    except ValueError:
+        form_id = None
+    form_submission = FormSubmission.objects.filter(form_id=form_id, user=request.user).first()
+    if form_submission is None:
+        return JsonResponse({'error': 'Unknown form_id.'}, status=400)
+    if upload.is_complete:
+        return JsonResponse({'error': 'Upload already finalized.'}, status=409)
+    
+    try:
+        uploads.finalize(upload, form_submission, request.POST.get('sha256', '').strip())
+    except uploads.UploadError as e:
+        data = _upload_state(upload)
+        data['error'] = str(e)
+        return JsonResponse(data, status=e.status)
+    DocumentJob.enqueue(form_submission, force=True)
+    
+    data = _upload_state(upload)
+    data['form_id'] = form_submission.form_id
+    data['document_url'] = reverse('download_form_document', args=[form_submission.form_id])
+    return JsonResponse(data)
+
 # Legacy views (keeping for compatibility)
 def home(request):
     return redirect('landing_page')
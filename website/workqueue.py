@@ -0,0 +1,102 @@
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Exists, Max, Min, OuterRef
+from django.utils import timezone
+
+from . import queries
+from .models import FormClaim
+
+# CSC work queue. Agents lease pending forms, oldest first, so parallel agents
+# work on different forms. Leases are FormClaim rows in their own table: taking
+# or renewing one never writes the hot FormSubmission rows, and an expired
+# lease simply stops counting until another agent takes it over.
+
+
+def lease_duration():
+    return timedelta(seconds=settings.CSC_CLAIM_LEASE_SECONDS)
+
+
+def active_claims():
+    return FormClaim.objects.filter(expires_at__gt=timezone.now())
+
+
+def claimed_forms(user):
+    """Table rows for the pending forms user currently holds, oldest first"""
+    queryset = queries.pending_forms().filter(
+        claim__csc_user=user, claim__expires_at__gt=timezone.now(),
+    ).order_by('submission_date', 'form_id')
+    return [queries.FormRow(**row) for row in queries.table_rows(queryset, queries.CSC_PENDING_FIELDS)]
+
+
+def claims_version():
+    """
+    Changes whenever a lease is taken, renewed, released or expires; part of
+    the CSC dashboard's cache keys and ETag, since claims don't save forms.
+    """
+    state = active_claims().aggregate(count=Count('pk'), first=Min('expires_at'), last=Max('expires_at'))
+    if not state['count']:
+        return '0'
+    return '-'.join(str(part) for part in (
+        state['count'], int(state['first'].timestamp() * 1000000), int(state['last'].timestamp() * 1000000),
+    ))
+
+
+def claim_next(user, limit):
+    """
+    Lease up to `limit` unclaimed pending forms to user, never taking the
+    total they hold past CSC_CLAIM_MAX_ACTIVE. Returns the claimed form ids.
+    """
+    now = timezone.now()
+    expires_at = now + lease_duration()
+    token = uuid.uuid4().hex
+    with transaction.atomic():
+        held = active_claims().filter(csc_user=user).count()
+        limit = min(limit, settings.CSC_CLAIM_MAX_ACTIVE - held)
+        if limit <= 0:
+            return []
+        candidates = (
+            queries.pending_forms()
+            .filter(~Exists(FormClaim.objects.filter(form_submission=OuterRef('pk'), expires_at__gt=now)))
+            .order_by('submission_date', 'form_id')
+        )
+        if connection.features.has_select_for_update_skip_locked:
+            # Concurrent agents skip each other's candidates instead of queueing
+            candidates = candidates.select_for_update(skip_locked=True)
+        ids = list(candidates.values_list('pk', flat=True)[:limit])
+        if not ids:
+            return []
+        # Take over expired leases with a conditional UPDATE and insert the
+        # rest; a form claimed by someone else meanwhile matches neither
+        FormClaim.objects.filter(pk__in=ids, expires_at__lte=now).update(
+            csc_user=user, claim_token=token, claimed_at=now, expires_at=expires_at,
+        )
+        FormClaim.objects.bulk_create(
+            [FormClaim(form_submission_id=pk, csc_user=user, claim_token=token, claimed_at=now, expires_at=expires_at)
+             for pk in ids],
+            ignore_conflicts=True,
+        )
+    return list(FormClaim.objects.filter(claim_token=token).values_list('pk', flat=True))
+
+
+def holder(form_id):
+    """The active FormClaim on a form, or None"""
+    return active_claims().filter(pk=form_id).select_related('csc_user').first()
+
+
+def renew(user, form_id):
+    """Extend user's lease on a form; False if they don't hold it"""
+    now = timezone.now()
+    return bool(FormClaim.objects.filter(pk=form_id, csc_user=user, expires_at__gt=now).update(
+        expires_at=now + lease_duration(),
+    ))
+
+
+def release(form_id, user=None):
+    """Drop the claim on a form; with user, only if it is theirs"""
+    claims = FormClaim.objects.filter(pk=form_id)
+    if user is not None:
+        claims = claims.filter(csc_user=user)
+    return claims.delete()[0] > 0